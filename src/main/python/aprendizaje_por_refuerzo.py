@@ -1,13 +1,63 @@
-import random
+import heapq
+import itertools
+from functools import partial
+
 import numpy
 from collections import defaultdict
 
+from src.main.python.batch_env import make_batch_env
+from src.main.python.early_stopping import run_episodes
+from src.main.python.eligibility_traces import EligibilityTraces
 from src.main.python.environment_statistic import EnvironmentStatistic
+from src.main.python.q_table import DenseQTable, is_enumerable, make_q_table
+
+
+class GeneradorPorBloques:
+    """Sirve números aleatorios uniformes en [0, 1) precalculados por bloques.
+
+    Cada bloque se rellena de una vez con un Generator de NumPy sobre el mismo
+    array, de modo que obtener un número no reserva memoria ni llama al
+    generador.
+    """
+
+    def __init__(self, semilla=None, tamaño_bloque=4096):
+        """Crea el generador.
+
+        Argumentos:
+        semilla -- semilla del Generator de NumPy (el valor por defecto,
+                   None, la toma del generador global de NumPy, de modo que
+                   numpy.random.seed hace reproducible la secuencia)
+        tamaño_bloque -- cantidad de números generados en cada bloque
+        """
+        if semilla is None:
+            semilla = numpy.random.randint(2 ** 31)
+        self.generador = numpy.random.default_rng(semilla)
+        self.bloque = self.generador.random(tamaño_bloque)
+        self.posición = 0
+
+    def uniforme(self):
+        """Devuelve un número real uniforme en [0, 1)."""
+        if self.posición == len(self.bloque):
+            self.generador.random(out=self.bloque)
+            self.posición = 0
+        valor = self.bloque[self.posición]
+        self.posición += 1
+        return valor
+
+    def entero(self, n):
+        """Devuelve un número entero uniforme en [0, n)."""
+        return int(self.uniforme() * n)
 
 
 class PolíticaVoraz:
     """Implementa una política voraz sobre el valor de pares estado-acción."""
 
+    def __init__(self, semilla=None):
+        """Admite una semilla para el generador de números aleatorios."""
+        self.aleatorio = GeneradorPorBloques(semilla)
+        self.candidatas = None
+        self.posiciones = None
+
     def elige_acción(self, estado, espacio_de_acciones, tabla_q, máscara=None):
         """Elige una acción voraz que aplicar a un estado.
 
@@ -15,7 +65,7 @@ class PolíticaVoraz:
         estado -- un número entero representando el estado
         espacio_de_acciones -- el espacio de posibles acciones
                                (se asume de tipo Discrete)
-        tabla_q -- un diccionario que asocia a cada estado un array con el
+        tabla_q -- una tabla que asocia a cada estado un array con el
                    valor de cada acción para el estado
         máscara -- un array binario que indica las acciones elegibles
                    (el valor por defecto, None, representa que todas las
@@ -24,23 +74,86 @@ class PolíticaVoraz:
         Se elige aleatoriamente entre todas las acciones maximalmente
         valoradas para el estado.
         """
+        return self.elige_acción_voraz(
+            estado, espacio_de_acciones, tabla_q, máscara
+        )
+
+    def elige_acción_voraz(self, estado, espacio_de_acciones, tabla_q,
+                           máscara=None):
+        """Elige aleatoriamente una de las acciones de mayor valor.
+
+        Reutiliza los arrays auxiliares entre llamadas. Si ninguna de las
+        acciones de mayor valor es elegible según la máscara, devuelve la
+        primera acción del espacio (como Discrete.sample).
+        """
+        valores_acciones = numpy.asarray(tabla_q[estado])
+        candidatas = self._prepara_auxiliares(espacio_de_acciones.n)
+        numpy.equal(valores_acciones, valores_acciones.max(), out=candidatas)
+        if máscara is not None:
+            numpy.logical_and(candidatas, máscara, out=candidatas)
+        return espacio_de_acciones.start + self._elige_candidata(candidatas)
+
+    def elige_acción_aleatoria(self, espacio_de_acciones, máscara=None):
+        """Elige uniformemente una de las acciones elegibles.
+
+        Si ninguna acción es elegible según la máscara, devuelve la primera
+        acción del espacio (como Discrete.sample).
+        """
         if máscara is None:
-            máscara = numpy.full(espacio_de_acciones.n, 1, dtype=numpy.int8)
-        valores_acciones = tabla_q[estado]
-        máscara_mejores_acciones = (
-                valores_acciones == max(valores_acciones)
-        ).astype(numpy.int8)
-        acción_elegida = espacio_de_acciones.sample(
-            máscara * máscara_mejores_acciones
+            return (espacio_de_acciones.start +
+                    self.aleatorio.entero(espacio_de_acciones.n))
+        candidatas = self._prepara_auxiliares(espacio_de_acciones.n)
+        numpy.not_equal(máscara, 0, out=candidatas)
+        return espacio_de_acciones.start + self._elige_candidata(candidatas)
+
+    def elige_acciones(self, estados, espacio_de_acciones, tabla_q):
+        """Elige una acción voraz para cada estado de un lote.
+
+        Argumentos:
+        estados -- un array de números enteros representando los estados
+        espacio_de_acciones -- el espacio de posibles acciones
+                               (se asume de tipo Discrete)
+        tabla_q -- una instancia de DenseQTable
+
+        Los empates se deshacen aleatoriamente como en elige_acción.
+        """
+        return espacio_de_acciones.start + self._elige_voraces(
+            tabla_q.array[estados]
         )
-        return acción_elegida
+
+    def _elige_voraces(self, valores_acciones):
+        # Entre las acciones de mayor valor gana la de mayor clave aleatoria
+        claves = self.aleatorio.generador.random(valores_acciones.shape)
+        claves[valores_acciones != valores_acciones.max(axis=1, keepdims=True)] = -1
+        return claves.argmax(axis=1)
+
+    def _prepara_auxiliares(self, cantidad_acciones):
+        if self.candidatas is None or len(self.candidatas) != cantidad_acciones:
+            self.candidatas = numpy.empty(cantidad_acciones, dtype=bool)
+            self.posiciones = numpy.empty(cantidad_acciones, dtype=numpy.int64)
+        return self.candidatas
+
+    def _elige_candidata(self, candidatas):
+        cantidad = numpy.count_nonzero(candidatas)
+        if cantidad == 0:
+            return 0
+        if cantidad == 1:
+            return int(candidatas.argmax())
+        # Posición de la k-ésima candidata según la suma acumulada
+        numpy.cumsum(candidatas, out=self.posiciones)
+        k = self.aleatorio.entero(cantidad)
+        return int(numpy.searchsorted(self.posiciones, k + 1))
 
 
-class PolíticaEpsilonVoraz:
+class PolíticaEpsilonVoraz(PolíticaVoraz):
     """Implementa una política ε-voraz sobre el valor de pares estado-acción."""
 
-    def __init__(self, epsilon):
-        """Requiere el valor del parámetro ε de la política."""
+    def __init__(self, epsilon, semilla=None):
+        """Requiere el valor del parámetro ε de la política.
+
+        Admite además una semilla para el generador de números aleatorios.
+        """
+        super().__init__(semilla)
         self.epsilon = epsilon
 
     def elige_acción(self, estado, espacio_de_acciones, tabla_q, máscara=None):
@@ -50,7 +163,7 @@ class PolíticaEpsilonVoraz:
         estado -- un número entero representando el estado
         espacio_de_acciones -- el espacio de posibles acciones
                                (se asume de tipo Discrete)
-        tabla_q -- un diccionario que asocia a cada estado un array con el
+        tabla_q -- una tabla que asocia a cada estado un array con el
                    valor de cada acción para el estado
         máscara -- un array binario que indica las acciones elegibles
                    (el valor por defecto, None, representa que todas las
@@ -59,20 +172,27 @@ class PolíticaEpsilonVoraz:
         En su caso, se elige aleatoriamente entre todas las acciones
         maximalmente valoradas para el estado.
         """
-        if máscara is None:
-            máscara = numpy.full(espacio_de_acciones.n, 1, dtype=numpy.int8)
-        if random.random() < self.epsilon:
-            acción_elegida = espacio_de_acciones.sample(máscara)
-            return acción_elegida
-        else:
-            valores_acciones = tabla_q[estado]
-            máscara_mejores_acciones = (
-                    valores_acciones == max(valores_acciones)
-            ).astype(numpy.int8)
-            acción_elegida = espacio_de_acciones.sample(
-                máscara * máscara_mejores_acciones
-            )
-            return acción_elegida
+        if self.aleatorio.uniforme() < self.epsilon:
+            return self.elige_acción_aleatoria(espacio_de_acciones, máscara)
+        return self.elige_acción_voraz(
+            estado, espacio_de_acciones, tabla_q, máscara
+        )
+
+    def elige_acciones(self, estados, espacio_de_acciones, tabla_q):
+        """Elige una acción ε-voraz para cada estado de un lote.
+
+        Argumentos:
+        estados -- un array de números enteros representando los estados
+        espacio_de_acciones -- el espacio de posibles acciones
+                               (se asume de tipo Discrete)
+        tabla_q -- una instancia de DenseQTable
+        """
+        acciones = self._elige_voraces(tabla_q.array[estados])
+        explora = self.aleatorio.generador.random(len(acciones)) < self.epsilon
+        acciones[explora] = self.aleatorio.generador.integers(
+            espacio_de_acciones.n, size=numpy.count_nonzero(explora)
+        )
+        return espacio_de_acciones.start + acciones
 
 
 class Montecarlo_IE:
@@ -82,7 +202,12 @@ class Montecarlo_IE:
             self,
             entorno,
             factor_de_descuento,
-            primera_visita=False
+            primera_visita=False,
+            tipo_tabla='auto',
+            modo_retornos='media',
+            tasa_de_aprendizaje=None,
+            estadísticas_en_flujo=False,
+            ventana_estadísticas=100
     ):
         """Crea una instancia del algoritmo.
 
@@ -93,31 +218,94 @@ class Montecarlo_IE:
         factor_de_descuento -- un número real entre 0 y 1
         primera_visita -- un valor lógico que indica si el algoritmo es de
                           primera_visita o de cada visita (por defecto)
+        tipo_tabla -- almacenamiento de la tabla Q: 'dense', 'dict' o 'auto'
+                      (por defecto, ver make_q_table)
+        modo_retornos -- forma de estimar el valor a partir de los retornos:
+                         'media' (por defecto) mantiene la media incremental
+                         con un contador de visitas, 'constante' usa una tasa
+                         de aprendizaje fija y 'historial' guarda todos los
+                         retornos observados (útil para depurar)
+        tasa_de_aprendizaje -- un número real mayor que 0 y menor o igual que
+                               1, necesario en el modo 'constante'
+        estadísticas_en_flujo -- si es True, las estadísticas se acumulan en
+                                 memoria constante en lugar de guardar cada
+                                 episodio (ver EnvironmentStatistic)
+        ventana_estadísticas -- número de episodios de las estadísticas
+                                móviles (por defecto 100)
         """
+        if modo_retornos not in ('media', 'constante', 'historial'):
+            raise ValueError("Modo de retornos no encontrado")
+        if modo_retornos == 'constante' and tasa_de_aprendizaje is None:
+            raise ValueError(
+                "El modo 'constante' requiere una tasa de aprendizaje"
+            )
         self.entorno = entorno
         self.factor_de_descuento = factor_de_descuento
         self.primera_visita = primera_visita
+        self.tipo_tabla = tipo_tabla
+        self.modo_retornos = modo_retornos
+        self.tasa_de_aprendizaje = tasa_de_aprendizaje
         self.política_exploratoria = PolíticaVoraz()
-        self.statistics = EnvironmentStatistic(entorno)
+        self.statistics = EnvironmentStatistic(entorno, estadísticas_en_flujo, ventana_estadísticas)
         self.inicializa_tablas_q_y_r()
 
     def inicializa_tablas_q_y_r(self):
         """Inicializa las tablas usadas por el algoritmo.
 
-        El atributo tabla_q es un diccionario que asocia a cada estado un
-        array con el valor (inicialmente −∞) de cada acción para el estado.
+        El atributo tabla_q asocia a cada estado un array con el valor
+        (inicialmente −∞) de cada acción para el estado.
 
-        El atributo tabla_r es un diccionario que asocia a cada estado una
-        lista (inicialmente vacía) con todas las recompensas acumuladas a
-        partir del estado que se han observado.
+        El atributo tabla_n asocia a cada estado un array con el número de
+        retornos observados (inicialmente 0) para cada acción.
+
+        Solo en el modo 'historial', el atributo tabla_r es un diccionario
+        que asocia a cada estado una lista (inicialmente vacía) con todas las
+        recompensas acumuladas a partir del estado que se han observado.
         """
         cantidad_acciones = self.entorno.action_space.n
-        self.tabla_q = defaultdict(
-            lambda: numpy.full(cantidad_acciones, -numpy.inf)
+        self.tabla_q = make_q_table(
+            self.entorno,
+            lambda forma: numpy.full(forma, -numpy.inf),
+            self.tipo_tabla
         )
-        self.tabla_r = defaultdict(
-            lambda: tuple([] for _ in range(cantidad_acciones))
+        self.tabla_n = make_q_table(
+            self.entorno,
+            lambda forma: numpy.zeros(forma, dtype=numpy.int64),
+            self.tipo_tabla
         )
+        if self.modo_retornos == 'historial':
+            self.tabla_r = defaultdict(
+                lambda: tuple([] for _ in range(cantidad_acciones))
+            )
+
+    def actualiza_valor(self, estado, acción, retorno):
+        """Incorpora un retorno observado al valor de un par estado-acción.
+
+        Argumentos:
+        estado -- un número entero representando el estado
+        acción -- un número entero representando la acción aplicada
+        retorno -- recompensa acumulada observada a partir del par
+
+        En los modos 'media' y 'constante' el coste es constante en tiempo y
+        memoria; el primer retorno observado sustituye al valor inicial −∞.
+        """
+        self.tabla_n[estado][acción] += 1
+        visitas = self.tabla_n[estado][acción]
+        if self.modo_retornos == 'historial':
+            self.tabla_r[estado][acción].append(retorno)
+            self.tabla_q[estado][acción] = numpy.mean(
+                self.tabla_r[estado][acción]
+            )
+        elif visitas == 1:
+            self.tabla_q[estado][acción] = retorno
+        elif self.modo_retornos == 'media':
+            self.tabla_q[estado][acción] += (
+                    (retorno - self.tabla_q[estado][acción]) / visitas
+            )
+        else:
+            self.tabla_q[estado][acción] += self.tasa_de_aprendizaje * (
+                    retorno - self.tabla_q[estado][acción]
+            )
 
     def elige_acción(self, estado, info):
         """Elige una acción a aplicar a un estado.
@@ -165,28 +353,44 @@ class Montecarlo_IE:
                 break
             estado_actual = estado_siguiente
             acción = self.elige_acción(estado_actual, info)
+        # Instante de la primera aparición de cada par en el episodio
+        primera_aparición = {}
+        if self.primera_visita:
+            for instante, par in enumerate(pares_estado_acción):
+                primera_aparición.setdefault(par, instante)
         U = 0
-        while pares_estado_acción:
-            estado, acción = pares_estado_acción.pop()
-            recompensa = recompensas.pop()
-            U = self.factor_de_descuento * U + recompensa
+        for instante in range(len(pares_estado_acción) - 1, -1, -1):
+            estado, acción = pares_estado_acción[instante]
+            U = self.factor_de_descuento * U + recompensas[instante]
             if (not self.primera_visita or
-                    not (estado, acción) in pares_estado_acción):
-                self.tabla_r[estado][acción].append(U)
-                self.tabla_q[estado][acción] = numpy.mean(
-                    self.tabla_r[estado][acción]
-                )
+                    primera_aparición[(estado, acción)] == instante):
+                self.actualiza_valor(estado, acción, U)
 
-    def entrena(self, número_episodios):
+    def ejecuta_episodios_hasta(self, número_episodios):
+        """Ejecuta episodios hasta que se hayan registrado número_episodios."""
+        while self.statistics.episode_log.size < número_episodios:
+            self.ejecuta_episodio()
+
+    def entrena(self, número_episodios, parada=None, continuar=False):
         """Ejecuta el algoritmo durante un cierto número de episodios.
 
         Argumentos:
         número_episodios -- entero no negativo que establece el número de
                             episodios a entrenar
+        parada -- una instancia de EarlyStopping para detener el
+                  entrenamiento antes si se cumple alguno de sus criterios
+                  (por defecto None, se ejecutan todos los episodios)
+        continuar -- si es True, entrena número_episodios más a partir de
+                     las tablas y estadísticas actuales en lugar de empezar
+                     un registro nuevo
         """
-        self.statistics.reset()
-        for _ in range(número_episodios):
-            self.ejecuta_episodio()
+        if continuar:
+            self.statistics.resume()
+        else:
+            self.statistics.reset()
+        run_episodes(self.statistics,
+                     self.statistics.episode_log.size + número_episodios,
+                     self.ejecuta_episodios_hasta, self.tabla_q, parada)
 
     def calculate_statistics(self):
         """Calcula las estadísticas a partir de los datos de los episodios."""
@@ -221,7 +425,12 @@ class Q_Learning:
             entorno,
             factor_de_descuento,
             tasa_de_aprendizaje,
-            política_exploratoria
+            política_exploratoria,
+            tipo_tabla='auto',
+            memoria_repeticiones=None,
+            tamaño_lote=32,
+            estadísticas_en_flujo=False,
+            ventana_estadísticas=100
     ):
         """Crea una instancia del algoritmo.
 
@@ -232,22 +441,47 @@ class Q_Learning:
         factor_de_descuento -- un número real entre 0 y 1
         tasa_de_aprendizaje -- un número real mayor que 0 y menor o igual que 1
         política_exploratoria -- una instancia de PolíticaEpsilonVoraz
+        tipo_tabla -- almacenamiento de la tabla Q: 'dense', 'dict' o 'auto'
+                      (por defecto, ver make_q_table)
+        memoria_repeticiones -- una instancia de ReplayBuffer; si se indica,
+                                tras cada paso real se repite un lote de
+                                transiciones guardadas (requiere una tabla
+                                Q densa)
+        tamaño_lote -- número de transiciones repetidas por cada paso real
+        estadísticas_en_flujo -- si es True, las estadísticas se acumulan en
+                                 memoria constante en lugar de guardar cada
+                                 episodio (ver EnvironmentStatistic)
+        ventana_estadísticas -- número de episodios de las estadísticas
+                                móviles (por defecto 100)
         """
         self.entorno = entorno
+        self.tipo_tabla = tipo_tabla
         self.tasa_de_aprendizaje = tasa_de_aprendizaje
         self.factor_de_descuento = factor_de_descuento
         self.política_exploratoria = política_exploratoria
-        self.statistics = EnvironmentStatistic(entorno)
+        self.memoria_repeticiones = memoria_repeticiones
+        self.tamaño_lote = tamaño_lote
+        self.statistics = EnvironmentStatistic(entorno, estadísticas_en_flujo, ventana_estadísticas)
+        # Lote de entornos a medias entre dos llamadas a
+        # ejecuta_episodios_por_lotes (ver ese método)
+        self.lote_en_curso = None
         self.inicializa_tabla_q()
+        if memoria_repeticiones is not None:
+            if not isinstance(self.tabla_q, DenseQTable):
+                raise ValueError(
+                    "La memoria de repeticiones requiere una tabla Q densa"
+                )
+            self.generador_repeticiones = numpy.random.default_rng(
+                numpy.random.randint(2 ** 31)
+            )
 
     def inicializa_tabla_q(self):
         """Inicializa la tabla usada por el algoritmo.
 
-        El atributo tabla_q es un diccionario que asocia a cada estado un
-        array con el valor (inicialmente 0) de cada acción para el estado.
+        El atributo tabla_q asocia a cada estado un array con el valor
+        (inicialmente 0) de cada acción para el estado.
         """
-        cantidad_acciones = self.entorno.action_space.n
-        self.tabla_q = defaultdict(lambda: numpy.zeros(cantidad_acciones))
+        self.tabla_q = make_q_table(self.entorno, numpy.zeros, self.tipo_tabla)
 
     def actualiza_tabla_q(
             self,
@@ -265,7 +499,7 @@ class Q_Learning:
         estado_siguiente -- un número entero representando el nuevo estado
                             observado
         """
-        máximo_valor_q = max(self.tabla_q[estado_siguiente])
+        máximo_valor_q = self.tabla_q[estado_siguiente].max()
         error_DT = (
                 recompensa +
                 self.factor_de_descuento * máximo_valor_q -
@@ -275,6 +509,77 @@ class Q_Learning:
                 self.tasa_de_aprendizaje * error_DT
         )
 
+    def actualiza_tabla_q_por_lotes(
+            self,
+            estados_actuales,
+            acciones,
+            recompensas,
+            estados_siguientes,
+            terminados=None,
+            promedia_repetidos=False,
+            pesos=None
+    ):
+        """Actualiza la tabla con un lote de transiciones a la vez.
+
+        Argumentos:
+        estados_actuales -- array de números enteros con los estados actuales
+        acciones -- array de números enteros con las acciones aplicadas
+        recompensas -- array de números reales con las recompensas observadas
+        estados_siguientes -- array de números enteros con los nuevos estados
+        terminados -- array opcional de valores lógicos; las transiciones
+                      terminales no suman el valor del estado siguiente
+        promedia_repetidos -- si es True, los incrementos de un par
+                              estado-acción repetido se promedian en lugar
+                              de sumarse
+        pesos -- array opcional de números reales por los que se multiplica
+                 el incremento de cada transición (los pesos de muestreo por
+                 importancia de ReplayBuffer.sample)
+
+        Los errores se calculan con los valores previos al lote y, si un par
+        estado-acción se repite, sus incrementos se suman. Devuelve los
+        errores DT.
+        """
+        tabla = self.tabla_q.array
+        máximos = tabla[estados_siguientes].max(axis=1)
+        if terminados is not None:
+            máximos = numpy.where(terminados, 0, máximos)
+        errores_DT = (
+                recompensas +
+                self.factor_de_descuento * máximos -
+                tabla[estados_actuales, acciones]
+        )
+        incrementos = self.tasa_de_aprendizaje * errores_DT
+        if pesos is not None:
+            incrementos = incrementos * pesos
+        if promedia_repetidos:
+            _, inversos, repeticiones = numpy.unique(
+                estados_actuales * tabla.shape[1] + acciones,
+                return_inverse=True, return_counts=True
+            )
+            incrementos = incrementos / repeticiones[inversos]
+        numpy.add.at(tabla, (estados_actuales, acciones), incrementos)
+        return errores_DT
+
+    def repite_experiencia(self, número_pasos=1):
+        """Repite tamaño_lote transiciones de la memoria por cada paso real.
+
+        Las transiciones se aplican como un único lote vectorizado,
+        promediando los incrementos de los pares repetidos y escalándolos por
+        sus pesos de muestreo por importancia, y, si la memoria es
+        priorizada, se actualizan sus prioridades con los nuevos errores DT.
+        """
+        memoria = self.memoria_repeticiones
+        if len(memoria) < self.tamaño_lote:
+            return
+        índices, pesos, *transiciones = memoria.sample(
+            self.generador_repeticiones, self.tamaño_lote * número_pasos
+        )
+        errores_DT = self.actualiza_tabla_q_por_lotes(
+            *transiciones, promedia_repetidos=True, pesos=pesos
+        )
+        if memoria.prioritized:
+            memoria.update_priorities(índices, errores_DT)
+
     def elige_acción(self, estado, info):
         """Elige una acción a aplicar a un estado.
 
@@ -308,6 +613,12 @@ class Q_Learning:
             self.actualiza_tabla_q(
                 estado_actual, acción, recompensa, estado_siguiente
             )
+            if self.memoria_repeticiones is not None:
+                self.memoria_repeticiones.add(
+                    estado_actual, acción, recompensa, estado_siguiente,
+                    terminado
+                )
+                self.repite_experiencia()
 
             self.statistics.continue_episode(recompensa)
 
@@ -317,16 +628,97 @@ class Q_Learning:
 
             estado_actual = estado_siguiente
 
-    def entrena(self, número_episodios):
+    def ejecuta_episodios_por_lotes(self, número_episodios, número_entornos):
+        """Ejecuta episodios en varias copias del entorno a la vez.
+
+        Argumentos:
+        número_episodios -- entero no negativo que establece el número de
+                            episodios a completar entre todas las copias
+        número_entornos -- número de copias del entorno (ver make_batch_env)
+
+        En cada paso se eligen las acciones y se actualiza la tabla para todas
+        las copias con operaciones vectorizadas. Requiere una DenseQTable.
+        Mientras el registro de estadísticas sea el mismo, una nueva llamada
+        continúa los episodios a medias de la anterior en lugar de crear y
+        reiniciar de nuevo las copias (así lo hace EarlyStopping entre
+        comprobaciones).
+        """
+        if not isinstance(self.tabla_q, DenseQTable):
+            raise ValueError("El entrenamiento por lotes requiere una tabla Q densa")
+        lote = self.lote_en_curso
+        if (lote is not None and lote[0] is self.statistics.episode_log
+                and lote[1] == número_entornos):
+            _, _, entornos, estados_actuales = lote
+            self.statistics.add_pending_batch_episodes(
+                número_episodios - self.statistics.episode_log.size
+            )
+        else:
+            entornos = make_batch_env(self.entorno, número_entornos)
+            estados_actuales = entornos.reset()
+            self.statistics.reset_batch(número_entornos)
+
+        while self.statistics.episode_log.size < número_episodios:
+            acciones = self.política_exploratoria.elige_acciones(
+                estados_actuales, self.entorno.action_space, self.tabla_q
+            )
+            (estados_siguientes, recompensas, terminados, truncados,
+             estados_reinicio) = entornos.step(acciones)
+            self.actualiza_tabla_q_por_lotes(
+                estados_actuales, acciones, recompensas, estados_siguientes
+            )
+            if self.memoria_repeticiones is not None:
+                self.memoria_repeticiones.add_batch(
+                    estados_actuales, acciones, recompensas,
+                    estados_siguientes, terminados
+                )
+                self.repite_experiencia(número_entornos)
+
+            self.statistics.continue_batch(recompensas)
+
+            terminados = numpy.flatnonzero(terminados | truncados)
+            self.statistics.add_batch_episodes(
+                terminados, estados_siguientes,
+                número_episodios - self.statistics.episode_log.size
+            )
+
+            estados_actuales = estados_reinicio
+
+        self.lote_en_curso = (self.statistics.episode_log, número_entornos,
+                              entornos, estados_actuales)
+
+    def ejecuta_episodios_hasta(self, número_episodios):
+        """Ejecuta episodios hasta que se hayan registrado número_episodios."""
+        while self.statistics.episode_log.size < número_episodios:
+            self.ejecuta_episodio()
+
+    def entrena(self, número_episodios, número_entornos=1, parada=None,
+                continuar=False):
         """Ejecuta el algoritmo durante un cierto número de episodios.
 
         Argumentos:
         número_episodios -- entero no negativo que establece el número de
                             episodios a entrenar
+        número_entornos -- número de copias del entorno que se ejecutan a la
+                           vez (por defecto 1, un episodio tras otro)
+        parada -- una instancia de EarlyStopping para detener el
+                  entrenamiento antes si se cumple alguno de sus criterios
+                  (por defecto None, se ejecutan todos los episodios)
+        continuar -- si es True, entrena número_episodios más a partir de
+                     la tabla y estadísticas actuales en lugar de empezar un
+                     registro nuevo
         """
-        self.statistics.reset()
-        for _ in range(número_episodios):
-            self.ejecuta_episodio()
+        if continuar:
+            self.statistics.resume()
+        else:
+            self.statistics.reset()
+        if número_entornos > 1:
+            ejecuta_hasta = partial(self.ejecuta_episodios_por_lotes,
+                                    número_entornos=número_entornos)
+        else:
+            ejecuta_hasta = self.ejecuta_episodios_hasta
+        run_episodes(self.statistics,
+                     self.statistics.episode_log.size + número_episodios,
+                     ejecuta_hasta, self.tabla_q, parada)
 
     def calculate_statistics(self):
         """Calcula las estadísticas a partir de los datos de los episodios."""
@@ -350,4 +742,481 @@ class Q_Learning:
         policy = {}
         for state in self.tabla_q.keys():
             policy[state] = self.get_policy_for_state(state)
-        return policy
\ No newline at end of file
+        return policy
+
+
+class ModeloTabular:
+    """Modelo aprendido de las transiciones observadas en el entorno.
+
+    Guarda cada resultado distinto (estado, acción, recompensa, estado
+    siguiente) una sola vez en arrays de NumPy preasignados, junto con el
+    número de veces que se ha observado, de modo que el modelo conserva la
+    distribución empírica de los entornos estocásticos. La capacidad de los
+    arrays se duplica cuando se llenan. También indexa los resultados de cada
+    par estado-acción y los pares predecesores de cada estado.
+    """
+
+    def __init__(self, tipo_estados=numpy.int64, capacidad=1024):
+        """Crea un modelo vacío.
+
+        Argumentos:
+        tipo_estados -- tipo de NumPy de los estados (object si no son
+                        números enteros)
+        capacidad -- número de resultados para el que se reserva memoria
+                     inicialmente
+        """
+        self.tamaño = 0
+        self.índices_resultados = {}
+        self.índices_pares = {}
+        self.resultados_pares = []
+        self.predecesores = defaultdict(set)
+        self._resultados = {}
+        self._resultados_predecesores = {}
+        self._visitas_pares = numpy.zeros(capacidad)
+        self._estados = numpy.empty(capacidad, dtype=tipo_estados)
+        self._acciones = numpy.empty(capacidad, dtype=numpy.int64)
+        self._recompensas = numpy.empty(capacidad)
+        self._estados_siguientes = numpy.empty(capacidad, dtype=tipo_estados)
+        self._pares = numpy.empty(capacidad, dtype=numpy.int64)
+        self._cuentas = numpy.empty(capacidad)
+        self._acumulados = None
+
+    def registra(self, estado, acción, recompensa, estado_siguiente):
+        """Añade una transición observada al modelo."""
+        resultado = (estado, acción, recompensa, estado_siguiente)
+        índice = self.índices_resultados.get(resultado)
+        par = self.índices_pares.setdefault((estado, acción), len(self.índices_pares))
+        if par == len(self.resultados_pares):
+            self.resultados_pares.append([])
+        if par == len(self._visitas_pares):
+            self._visitas_pares = numpy.concatenate((self._visitas_pares, numpy.zeros(par)))
+        self._visitas_pares[par] += 1
+        if índice is None:
+            if self.tamaño == len(self._acciones):
+                self._amplía()
+            índice = self.tamaño
+            self.índices_resultados[resultado] = índice
+            self._estados[índice] = estado
+            self._acciones[índice] = acción
+            self._recompensas[índice] = recompensa
+            self._estados_siguientes[índice] = estado_siguiente
+            self._pares[índice] = par
+            self._cuentas[índice] = 0
+            self.tamaño += 1
+            self.resultados_pares[par].append(índice)
+            self.predecesores[estado_siguiente].add((estado, acción))
+        self._cuentas[índice] += 1
+        self._acumulados = None
+        self._resultados.pop(par, None)
+        for índice_resultado in self.resultados_pares[par]:
+            self._resultados_predecesores.pop(self._estados_siguientes[índice_resultado], None)
+
+    def _amplía(self):
+        capacidad = 2 * max(len(self._acciones), 1)
+        for nombre in ('_estados', '_acciones', '_recompensas', '_estados_siguientes', '_pares', '_cuentas'):
+            anterior = getattr(self, nombre)
+            nuevo = numpy.empty(capacidad, dtype=anterior.dtype)
+            nuevo[:self.tamaño] = anterior[:self.tamaño]
+            setattr(self, nombre, nuevo)
+
+    def resultados(self, estado, acción):
+        """Devuelve los resultados observados para un par estado-acción.
+
+        Devuelve arrays con la probabilidad estimada, la recompensa y el
+        estado siguiente de cada resultado.
+        """
+        par = self.índices_pares[(estado, acción)]
+        resultados = self._resultados.get(par)
+        if resultados is None:
+            índices = self.resultados_pares[par]
+            resultados = (self._cuentas[índices] / self._visitas_pares[par],
+                          self._recompensas[índices], self._estados_siguientes[índices])
+            self._resultados[par] = resultados
+        return resultados
+
+    def resultados_predecesores(self, estado):
+        """Devuelve los resultados de todos los pares predecesores de un estado.
+
+        Devuelve la lista de pares, arrays con sus estados y sus acciones y
+        los resultados de todos ellos concatenados (ver resultados), junto
+        con el índice en la lista del par al que pertenece cada resultado.
+        """
+        resultados = self._resultados_predecesores.get(estado)
+        if resultados is None:
+            pares = list(self.predecesores[estado])
+            por_par = [self.resultados(*par) for par in pares]
+            estados, acciones = zip(*pares)
+            resultados = (
+                pares,
+                numpy.array(estados, dtype=self._estados.dtype),
+                numpy.array(acciones),
+                numpy.repeat(numpy.arange(len(pares)), [len(r[0]) for r in por_par]),
+                *(numpy.concatenate(columna) for columna in zip(*por_par))
+            )
+            self._resultados_predecesores[estado] = resultados
+        return resultados
+
+    def muestrea(self, generador, n):
+        """Simula n transiciones a partir del modelo.
+
+        Cada par estado-acción observado se elige con la misma probabilidad
+        y su resultado según la frecuencia con que se ha observado. Devuelve
+        arrays con los estados, las acciones, las recompensas y los estados
+        siguientes.
+
+        Argumentos:
+        generador -- un Generator de NumPy
+        n -- número de transiciones simuladas
+        """
+        if self._acumulados is None:
+            pesos = self._cuentas[:self.tamaño] / self._visitas_pares[self._pares[:self.tamaño]]
+            self._acumulados = numpy.cumsum(pesos)
+        índices = numpy.searchsorted(
+            self._acumulados, generador.random(n) * self._acumulados[-1], side='right'
+        )
+        numpy.minimum(índices, self.tamaño - 1, out=índices)
+        return (self._estados[índices], self._acciones[índices],
+                self._recompensas[índices], self._estados_siguientes[índices])
+
+
+class Dyna_Q(Q_Learning):
+    """Implementa el algoritmo Dyna-Q.
+
+    Tras cada actualización con una transición real, la registra en un
+    ModeloTabular y realiza pasos_de_planificación actualizaciones de
+    Q-learning con transiciones simuladas por el modelo. Las transiciones
+    simuladas se muestrean y se aplican como un único lote vectorizado
+    cuando la tabla Q es densa.
+    """
+
+    def __init__(
+            self,
+            entorno,
+            factor_de_descuento,
+            tasa_de_aprendizaje,
+            política_exploratoria,
+            pasos_de_planificación=10,
+            tipo_tabla='auto',
+            semilla=None,
+            estadísticas_en_flujo=False,
+            ventana_estadísticas=100
+    ):
+        """Crea una instancia del algoritmo.
+
+        Argumentos:
+        entorno -- un entorno implementado mediante la API de Gymnasium
+                   (se asume que el espacio de acciones es de tipo Discrete)
+        factor_de_descuento -- un número real entre 0 y 1
+        tasa_de_aprendizaje -- un número real mayor que 0 y menor o igual que 1
+        política_exploratoria -- una instancia de PolíticaEpsilonVoraz
+        pasos_de_planificación -- número de actualizaciones simuladas por
+                                  cada transición real (por defecto 10)
+        tipo_tabla -- almacenamiento de la tabla Q: 'dense', 'dict' o 'auto'
+                      (por defecto, ver make_q_table)
+        semilla -- semilla del generador usado para muestrear el modelo (el
+                   valor por defecto, None, la toma del generador global de
+                   NumPy)
+        estadísticas_en_flujo, ventana_estadísticas -- ver Q_Learning
+        """
+        super().__init__(entorno, factor_de_descuento, tasa_de_aprendizaje,
+                         política_exploratoria, tipo_tabla,
+                         estadísticas_en_flujo=estadísticas_en_flujo,
+                         ventana_estadísticas=ventana_estadísticas)
+        if semilla is None:
+            semilla = numpy.random.randint(2 ** 31)
+        self.pasos_de_planificación = pasos_de_planificación
+        self.generador = numpy.random.default_rng(semilla)
+        self.modelo = ModeloTabular(
+            numpy.int64 if is_enumerable(entorno) else object
+        )
+
+    def actualiza_tabla_q(
+            self,
+            estado_actual,
+            acción,
+            recompensa,
+            estado_siguiente
+    ):
+        """Actualiza la tabla con una transición real y planifica con el modelo."""
+        super().actualiza_tabla_q(
+            estado_actual, acción, recompensa, estado_siguiente
+        )
+        self.modelo.registra(estado_actual, acción, recompensa, estado_siguiente)
+        self.planifica(self.pasos_de_planificación)
+
+    def actualiza_tabla_q_por_lotes(
+            self,
+            estados_actuales,
+            acciones,
+            recompensas,
+            estados_siguientes
+    ):
+        """Actualiza la tabla con un lote de transiciones reales y planifica
+        pasos_de_planificación actualizaciones por cada una."""
+        super().actualiza_tabla_q_por_lotes(
+            estados_actuales, acciones, recompensas, estados_siguientes
+        )
+        for transición in zip(estados_actuales.tolist(), acciones.tolist(),
+                              recompensas.tolist(), estados_siguientes.tolist()):
+            self.modelo.registra(*transición)
+        self.planifica(self.pasos_de_planificación * len(acciones))
+
+    def planifica(self, número_pasos):
+        """Aplica número_pasos actualizaciones con transiciones simuladas."""
+        if número_pasos == 0 or self.modelo.tamaño == 0:
+            return
+        estados, acciones, recompensas, estados_siguientes = (
+            self.modelo.muestrea(self.generador, número_pasos)
+        )
+        if isinstance(self.tabla_q, DenseQTable):
+            super().actualiza_tabla_q_por_lotes(
+                estados, acciones, recompensas, estados_siguientes
+            )
+            return
+        for transición in zip(estados, acciones, recompensas, estados_siguientes):
+            super().actualiza_tabla_q(*transición)
+
+
+class ColaDePrioridad:
+    """Cola de máxima prioridad indexada por elemento.
+
+    Cada elemento aparece a lo sumo una vez: insertarlo de nuevo solo eleva
+    su prioridad. Las entradas desplazadas en el montículo se descartan al
+    extraerlas comparándolas con la prioridad vigente del índice.
+    """
+
+    def __init__(self):
+        self.montículo = []
+        self.prioridades = {}
+        self.contador = itertools.count()
+
+    def __len__(self):
+        return len(self.prioridades)
+
+    def inserta(self, elemento, prioridad):
+        """Inserta un elemento o eleva su prioridad si ya estaba en la cola."""
+        if prioridad <= self.prioridades.get(elemento, -numpy.inf):
+            return
+        self.prioridades[elemento] = prioridad
+        heapq.heappush(self.montículo, (-prioridad, next(self.contador), elemento))
+
+    def extrae(self):
+        """Extrae y devuelve el elemento de mayor prioridad."""
+        while True:
+            prioridad, _, elemento = heapq.heappop(self.montículo)
+            if self.prioridades.get(elemento) == -prioridad:
+                del self.prioridades[elemento]
+                return elemento
+
+
+class Barrido_Priorizado(Q_Learning):
+    """Implementa el algoritmo de barrido priorizado (prioritized sweeping).
+
+    Cada transición real se registra en un ModeloTabular y el par
+    estado-acción se añade a una ColaDePrioridad según el valor absoluto de
+    su error DT. En cada paso se actualizan como máximo
+    pasos_de_planificación pares de la cola, en orden de prioridad, con el
+    valor esperado según el modelo, y tras cada actualización se reevalúan
+    los predecesores del estado actualizado. Así los cambios de valor solo
+    se propagan hacia atrás por donde son relevantes.
+    """
+
+    def __init__(
+            self,
+            entorno,
+            factor_de_descuento,
+            tasa_de_aprendizaje,
+            política_exploratoria,
+            pasos_de_planificación=10,
+            umbral=1e-4,
+            tipo_tabla='auto',
+            estadísticas_en_flujo=False,
+            ventana_estadísticas=100
+    ):
+        """Crea una instancia del algoritmo.
+
+        Argumentos:
+        entorno -- un entorno implementado mediante la API de Gymnasium
+                   (se asume que el espacio de acciones es de tipo Discrete)
+        factor_de_descuento -- un número real entre 0 y 1
+        tasa_de_aprendizaje -- un número real mayor que 0 y menor o igual que 1
+        política_exploratoria -- una instancia de PolíticaEpsilonVoraz
+        pasos_de_planificación -- número máximo de pares actualizados por
+                                  cada transición real (por defecto 10)
+        umbral -- error DT mínimo para que un par entre en la cola
+        tipo_tabla -- almacenamiento de la tabla Q: 'dense', 'dict' o 'auto'
+                      (por defecto, ver make_q_table)
+        estadísticas_en_flujo, ventana_estadísticas -- ver Q_Learning
+        """
+        super().__init__(entorno, factor_de_descuento, tasa_de_aprendizaje,
+                         política_exploratoria, tipo_tabla,
+                         estadísticas_en_flujo=estadísticas_en_flujo,
+                         ventana_estadísticas=ventana_estadísticas)
+        self.pasos_de_planificación = pasos_de_planificación
+        self.umbral = umbral
+        self.cola = ColaDePrioridad()
+        self.actualizaciones = 0
+        self.modelo = ModeloTabular(
+            numpy.int64 if is_enumerable(entorno) else object
+        )
+
+    def valor_esperado(self, estado, acción):
+        """Devuelve el valor esperado de un par según el modelo."""
+        probabilidades, recompensas, estados_siguientes = (
+            self.modelo.resultados(estado, acción)
+        )
+        if isinstance(self.tabla_q, DenseQTable):
+            máximos = self.tabla_q.array[estados_siguientes].max(axis=1)
+        else:
+            máximos = numpy.array([self.tabla_q[siguiente].max()
+                                   for siguiente in estados_siguientes])
+        return probabilidades @ (recompensas + self.factor_de_descuento * máximos)
+
+    def prioriza(self, estado, acción):
+        """Añade un par a la cola si su error DT supera el umbral."""
+        prioridad = abs(self.valor_esperado(estado, acción) -
+                        self.tabla_q[estado][acción])
+        if prioridad > self.umbral:
+            self.cola.inserta((estado, acción), prioridad)
+
+    def actualiza_tabla_q(
+            self,
+            estado_actual,
+            acción,
+            recompensa,
+            estado_siguiente
+    ):
+        """Registra una transición real y barre los pares más prioritarios."""
+        self.modelo.registra(estado_actual, acción, recompensa, estado_siguiente)
+        self.prioriza(estado_actual, acción)
+        self.barre(self.pasos_de_planificación)
+
+    def actualiza_tabla_q_por_lotes(
+            self,
+            estados_actuales,
+            acciones,
+            recompensas,
+            estados_siguientes
+    ):
+        """Aplica las transiciones de un lote una tras otra (ver actualiza_tabla_q)."""
+        for transición in zip(estados_actuales.tolist(), acciones.tolist(),
+                              recompensas.tolist(), estados_siguientes.tolist()):
+            self.actualiza_tabla_q(*transición)
+
+    def barre(self, número_pasos):
+        """Actualiza como máximo número_pasos pares en orden de prioridad."""
+        for _ in range(número_pasos):
+            if not self.cola:
+                break
+            estado, acción = self.cola.extrae()
+            self.tabla_q[estado][acción] += self.tasa_de_aprendizaje * (
+                    self.valor_esperado(estado, acción) -
+                    self.tabla_q[estado][acción]
+            )
+            self.actualizaciones += 1
+            self.prioriza_predecesores(estado)
+
+    def prioriza_predecesores(self, estado):
+        """Reevalúa en la cola todos los pares que conducen a un estado."""
+        if not self.modelo.predecesores.get(estado):
+            return
+        if not isinstance(self.tabla_q, DenseQTable):
+            for predecesor, acción_predecesor in list(self.modelo.predecesores[estado]):
+                self.prioriza(predecesor, acción_predecesor)
+            return
+        (pares, estados, acciones, pares_resultados, probabilidades,
+         recompensas, estados_siguientes) = self.modelo.resultados_predecesores(estado)
+        tabla = self.tabla_q.array
+        valores = numpy.bincount(
+            pares_resultados,
+            probabilidades * (recompensas + self.factor_de_descuento *
+                              tabla[estados_siguientes].max(axis=1)),
+            len(pares)
+        )
+        prioridades = numpy.abs(valores - tabla[estados, acciones])
+        for par, prioridad in zip(pares, prioridades.tolist()):
+            if prioridad > self.umbral:
+                self.cola.inserta(par, prioridad)
+
+
+class Q_Lambda(Q_Learning):
+    """Implementa Q(λ) de Watkins: Q-learning con trazas de elegibilidad.
+
+    Cada error DT se aplica a todos los pares con traza activa. Como el
+    objetivo de Q-learning supone que se sigue la política voraz, las trazas
+    se descartan en cuanto se elige una acción exploratoria.
+    """
+
+    def __init__(
+            self,
+            entorno,
+            factor_de_descuento,
+            tasa_de_aprendizaje,
+            política_exploratoria,
+            lambda_=0.9,
+            modo_trazas='replacing',
+            umbral_trazas=1e-4,
+            tipo_tabla='auto',
+            estadísticas_en_flujo=False,
+            ventana_estadísticas=100
+    ):
+        """Crea una instancia del algoritmo.
+
+        Argumentos:
+        entorno -- un entorno implementado mediante la API de Gymnasium
+                   (se asume que el espacio de acciones es de tipo Discrete)
+        factor_de_descuento -- un número real entre 0 y 1
+        tasa_de_aprendizaje -- un número real mayor que 0 y menor o igual que 1
+        política_exploratoria -- una instancia de PolíticaEpsilonVoraz
+        lambda_ -- factor de decaimiento de las trazas, entre 0 y 1
+        modo_trazas -- 'replacing' (por defecto) o 'accumulating' (ver
+                       EligibilityTraces)
+        umbral_trazas -- valor por debajo del cual se descarta una traza
+        tipo_tabla -- almacenamiento de la tabla Q: 'dense', 'dict' o 'auto'
+                      (por defecto, ver make_q_table)
+        estadísticas_en_flujo, ventana_estadísticas -- ver Q_Learning
+        """
+        super().__init__(entorno, factor_de_descuento, tasa_de_aprendizaje,
+                         política_exploratoria, tipo_tabla,
+                         estadísticas_en_flujo=estadísticas_en_flujo,
+                         ventana_estadísticas=ventana_estadísticas)
+        self.lambda_ = lambda_
+        self.trazas = EligibilityTraces(
+            modo_trazas, umbral_trazas,
+            state_dtype=numpy.int64 if is_enumerable(entorno) else object
+        )
+
+    def actualiza_tabla_q(
+            self,
+            estado_actual,
+            acción,
+            recompensa,
+            estado_siguiente
+    ):
+        """Aplica el error DT de una transición a todos los pares con traza activa."""
+        error_DT = (
+                recompensa +
+                self.factor_de_descuento * self.tabla_q[estado_siguiente].max() -
+                self.tabla_q[estado_actual][acción]
+        )
+        self.trazas.visit(estado_actual, acción)
+        self.trazas.apply(self.tabla_q, self.tasa_de_aprendizaje * error_DT)
+        self.trazas.decay(self.factor_de_descuento * self.lambda_)
+
+    def elige_acción(self, estado, info):
+        """Elige una acción y descarta las trazas si no es voraz (ver Q_Learning.elige_acción)."""
+        acción = super().elige_acción(estado, info)
+        valores = self.tabla_q[estado]
+        if valores[acción] < valores.max():
+            self.trazas.clear()
+        return acción
+
+    def ejecuta_episodio(self):
+        """Ejecuta un episodio partiendo de trazas vacías (ver Q_Learning.ejecuta_episodio)."""
+        self.trazas.clear()
+        super().ejecuta_episodio()
+
+    def ejecuta_episodios_por_lotes(self, número_episodios, número_entornos):
+        raise ValueError(
+            "Las trazas de elegibilidad no admiten entrenamiento por lotes"
+        )
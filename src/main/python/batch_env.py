@@ -0,0 +1,69 @@
+import copy
+
+import numpy
+
+
+class SyncBatchEnv:
+    """Ejecuta varias copias de un entorno en paso sincronizado.
+
+    Cada copia se reinicia automáticamente al terminar su episodio, de modo
+    que todas avanzan siempre a la vez. Los estados se devuelven como arrays
+    con un elemento por copia.
+    """
+
+    def __init__(self, env, num_envs):
+        """Crea las copias del entorno.
+
+        Argumentos:
+        env -- entorno implementado mediante la API de Gymnasium
+        num_envs -- número de copias que se ejecutan a la vez
+        """
+        self.envs = [copy.deepcopy(env) for _ in range(num_envs)]
+        self.num_envs = num_envs
+        self.action_space = env.action_space
+        self.observation_space = env.observation_space
+
+    def reset(self):
+        """Reinicia todas las copias y devuelve sus estados iniciales.
+
+        Cada copia recibe una semilla distinta tomada del generador global de
+        NumPy, ya que al copiar el entorno también se copia su generador.
+        """
+        seeds = numpy.random.randint(2 ** 31, size=self.num_envs)
+        return numpy.array([env.reset(seed=int(seed))[0] for env, seed in zip(self.envs, seeds)])
+
+    def step(self, actions):
+        """Aplica una acción en cada copia.
+
+        Argumentos:
+        actions -- array con una acción por copia
+
+        Devuelve los estados siguientes, las recompensas, las señales de
+        terminación y de truncado, y los estados desde los que continúa cada
+        copia (el estado siguiente o, si el episodio ha acabado, el estado
+        inicial del nuevo episodio).
+        """
+        next_states = []
+        rewards = numpy.empty(self.num_envs)
+        terminated = numpy.empty(self.num_envs, dtype=bool)
+        truncated = numpy.empty(self.num_envs, dtype=bool)
+        reset_states = []
+        for i, (env, action) in enumerate(zip(self.envs, actions)):
+            next_state, rewards[i], terminated[i], truncated[i], _ = env.step(action)
+            next_states.append(next_state)
+            if terminated[i] or truncated[i]:
+                next_state, _ = env.reset()
+            reset_states.append(next_state)
+        return numpy.array(next_states), rewards, terminated, truncated, numpy.array(reset_states)
+
+
+def make_batch_env(env, num_envs):
+    """Devuelve un lote de num_envs entornos equivalentes a env.
+
+    Si el entorno sabe simularse por lotes (método batch), se usa esa
+    implementación; en otro caso se ejecutan copias del entorno con
+    SyncBatchEnv.
+    """
+    if hasattr(env, 'batch'):
+        return env.batch(num_envs)
+    return SyncBatchEnv(env, num_envs)
@@ -1,9 +1,26 @@
-from collections import defaultdict
+from functools import partial
 
 import numpy
 import numpy as np
 
+from src.main.python.batch_env import make_batch_env
+from src.main.python.early_stopping import run_episodes
 from src.main.python.environment_statistic import EnvironmentStatistic
+from src.main.python.q_table import DenseQTable, make_q_table
+
+
+class _SummedQTable(dict):
+    """Suma de dos tablas Q por diccionario, creada por estado bajo demanda."""
+
+    def __init__(self, q1_table, q2_table):
+        super().__init__()
+        self.q1_table = q1_table
+        self.q2_table = q2_table
+
+    def __missing__(self, state):
+        values = self.q1_table[state] + self.q2_table[state]
+        self[state] = values
+        return values
 
 
 class DoubleQLearning:
@@ -13,7 +30,12 @@ class DoubleQLearning:
             env,
             discount_factor,
             learning_factor,
-            export_policy
+            export_policy,
+            table_type='auto',
+            replay_buffer=None,
+            replay_batch_size=32,
+            streaming_statistics=False,
+            statistics_window=100
     ):
         """
         Crea una instacia del algoritmo.
@@ -23,52 +45,65 @@ class DoubleQLearning:
         discount_factor -- Factor de descuento.
         learning_factor -- Factor de aprendizaje.
         export_policy -- Política de exportación.
+        table_type -- Almacenamiento de la tabla Q: 'dense', 'dict' o 'auto' (ver make_q_table).
+        replay_buffer -- Instancia de ReplayBuffer; si se indica, tras cada paso real se repite
+                         un lote de transiciones guardadas (requiere tablas densas).
+        replay_batch_size -- Número de transiciones repetidas por cada paso real.
+        streaming_statistics -- Si es True, las estadísticas se acumulan en memoria constante en lugar de
+                                guardar cada episodio (ver EnvironmentStatistic).
+        statistics_window -- Número de episodios de las estadísticas móviles.
         """
         self.q1_table = None
         self.env = env
         self.discount_factor = discount_factor
         self.learning_factor = learning_factor
         self.export_policy = export_policy
-        self.statistics = EnvironmentStatistic(env)
+        self.table_type = table_type
+        self.statistics = EnvironmentStatistic(env, streaming_statistics, statistics_window)
+        # Lote de entornos a medias entre dos llamadas a execute_batch_episodes
+        self.batch_run = None
         self.q1_table = self._initialize_q_table()
         self.q2_table = self._initialize_q_table()
+        self.q_table = self._initialize_summed_q_table()
+        self.replay_buffer = replay_buffer
+        self.replay_batch_size = replay_batch_size
+        if replay_buffer is not None:
+            if not isinstance(self.q_table, DenseQTable):
+                raise ValueError("La memoria de repeticiones requiere tablas Q densas")
+            self.replay_generator = np.random.default_rng(np.random.randint(2 ** 31))
 
     def _initialize_q_table(self):
         # Crea las tablas Q con valores aleatorios en el rango [0, 1]
         cantidad_acciones = self.env.action_space.n
-        q_table = defaultdict(lambda: numpy.random.uniform(0, 1, cantidad_acciones))
+        q_table = make_q_table(self.env, lambda shape: numpy.random.uniform(0, 1, shape), self.table_type)
         # Para el estado terminal, las acciones tienen valor 0
         for estado in self.statistics.get_terminal_states():
             q_table[estado] = numpy.zeros(cantidad_acciones)
         return q_table
 
-    def choose_action(self, state, info):
-        """Elige una acción para un estado dado.
+    def _initialize_summed_q_table(self):
+        # La suma Q1 + Q2 se mantiene actualizada tras cada actualización
+        if isinstance(self.q1_table, DenseQTable):
+            return DenseQTable(self.q1_table.array + self.q2_table.array)
+        return _SummedQTable(self.q1_table, self.q2_table)
 
-                Argumentos:
-                state -- Estado.
-                info -- Información adicional.
-                """
-        combined_q_values = {}
-        combined_q_values.update(self.q1_table[state])
-        combined_q_values.update(self.q2_table[state])
+    def choose_action(self, state, info):
+        """Elige una acción para un estado dado según la suma de ambas tablas.
 
+        Argumentos:
+        state -- Estado.
+        info -- Información adicional.
+        """
         action = self.export_policy.elige_acción(
             state,
             self.env.action_space,
-            self.get_q_table()
+            self.q_table
         )
         return action
 
     def get_q_table(self):
-        keys = set(self.q1_table.keys()).union(set(self.q2_table.keys()))
-        q_table = {}
-        for key in keys:
-            action_q1_table = self.q1_table[key]
-            action_q2_table = self.q2_table[key]
-            action_q_table = [q1 + q2 for q1, q2 in zip(action_q1_table, action_q2_table)]
-            q_table[key] = action_q_table
-        return q_table
+        """Devuelve la tabla con la suma de las dos tablas Q."""
+        return self.q_table
 
     def update_q_tables(self, state, action, reward, next_state, next_action):
         """Actualiza las tablas Q utilizando el algoritmo Double Q-Learning."""
@@ -78,6 +113,7 @@ class DoubleQLearning:
             self.q1_table = self.update_q_table(self.q1_table, action, next_state, reward, state, next_action)
         else:
             self.q2_table = self.update_q_table(self.q2_table, action, next_state, reward, state, next_action)
+        self.q_table[state][action] = self.q1_table[state][action] + self.q2_table[state][action]
 
     def update_q_table(self, q_table, action, next_state, reward, state, next_action):
         next_action = np.argmax(q_table[next_state])
@@ -88,6 +124,93 @@ class DoubleQLearning:
                     reward + self.discount_factor * next_q_value - q_value)
         return q_table
 
+    def update_q_tables_batch(self, states, actions, rewards, next_states, terminated=None,
+                              average_duplicates=False, weights=None):
+        """Actualiza las tablas Q con un lote de transiciones a la vez.
+
+        Cada transición actualiza una de las dos tablas elegida al azar. Si un
+        par estado-acción se repite en el lote, sus incrementos se suman (o se
+        promedian con average_duplicates). Las transiciones marcadas en
+        terminated (opcional) no suman el valor del estado siguiente y, si se
+        indican weights, el incremento de cada transición se multiplica por su
+        peso (ver ReplayBuffer.sample). Devuelve el error DT de cada transición.
+        """
+        use_q1 = np.random.uniform(0, 1, len(states)) < 0.5
+        td_errors = np.empty(len(states))
+        for q_table, selected in ((self.q1_table, use_q1), (self.q2_table, ~use_q1)):
+            table = q_table.array
+            s, a, r, next_s = states[selected], actions[selected], rewards[selected], next_states[selected]
+            next_values = table[next_s].max(axis=1)
+            if terminated is not None:
+                next_values = np.where(terminated[selected], 0, next_values)
+            td_errors[selected] = r + self.discount_factor * next_values - table[s, a]
+            increments = self.learning_factor * td_errors[selected]
+            if weights is not None:
+                increments = increments * weights[selected]
+            if average_duplicates:
+                _, inverse, counts = np.unique(s * table.shape[1] + a, return_inverse=True, return_counts=True)
+                increments = increments / counts[inverse]
+            np.add.at(table, (s, a), increments)
+        self.q_table.array[states, actions] = self.q1_table.array[states, actions] + self.q2_table.array[states, actions]
+        return td_errors
+
+    def replay(self, num_steps=1):
+        """Repite replay_batch_size transiciones de la memoria por cada paso real.
+
+        Las transiciones se aplican como un único lote vectorizado,
+        promediando los incrementos de los pares repetidos y escalándolos por
+        sus pesos de muestreo por importancia, y, si la memoria es
+        priorizada, se actualizan sus prioridades con los nuevos errores DT.
+        """
+        if len(self.replay_buffer) < self.replay_batch_size:
+            return
+        indices, weights, *transitions = self.replay_buffer.sample(self.replay_generator,
+                                                                   self.replay_batch_size * num_steps)
+        td_errors = self.update_q_tables_batch(*transitions, average_duplicates=True, weights=weights)
+        if self.replay_buffer.prioritized:
+            self.replay_buffer.update_priorities(indices, td_errors)
+
+    def execute_batch_episodes(self, num_episodes, num_envs):
+        """Ejecuta episodios en varias copias del entorno a la vez.
+
+        Argumentos:
+        num_episodes -- número de episodios a completar entre todas las copias
+        num_envs -- número de copias del entorno (ver make_batch_env)
+
+        Requiere tablas DenseQTable. Mientras el registro de estadísticas sea el mismo, una nueva
+        llamada continúa los episodios a medias de la anterior (ver
+        Q_Learning.ejecuta_episodios_por_lotes).
+        """
+        if not isinstance(self.q_table, DenseQTable):
+            raise ValueError("El entrenamiento por lotes requiere una tabla Q densa")
+        batch_run = self.batch_run
+        if batch_run is not None and batch_run[0] is self.statistics.episode_log and batch_run[1] == num_envs:
+            _, _, envs, current_states = batch_run
+            self.statistics.add_pending_batch_episodes(num_episodes - self.statistics.episode_log.size)
+        else:
+            envs = make_batch_env(self.env, num_envs)
+            current_states = envs.reset()
+            self.statistics.reset_batch(num_envs)
+
+        while self.statistics.episode_log.size < num_episodes:
+            actions = self.export_policy.elige_acciones(current_states, self.env.action_space, self.q_table)
+
+            next_states, rewards, terminated, truncated, reset_states = envs.step(actions)
+
+            self.update_q_tables_batch(current_states, actions, rewards, next_states)
+            if self.replay_buffer is not None:
+                self.replay_buffer.add_batch(current_states, actions, rewards, next_states, terminated)
+                self.replay(num_envs)
+
+            self.statistics.continue_batch(rewards)
+
+            done = np.flatnonzero(terminated | truncated)
+            self.statistics.add_batch_episodes(done, next_states, num_episodes - self.statistics.episode_log.size)
+
+            current_states = reset_states
+
+        self.batch_run = (self.statistics.episode_log, num_envs, envs, current_states)
+
     def execute_episode(self):
         """Ejecuta un episodio para el entorno.
 
@@ -101,29 +224,50 @@ class DoubleQLearning:
         while True:
             action = self.choose_action(current_state, info)
 
-            next_state, reward, truncated, done, info = self.env.step(action)
+            next_state, reward, terminated, truncated, info = self.env.step(action)
 
             next_action = self.choose_action(next_state, info)
 
             self.update_q_tables(current_state, action, reward, next_state, next_action)
+            if self.replay_buffer is not None:
+                self.replay_buffer.add(current_state, action, reward, next_state, terminated)
+                self.replay()
 
             self.statistics.continue_episode(reward)
 
-            if done or truncated:
+            if terminated or truncated:
                 self.statistics.add_episode(next_state)
                 break
 
             current_state = next_state
 
-    def train(self, num_episodes):
+    def execute_until(self, num_episodes):
+        """Ejecuta episodios hasta que se hayan registrado num_episodes."""
+        while self.statistics.episode_log.size < num_episodes:
+            self.execute_episode()
+
+    def train(self, num_episodes, num_envs=1, early_stopping=None, resume=False):
         """Ejecuta el algoritmo durante un cierto número de episodios.
 
         Argumentos:
         num_episodes -- entero no negativo que establece el número de episodios a entrenar
+        num_envs -- número de copias del entorno que se ejecutan a la vez (por defecto 1)
+        early_stopping -- instancia de EarlyStopping para detener el entrenamiento antes si se
+                          cumple alguno de sus criterios (por defecto None, se ejecutan todos los
+                          episodios)
+        resume -- si es True, entrena num_episodes más a partir de las tablas y estadísticas
+                  actuales en lugar de empezar un registro nuevo
         """
-        self.statistics.reset()
-        for _ in range(num_episodes):
-            self.execute_episode()
+        if resume:
+            self.statistics.resume()
+        else:
+            self.statistics.reset()
+        if num_envs > 1:
+            execute_until = partial(self.execute_batch_episodes, num_envs=num_envs)
+        else:
+            execute_until = self.execute_until
+        run_episodes(self.statistics, self.statistics.episode_log.size + num_episodes, execute_until, self.q_table,
+                     early_stopping)
 
     def calculate_statistics(self):
         """Calcula las estadísticas a partir de los datos de los episodios."""
@@ -135,7 +279,7 @@ class DoubleQLearning:
         Argumentos:
         state -- Estado para el que se desea obtener la política.
         """
-        q_values = self.get_q_table()[state]
+        q_values = self.q_table[state]
         max_q_value = numpy.max(q_values)
         best_actions = numpy.where(q_values == max_q_value)[0]
         policy = numpy.zeros_like(q_values)
@@ -145,6 +289,6 @@ class DoubleQLearning:
     def get_policy(self):
         """Devuelve la política elegida para todos los estados."""
         policy = {}
-        for state in self.get_q_table().keys():
+        for state in self.q_table.keys():
             policy[state] = self.get_policy_for_state(state)
         return policy
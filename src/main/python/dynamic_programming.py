@@ -0,0 +1,186 @@
+from abc import ABC, abstractmethod
+
+import numpy
+
+from src.main.python.batch_env import make_batch_env
+from src.main.python.environment_statistic import EnvironmentStatistic
+from src.main.python.q_table import DenseQTable
+from src.main.python.tabular_model import TabularModel
+
+
+class DynamicProgramming(ABC):
+    """Base de los algoritmos de programación dinámica sobre el modelo env.P.
+
+    El modelo se compila una sola vez en dos tensores densos: la recompensa
+    esperada de cada par estado-acción, de forma (estados, acciones), y la
+    probabilidad de continuar en cada estado siguiente, de forma (estados,
+    acciones, estados), sin contar las transiciones que terminan el episodio.
+    Las subclases calculan la tabla Q óptima en solve; train la calcula y
+    después ejecuta episodios con la política voraz para obtener las mismas
+    estadísticas que el resto de agentes.
+    """
+
+    def __init__(self, env, discount_factor, tolerance=1e-8, max_iterations=10000, streaming_statistics=False,
+                 statistics_window=100):
+        """
+        Crea una instancia del algoritmo.
+
+        Argumentos:
+        env -- Entorno con espacios Discrete y modelo en env.P.
+        discount_factor -- Factor de descuento.
+        tolerance -- Variación máxima de los valores para considerar que han convergido.
+        max_iterations -- Número máximo de iteraciones.
+        streaming_statistics -- Si es True, las estadísticas se acumulan en memoria constante (ver
+                                EnvironmentStatistic).
+        statistics_window -- Número de episodios de las estadísticas móviles.
+        """
+        self.env = env
+        self.discount_factor = discount_factor
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.statistics = EnvironmentStatistic(env, streaming_statistics, statistics_window)
+        self.model = TabularModel(env)
+        self.expected_rewards = self.model.expected_rewards
+        self.transitions = numpy.zeros((self.model.num_states, self.model.num_actions, self.model.num_states))
+        states, actions, _ = numpy.indices(self.model.next_states.shape)
+        numpy.add.at(self.transitions, (states, actions, self.model.next_states), self.model.continuation_probabilities)
+        self.q_table = DenseQTable(numpy.zeros((self.model.num_states, self.model.num_actions)))
+        self.iterations = 0
+
+    def q_values(self, values):
+        """Devuelve la tabla Q que corresponde a una función de valor de los estados."""
+        return self.expected_rewards + self.discount_factor * (self.transitions @ values)
+
+    @abstractmethod
+    def solve(self):
+        """Calcula la tabla Q óptima y la devuelve."""
+
+    def choose_actions(self, states):
+        """Elige la acción voraz para cada estado de un lote."""
+        return numpy.argmax(self.q_table.array[states], axis=1)
+
+    def execute_episode(self):
+        """Ejecuta un episodio siguiendo la política voraz."""
+        state, info = self.env.reset()
+        self.statistics.reset_episode()
+        while True:
+            action = int(numpy.argmax(self.q_table[state]))
+            state, reward, terminated, truncated, info = self.env.step(action)
+            self.statistics.continue_episode(reward)
+            if terminated or truncated:
+                self.statistics.add_episode(state)
+                break
+
+    def execute_batch_episodes(self, num_episodes, num_envs):
+        """Ejecuta episodios con la política voraz en varias copias del entorno a la vez."""
+        envs = make_batch_env(self.env, num_envs)
+        states = envs.reset()
+        self.statistics.reset_batch(num_envs)
+        while self.statistics.episode_log.size < num_episodes:
+            next_states, rewards, terminated, truncated, states = envs.step(self.choose_actions(states))
+            self.statistics.continue_batch(rewards)
+            done = numpy.flatnonzero(terminated | truncated)
+            self.statistics.add_batch_episodes(done, next_states, num_episodes - self.statistics.episode_log.size)
+
+    def train(self, num_episodes, num_envs=1):
+        """Resuelve el modelo y evalúa la política voraz resultante.
+
+        Argumentos:
+        num_episodes -- número de episodios con los que se calculan las estadísticas
+        num_envs -- número de copias del entorno que se ejecutan a la vez (por defecto 1)
+        """
+        self.solve()
+        self.statistics.reset()
+        if num_envs > 1:
+            self.execute_batch_episodes(num_episodes, num_envs)
+            return
+        for _ in range(num_episodes):
+            self.execute_episode()
+
+    def calculate_statistics(self):
+        """Calcula las estadísticas a partir de los datos de los episodios."""
+        return self.statistics.calculate_statistics()
+
+    def get_policy_for_state(self, state):
+        """Devuelve la política elegida para un estado.
+
+        Argumentos:
+        state -- Estado para el que se desea obtener la política.
+        """
+        q_values = self.q_table[state]
+        best_actions = numpy.flatnonzero(q_values == numpy.max(q_values))
+        policy = numpy.zeros_like(q_values)
+        policy[best_actions] = 1.0 / len(best_actions)
+        return policy
+
+    def get_policy(self):
+        """Devuelve la política elegida para todos los estados."""
+        return {state: self.get_policy_for_state(state) for state in self.q_table.keys()}
+
+
+class ValueIteration(DynamicProgramming):
+    """Iteración de valores: aplica la ecuación de optimalidad de Bellman a
+    todos los estados a la vez hasta que los valores dejan de cambiar."""
+
+    def solve(self):
+        """Calcula la tabla Q óptima y la devuelve."""
+        values = numpy.zeros(self.model.num_states)
+        for iteration in range(1, self.max_iterations + 1):
+            self.iterations = iteration
+            q_values = self.q_values(values)
+            new_values = q_values.max(axis=1)
+            converged = numpy.max(numpy.abs(new_values - values)) < self.tolerance
+            values = new_values
+            if converged:
+                break
+        self.q_table.array[...] = self.q_values(values)
+        return self.q_table
+
+
+class PolicyIteration(DynamicProgramming):
+    """Iteración de políticas: alterna la evaluación exacta de una política
+    determinista con su mejora voraz hasta que la política no cambia.
+
+    Con factor de descuento menor que 1 la evaluación resuelve el sistema
+    lineal (I - γ P_π) V = R_π; con factor 1 el sistema puede ser singular y
+    se evalúa de forma iterativa hasta la tolerancia.
+    """
+
+    def evaluate_policy(self, policy):
+        """Devuelve la función de valor de una política determinista.
+
+        Argumentos:
+        policy -- array con la acción elegida en cada estado
+        """
+        states = numpy.arange(self.model.num_states)
+        rewards = self.expected_rewards[states, policy]
+        transitions = self.transitions[states, policy]
+        if self.discount_factor < 1:
+            return numpy.linalg.solve(numpy.eye(self.model.num_states) - self.discount_factor * transitions, rewards)
+        values = numpy.zeros(self.model.num_states)
+        for _ in range(self.max_iterations):
+            new_values = rewards + self.discount_factor * (transitions @ values)
+            converged = numpy.max(numpy.abs(new_values - values)) < self.tolerance
+            values = new_values
+            if converged:
+                break
+        return values
+
+    def solve(self):
+        """Calcula la tabla Q óptima y la devuelve."""
+        states = numpy.arange(self.model.num_states)
+        policy = numpy.zeros(self.model.num_states, dtype=numpy.int64)
+        for iteration in range(1, self.max_iterations + 1):
+            self.iterations = iteration
+            q_values = self.q_values(self.evaluate_policy(policy))
+            # Se conserva la acción actual si sigue siendo óptima para evitar
+            # alternar entre acciones empatadas indefinidamente
+            best_values = q_values.max(axis=1)
+            new_policy = numpy.argmax(q_values, axis=1)
+            keep = q_values[states, policy] >= best_values - self.tolerance
+            new_policy[keep] = policy[keep]
+            if numpy.array_equal(new_policy, policy):
+                break
+            policy = new_policy
+        self.q_table.array[...] = q_values
+        return self.q_table
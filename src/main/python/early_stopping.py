@@ -0,0 +1,122 @@
+import time
+
+import numpy
+
+from src.main.python.q_table import DenseQTable
+
+
+class EarlyStopping:
+    """Criterios de parada anticipada del entrenamiento.
+
+    Se comprueban cada check_every episodios, con un coste proporcional al
+    tamaño de la tabla Q y no al número de episodios. El entrenamiento se
+    detiene con el primer criterio que se cumpla:
+
+    'q_converged' -- el mayor cambio absoluto de un valor de la tabla Q desde
+                     la comprobación anterior es menor que q_tolerance
+    'plateau' -- la tasa de éxito móvil (ver EnvironmentStatistic.window) no
+                 ha mejorado al menos min_improvement puntos en patience
+                 comprobaciones seguidas
+    'time_budget' -- han pasado más de time_budget segundos desde el inicio
+    """
+
+    def __init__(self, check_every=100, q_tolerance=None, patience=None, min_improvement=1.0, time_budget=None):
+        """Configura los criterios; los que valen None no se comprueban.
+
+        Argumentos:
+        check_every -- número de episodios entre dos comprobaciones
+        q_tolerance -- cambio máximo de la tabla Q para considerarla convergida
+        patience -- número de comprobaciones seguidas sin mejora de la tasa de
+                    éxito móvil tras las que se detiene el entrenamiento
+        min_improvement -- mejora mínima, en puntos porcentuales, de la tasa
+                           de éxito móvil
+        time_budget -- tiempo máximo de entrenamiento, en segundos
+        """
+        self.check_every = check_every
+        self.q_tolerance = q_tolerance
+        self.patience = patience
+        self.min_improvement = min_improvement
+        self.time_budget = time_budget
+
+    def start(self, q_table):
+        """Prepara los criterios al comenzar un entrenamiento."""
+        self.start_time = time.time()
+        self.best_success_rate = -numpy.inf
+        self.checks_without_improvement = 0
+        self.snapshot = _snapshot(q_table) if self.q_tolerance is not None else None
+
+    def check(self, statistics, q_table):
+        """Devuelve el motivo de la parada o None si el entrenamiento debe seguir."""
+        if self.q_tolerance is not None:
+            snapshot = _snapshot(q_table)
+            change = _max_change(self.snapshot, snapshot)
+            self.snapshot = snapshot
+            if change < self.q_tolerance:
+                return 'q_converged'
+        if self.patience is not None:
+            success_rate = statistics.calculate_rolling_statistics()['rolling_success_rate']
+            if success_rate >= self.best_success_rate + self.min_improvement:
+                self.best_success_rate = success_rate
+                self.checks_without_improvement = 0
+            else:
+                self.checks_without_improvement += 1
+                if self.checks_without_improvement >= self.patience:
+                    return 'plateau'
+        if self.time_budget is not None and time.time() - self.start_time > self.time_budget:
+            return 'time_budget'
+        return None
+
+
+def _snapshot(q_table):
+    if isinstance(q_table, DenseQTable):
+        return q_table.array.copy()
+    return {state: numpy.array(values) for state, values in q_table.items()}
+
+
+def _max_change(old, new):
+    if isinstance(new, numpy.ndarray):
+        return _entry_change(old, new)
+    # Un estado que no estaba en la comprobación anterior cuenta como cambio
+    if new.keys() != old.keys():
+        return numpy.inf
+    return max((_entry_change(old[state], new[state]) for state in new), default=0.0)
+
+
+def _entry_change(old, new):
+    # Los valores no finitos (como el -inf de los pares que Montecarlo_IE aún
+    # no ha visitado) darían NaN al restarse: solo se restan los que son
+    # finitos en ambas tablas, y pasar de no finito a finito es un cambio
+    # ilimitado
+    finite = numpy.isfinite(old) & numpy.isfinite(new)
+    if numpy.any(~finite & (old != new)):
+        return numpy.inf
+    if not numpy.any(finite):
+        return 0.0
+    return numpy.max(numpy.abs(new[finite] - old[finite]))
+
+
+def run_episodes(statistics, num_episodes, execute_until, q_table, early_stopping=None):
+    """Entrena hasta completar num_episodes o hasta que se cumpla un criterio de parada.
+
+    Argumentos:
+    statistics -- EnvironmentStatistic del agente, ya reiniciado
+    num_episodes -- número máximo de episodios
+    execute_until -- función que ejecuta episodios hasta que el registro de
+                     statistics contiene el número de episodios que recibe
+    q_table -- tabla Q que se vigila para el criterio 'q_converged'
+    early_stopping -- instancia de EarlyStopping o None para ejecutar todos
+                      los episodios
+
+    El motivo y el episodio de la parada se guardan en statistics (ver
+    EnvironmentStatistic.record_stop).
+    """
+    if early_stopping is None:
+        execute_until(num_episodes)
+        return
+    early_stopping.start(q_table)
+    while statistics.episode_log.size < num_episodes:
+        execute_until(min(statistics.episode_log.size + early_stopping.check_every, num_episodes))
+        reason = early_stopping.check(statistics, q_table)
+        if reason is not None:
+            statistics.record_stop(reason)
+            return
@@ -0,0 +1,98 @@
+import numpy
+
+from src.main.python.q_table import DenseQTable
+
+
+class EligibilityTraces:
+    """Trazas de elegibilidad dispersas de los pares estado-acción.
+
+    Solo se guardan las trazas activas, en arrays de NumPy con un elemento
+    por par y un índice que asocia cada par a su posición. Cuando una traza
+    decae por debajo de cutoff se elimina, de modo que el coste de cada paso
+    es proporcional al número de trazas activas y no al tamaño de la tabla Q.
+    """
+
+    def __init__(self, mode='replacing', cutoff=1e-4, capacity=64, state_dtype=numpy.int64):
+        """Crea un conjunto de trazas vacío.
+
+        Argumentos:
+        mode -- 'replacing' (por defecto) para fijar a 1 la traza de un par
+                visitado o 'accumulating' para sumarle 1
+        cutoff -- valor por debajo del cual se descarta una traza
+        capacity -- número de trazas para el que se reserva memoria
+                    inicialmente (se duplica cuando se llena)
+        state_dtype -- tipo de NumPy de los estados (object si no son
+                       números enteros)
+        """
+        if mode not in ('replacing', 'accumulating'):
+            raise ValueError("Tipo de trazas no encontrado")
+        self.mode = mode
+        self.cutoff = cutoff
+        self.size = 0
+        self._index = {}
+        self._states = numpy.empty(capacity, dtype=state_dtype)
+        self._actions = numpy.empty(capacity, dtype=numpy.int64)
+        self._values = numpy.empty(capacity)
+
+    def __len__(self):
+        return self.size
+
+    def visit(self, state, action):
+        """Refuerza la traza de un par estado-acción."""
+        position = self._index.get((state, action))
+        if position is None:
+            if self.size == len(self._values):
+                self._grow()
+            position = self.size
+            self._index[(state, action)] = position
+            self._states[position] = state
+            self._actions[position] = action
+            self._values[position] = 0
+            self.size += 1
+        if self.mode == 'replacing':
+            self._values[position] = 1
+        else:
+            self._values[position] += 1
+
+    def _grow(self):
+        capacity = 2 * max(len(self._values), 1)
+        for name in ('_states', '_actions', '_values'):
+            old = getattr(self, name)
+            new = numpy.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def decay(self, factor):
+        """Multiplica todas las trazas por factor y descarta las despreciables."""
+        values = self._values[:self.size]
+        values *= factor
+        active = values >= self.cutoff
+        if active.all():
+            return
+        kept = numpy.flatnonzero(active)
+        self.size = len(kept)
+        for name in ('_states', '_actions', '_values'):
+            array = getattr(self, name)
+            array[:self.size] = array[kept]
+        self._index = {key: position
+                       for position, key in enumerate(zip(self._states[:self.size].tolist(),
+                                                          self._actions[:self.size].tolist()))}
+
+    def clear(self):
+        """Descarta todas las trazas."""
+        self.size = 0
+        self._index.clear()
+
+    def apply(self, q_table, step):
+        """Suma a cada par de la tabla Q step multiplicado por su traza.
+
+        Argumentos:
+        q_table -- tabla Q (DenseQTable o diccionario de arrays por estado)
+        step -- tasa de aprendizaje por error DT
+        """
+        if isinstance(q_table, DenseQTable):
+            # Cada par aparece una sola vez, así que no hace falta numpy.add.at
+            q_table.array[self._states[:self.size], self._actions[:self.size]] += step * self._values[:self.size]
+            return
+        for state, action, value in zip(self._states[:self.size], self._actions[:self.size], self._values[:self.size]):
+            q_table[state][action] += step * value
@@ -1,23 +1,205 @@
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import gym
 import numpy
 import matplotlib.pyplot as plt
 
 
+class EpisodeLog:
+    """Registro columnar de los episodios.
+
+    Guarda la recompensa acumulada, la longitud, la duración y el éxito de cada
+    episodio en arrays de NumPy preasignados cuya capacidad se duplica cuando
+    se llenan. Las propiedades devuelven vistas sobre los episodios
+    registrados, sin copiar los datos.
+    """
+
+    def __init__(self, capacity=1024, window=100):
+        """Crea un registro vacío.
+
+        Argumentos:
+        capacity -- número de episodios para el que se reserva memoria
+                    inicialmente
+        window -- número de episodios recientes usados por las métricas
+                  móviles (al menos 1)
+        """
+        _check_window(window)
+        self.window = window
+        self.size = 0
+        self._rewards = numpy.empty(capacity)
+        self._lengths = numpy.empty(capacity, dtype=numpy.int64)
+        self._durations = numpy.empty(capacity)
+        self._successes = numpy.empty(capacity, dtype=bool)
+
+    def append(self, reward, length, duration, success):
+        """Añade un episodio al registro."""
+        if self.size == len(self._rewards):
+            self._grow()
+        self._rewards[self.size] = reward
+        self._lengths[self.size] = length
+        self._durations[self.size] = duration
+        self._successes[self.size] = success
+        self.size += 1
+
+    def _grow(self):
+        capacity = 2 * max(len(self._rewards), 1)
+        for name in ('_rewards', '_lengths', '_durations', '_successes'):
+            old = getattr(self, name)
+            new = numpy.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    @property
+    def rewards(self):
+        return self._rewards[:self.size]
+
+    @property
+    def lengths(self):
+        return self._lengths[:self.size]
+
+    @property
+    def durations(self):
+        return self._durations[:self.size]
+
+    @property
+    def successes(self):
+        return self._successes[:self.size]
+
+    def summary(self):
+        """Devuelve las estadísticas agregadas de todos los episodios."""
+        return {
+            'mean_reward': numpy.mean(self.rewards),
+            'reward_std': numpy.std(self.rewards),
+            'mean_length': numpy.mean(self.lengths),
+            'length_std': numpy.std(self.lengths),
+            'num_episodes': self.size,
+            'max_reward': numpy.max(self.rewards),
+            'min_reward': numpy.min(self.rewards),
+            'num_success_episodes': int(numpy.count_nonzero(self.successes)),
+            'time': numpy.sum(self.durations),
+            'mean_time': numpy.mean(self.durations)
+        }
+
+    def rolling_summary(self):
+        """Devuelve las estadísticas de los últimos window episodios."""
+        start = max(self.size - self.window, 0)
+        return {
+            'rolling_mean_reward': numpy.mean(self._rewards[start:self.size]),
+            'rolling_mean_length': numpy.mean(self._lengths[start:self.size]),
+            'rolling_success_rate': numpy.mean(self._successes[start:self.size]) * 100
+        }
+
+
+def _check_window(window):
+    if window < 1:
+        raise ValueError("La ventana de las estadísticas móviles debe tener al menos un episodio")
+
+
+class StreamingEpisodeLog:
+    """Registro de episodios en memoria constante.
+
+    No conserva el historial: mantiene en línea la media y la varianza
+    (algoritmo de Welford) de la recompensa y la longitud, los extremos de la
+    recompensa, el número de éxitos y la duración total, además de buffers
+    circulares de tamaño fijo con los últimos window episodios para las
+    métricas móviles.
+    """
+
+    def __init__(self, window=100):
+        """Crea un registro vacío.
+
+        Argumentos:
+        window -- número de episodios recientes usados por las métricas
+                  móviles (al menos 1)
+        """
+        _check_window(window)
+        self.window = window
+        self.size = 0
+        self.num_successes = 0
+        self.total_duration = 0.0
+        self.max_reward = -numpy.inf
+        self.min_reward = numpy.inf
+        self._reward_mean = 0.0
+        self._reward_m2 = 0.0
+        self._length_mean = 0.0
+        self._length_m2 = 0.0
+        self._window_rewards = numpy.zeros(window)
+        self._window_lengths = numpy.zeros(window, dtype=numpy.int64)
+        self._window_successes = numpy.zeros(window, dtype=bool)
+
+    def append(self, reward, length, duration, success):
+        """Añade un episodio al registro."""
+        self.size += 1
+        delta = reward - self._reward_mean
+        self._reward_mean += delta / self.size
+        self._reward_m2 += delta * (reward - self._reward_mean)
+        delta = length - self._length_mean
+        self._length_mean += delta / self.size
+        self._length_m2 += delta * (length - self._length_mean)
+        self.max_reward = max(self.max_reward, reward)
+        self.min_reward = min(self.min_reward, reward)
+        self.num_successes += bool(success)
+        self.total_duration += duration
+
+        position = (self.size - 1) % self.window
+        self._window_rewards[position] = reward
+        self._window_lengths[position] = length
+        self._window_successes[position] = success
+
+    def summary(self):
+        """Devuelve las estadísticas agregadas de todos los episodios."""
+        return {
+            'mean_reward': self._reward_mean,
+            'reward_std': numpy.sqrt(self._reward_m2 / self.size),
+            'mean_length': self._length_mean,
+            'length_std': numpy.sqrt(self._length_m2 / self.size),
+            'num_episodes': self.size,
+            'max_reward': self.max_reward,
+            'min_reward': self.min_reward,
+            'num_success_episodes': self.num_successes,
+            'time': self.total_duration,
+            'mean_time': self.total_duration / self.size
+        }
+
+    def rolling_summary(self):
+        """Devuelve las estadísticas de los últimos window episodios."""
+        filled = min(self.size, self.window)
+        return {
+            'rolling_mean_reward': numpy.mean(self._window_rewards[:filled]),
+            'rolling_mean_length': numpy.mean(self._window_lengths[:filled]),
+            'rolling_success_rate': numpy.mean(self._window_successes[:filled]) * 100
+        }
+
+
 @dataclass
 class EnvironmentStatistic:
     env: gym.Env
+    streaming: bool = False
+    window: int = 100
+    _terminal_states: frozenset = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        _check_window(self.window)
 
     def reset(self):
-        self.episode_data = {'episodes': [], 'total': {'cumulative_rewards': 0, 'episode_lengths': [], 'duration': 0,
-                                                       'success_episodes': 0, 'failed_episodes': 0}}
+        if self.streaming:
+            self.episode_log = StreamingEpisodeLog(self.window)
+        else:
+            self.episode_log = EpisodeLog(window=self.window)
+        self.stop_reason = None
+        self.stop_episode = None
         self.episode_reward = 0
         self.episode_length = 0
         self.time = time.time()
 
 
+    def resume(self):
+        """Prepara el registro para continuar un entrenamiento ya empezado."""
+        self.stop_reason = None
+        self.stop_episode = None
+        self.reset_episode()
+
     def reset_episode(self):
         self.episode_reward = 0
         self.episode_length = 0
@@ -29,21 +211,77 @@ class EnvironmentStatistic:
 
 
     def add_episode(self, next_state):
-        self.episode_data['episodes'].append(
-            {'cumulative_reward': self.episode_reward, 'episode_length': self.episode_length, "time": time.time() - self.time})
-        self.episode_data['total']['cumulative_rewards'] += self.episode_reward
-        self.episode_data['total']['episode_lengths'].append(self.episode_length)
-        self.episode_data['total']['duration'] += time.time() - self.time
-        if next_state in self.get_terminal_states():
-            self.episode_data['total']['success_episodes'] += 1
-        else:
-            self.episode_data['total']['failed_episodes'] += 1
+        self.episode_log.append(self.episode_reward, self.episode_length, time.time() - self.time,
+                                next_state in self.get_terminal_states())
+
+    def reset_batch(self, num_envs):
+        """Inicia los episodios de un lote de num_envs entornos."""
+        self.batch_rewards = numpy.zeros(num_envs)
+        self.batch_lengths = numpy.zeros(num_envs, dtype=numpy.int64)
+        self.batch_times = numpy.full(num_envs, time.time())
+        self.pending_batch_episodes = []
+
+    def continue_batch(self, rewards):
+        """Acumula la recompensa de un paso en cada entorno del lote."""
+        self.batch_rewards += rewards
+        self.batch_lengths += 1
+
+    def add_batch_episodes(self, envs, next_states, max_episodes=None):
+        """Registra los episodios terminados en algunos entornos del lote.
+
+        Argumentos:
+        envs -- índices de los entornos cuyo episodio ha terminado
+        next_states -- estados siguientes de todos los entornos del lote
+        max_episodes -- número máximo de episodios a registrar (None para no
+                        limitarlo); los que no caben quedan pendientes y se
+                        registran antes que los siguientes (ver
+                        add_pending_batch_episodes), de modo que un lote que
+                        continúa no pierde episodios
+        """
+        now = time.time()
+        terminal_states = self.get_terminal_states()
+        for env in envs:
+            self.pending_batch_episodes.append((self.batch_rewards[env], self.batch_lengths[env],
+                                                now - self.batch_times[env], next_states[env] in terminal_states))
+        self.batch_rewards[envs] = 0
+        self.batch_lengths[envs] = 0
+        self.batch_times[envs] = now
+        self.add_pending_batch_episodes(max_episodes)
+
+    def add_pending_batch_episodes(self, max_episodes=None):
+        """Registra, por orden, hasta max_episodes episodios pendientes del lote."""
+        episodes = self.pending_batch_episodes
+        count = len(episodes) if max_episodes is None else max(min(max_episodes, len(episodes)), 0)
+        for episode in episodes[:count]:
+            self.episode_log.append(*episode)
+        del episodes[:count]
+
+    def record_stop(self, reason):
+        """Registra que el entrenamiento se ha detenido antes de tiempo (ver EarlyStopping)."""
+        self.stop_reason = reason
+        self.stop_episode = self.episode_log.size
 
     def get_terminal_states(self):
+        """Devuelve el conjunto de estados terminales con éxito del entorno.
+
+        El conjunto se calcula la primera vez que se solicita y se reutiliza
+        en las siguientes llamadas, de modo que comprobar si un estado es
+        terminal cuesta O(1). Si el entorno cambia, debe llamarse a
+        invalidate_terminal_states.
+        """
+        if self._terminal_states is None:
+            self._terminal_states = frozenset(self._find_terminal_states())
+        return self._terminal_states
+
+    def invalidate_terminal_states(self):
+        """Descarta el conjunto de estados terminales calculado previamente."""
+        self._terminal_states = None
+
+    def _find_terminal_states(self):
 
         # Comprobar cada estado si es terminal o no
-        if hasattr(self.env, 'target_location'):
-            return [self.env.target_location]
+        if hasattr(self.env, 'target_state'):
+            return [self.env.target_state]
 
         posible_states = range(self.env.observation_space.n)
 
@@ -62,40 +300,23 @@ class EnvironmentStatistic:
         return terminal_states
 
     def calculate_statistics(self):
-        num_episodes = len(self.episode_data['episodes'])
-        cumulative_rewards = [episode_data['cumulative_reward'] for episode_data in self.episode_data['episodes']]
-        episode_lengths = [episode_data['episode_length'] for episode_data in self.episode_data['episodes']]
-        episode_time = [episode_data['time'] for episode_data in self.episode_data['episodes']]
-
-        mean_reward = numpy.mean(cumulative_rewards)
-        mean_time = numpy.mean(episode_time)
-        reward_std = numpy.std(cumulative_rewards)
-        mean_length = numpy.mean(episode_lengths)
-        length_std = numpy.std(episode_lengths)
-        max_reward = numpy.max(cumulative_rewards)
-        min_reward = numpy.min(cumulative_rewards)
-        num_success_episodes = self.episode_data['total']['success_episodes']
-        success_rate = num_success_episodes / num_episodes
-        failed_rate = 1 - success_rate
-        time = self.episode_data['total']['duration']
-
-        statistics = {
-            'mean_reward': mean_reward,
-            'reward_std': reward_std,
-            'mean_length': mean_length,
-            'length_std': length_std,
-            'num_episodes': num_episodes,
-            'max_reward': max_reward,
-            'min_reward': min_reward,
-            'num_success_episodes': num_success_episodes,
-            'success_rate': success_rate*100,
-            'failed_rate': failed_rate*100,
-            'time': time,
-            'mean_time': mean_time
-        }
-
+        statistics = self.episode_log.summary()
+        success_rate = statistics['num_success_episodes'] / statistics['num_episodes']
+        statistics['success_rate'] = success_rate*100
+        statistics['failed_rate'] = (1 - success_rate)*100
+        statistics['stop_reason'] = self.stop_reason
+        statistics['stop_episode'] = self.stop_episode
         return statistics
 
+    def calculate_rolling_statistics(self):
+        """Calcula las estadísticas de los últimos episodios (ver window)."""
+        return self.episode_log.rolling_summary()
+
+    def _get_history(self):
+        if isinstance(self.episode_log, StreamingEpisodeLog):
+            raise ValueError("El historial de episodios no se conserva en modo streaming")
+        return self.episode_log
+
     def _plot_graph(self, data, ylabel, title):
         plt.plot(data)
         plt.ylabel(ylabel)
@@ -104,24 +325,21 @@ class EnvironmentStatistic:
         plt.show()
 
     def get_graph_reward(self, title):
-        data = [episode['cumulative_reward'] for episode in self.episode_data['episodes']]
-        self._plot_graph(data, 'Reward', title)
+        self._plot_graph(self._get_history().rewards, 'Reward', title)
 
     def get_graph_length(self, title):
-        data = [episode['episode_length'] for episode in self.episode_data['episodes']]
-        self._plot_graph(data, 'Length', title)
+        self._plot_graph(self._get_history().lengths, 'Length', title)
 
     def get_graph_time(self, title):
-        data = [episode['time'] for episode in self.episode_data['episodes']]
-        self._plot_graph(data, 'Duration', title)
+        self._plot_graph(self._get_history().durations, 'Duration', title)
 
     def get_graph_statistics(self, title):
         statistics = self.calculate_statistics()
+        cumulative_rewards = self._get_history().rewards
 
         # Plotting statistics
         labels = ['mean_reward', 'reward_std', 'mean_length', 'length_std', 'max_reward', 'min_reward']
         values = [statistics[label] for label in labels]
-        cumulative_rewards = [episode['cumulative_reward'] for episode in self.episode_data['episodes']]
 
         plt.bar(labels, values)
         plt.ylabel('Value')
@@ -129,8 +347,8 @@ class EnvironmentStatistic:
         plt.show()
 
         # Plotting success and failure rewards
-        success_rewards = [reward for reward in cumulative_rewards if reward > 0]
-        failed_rewards = [reward for reward in cumulative_rewards if reward <= 0]
+        success_rewards = cumulative_rewards[cumulative_rewards > 0]
+        failed_rewards = cumulative_rewards[cumulative_rewards <= 0]
 
         plt.hist(success_rewards, bins=10, alpha=0.5, label='Success Rewards')
         plt.hist(failed_rewards, bins=10, alpha=0.5, label='Failed Rewards')
@@ -25,6 +25,14 @@ class FrozenLake(Game):
         """Resolución del entorno Frozen Lake utilizando Q-Learning."""
         return self.resolve_by_q_learning(epsilon)
 
+    def resolve_frozen_lake_by_dyna_q(self, epsilon=0.1, planning_steps=10):
+        """Resolución del entorno Frozen Lake utilizando Dyna-Q."""
+        return self.resolve_by_dyna_q(epsilon, planning_steps)
+
+    def resolve_frozen_lake_by_prioritized_sweeping(self, epsilon=0.1, planning_steps=10):
+        """Resolución del entorno Frozen Lake utilizando barrido priorizado."""
+        return self.resolve_by_prioritized_sweeping(epsilon, planning_steps)
+
     def resolve_frozen_lake_by_sarsa(self, epsilon=0.1, alpha=0.1, gamma=0.99):
         """Resolución del entorno Frozen Lake utilizando Sarsa."""
         return self.resolve_by_sarsa(epsilon, alpha, gamma)
@@ -33,6 +41,14 @@ class FrozenLake(Game):
         """Resolución del entorno Frozen Lake utilizando Double Q-Learning."""
         return self.resolve_by_double_q_learning(epsilon, alpha, gamma)
 
+    def resolve_frozen_lake_by_value_iteration(self):
+        """Resolución del entorno Frozen Lake utilizando iteración de valores."""
+        return self.resolve_by_value_iteration()
+
+    def resolve_frozen_lake_by_policy_iteration(self):
+        """Resolución del entorno Frozen Lake utilizando iteración de políticas."""
+        return self.resolve_by_policy_iteration()
+
     def show_policy(self, agent):
         action_symbols = {
             1: "↓",  # Mover hacia el sur (abajo)
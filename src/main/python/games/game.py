@@ -5,8 +5,11 @@ import time
 from gym import Env
 
 from src.main.python.double_q_learning import DoubleQLearning
-from src.main.python.sarsa import Sarsa
-from src.main.python.aprendizaje_por_refuerzo import Montecarlo_IE, PolíticaEpsilonVoraz, Q_Learning
+from src.main.python.dynamic_programming import PolicyIteration, ValueIteration
+from src.main.python.early_stopping import EarlyStopping
+from src.main.python.sarsa import Sarsa, SarsaLambda
+from src.main.python.aprendizaje_por_refuerzo import (Barrido_Priorizado, Dyna_Q, Montecarlo_IE, PolíticaEpsilonVoraz,
+                                                     Q_Lambda, Q_Learning)
 
 
 @dataclass
@@ -15,36 +18,135 @@ class Game:
     discount_factor: float
     learning_factor: float
     iterations: int
+    num_envs: int = 1
+    early_stopping: EarlyStopping = None
+    streaming_statistics: bool = False
+    statistics_window: int = 100
     agent = None
 
+    def __post_init__(self):
+        if self.statistics_window < 1:
+            raise ValueError("La ventana de las estadísticas móviles debe tener al menos un episodio")
+
     def resolve_by_montecarlo(self):
         """Resolución del entorno utilizando Montecarlo con inicios exploratorios."""
-        agent = Montecarlo_IE(self.environment, self.discount_factor)
-        agent.entrena(self.iterations)
+        agent = Montecarlo_IE(self.environment, self.discount_factor,
+                              estadísticas_en_flujo=self.streaming_statistics,
+                              ventana_estadísticas=self.statistics_window)
+        agent.entrena(self.iterations, self.early_stopping)
         self.agent = agent
         return agent
 
     def resolve_by_q_learning(self, epsilon):
         """Resolución del entorno utilizando Q-Learning"""
         export_policy = PolíticaEpsilonVoraz(epsilon)
-        agent = Q_Learning(self.environment, self.discount_factor, self.learning_factor, export_policy)
-        agent.entrena(self.iterations)
+        agent = Q_Learning(self.environment, self.discount_factor, self.learning_factor, export_policy,
+                           estadísticas_en_flujo=self.streaming_statistics,
+                           ventana_estadísticas=self.statistics_window)
+        agent.entrena(self.iterations, self.num_envs, self.early_stopping)
+        self.agent = agent
+        return agent
+
+    def resolve_by_dyna_q(self, epsilon, planning_steps=10):
+        """Resolución del entorno utilizando Dyna-Q."""
+        export_policy = PolíticaEpsilonVoraz(epsilon)
+        agent = Dyna_Q(self.environment, self.discount_factor, self.learning_factor, export_policy, planning_steps,
+                       estadísticas_en_flujo=self.streaming_statistics, ventana_estadísticas=self.statistics_window)
+        agent.entrena(self.iterations, self.num_envs, self.early_stopping)
+        self.agent = agent
+        return agent
+
+    def resolve_by_prioritized_sweeping(self, epsilon, planning_steps=10):
+        """Resolución del entorno utilizando barrido priorizado."""
+        export_policy = PolíticaEpsilonVoraz(epsilon)
+        agent = Barrido_Priorizado(self.environment, self.discount_factor, self.learning_factor, export_policy,
+                                   planning_steps, estadísticas_en_flujo=self.streaming_statistics,
+                                   ventana_estadísticas=self.statistics_window)
+        agent.entrena(self.iterations, self.num_envs, self.early_stopping)
         self.agent = agent
         return agent
 
     def resolve_by_sarsa(self, epsilon, alpha, gamma):
         """Resolución del entorno utilizando Sarsa."""
         export_policy = PolíticaEpsilonVoraz(epsilon)
-        agent = Sarsa(self.environment, alpha, gamma, export_policy)
-        agent.train(self.iterations)
+        agent = Sarsa(self.environment, alpha, gamma, export_policy,
+                      streaming_statistics=self.streaming_statistics, statistics_window=self.statistics_window)
+        agent.train(self.iterations, self.num_envs, self.early_stopping)
+        self.agent = agent
+        return agent
+
+    def resolve_by_q_lambda(self, epsilon, lambda_=0.9):
+        """Resolución del entorno utilizando Q(λ) de Watkins."""
+        export_policy = PolíticaEpsilonVoraz(epsilon)
+        agent = Q_Lambda(self.environment, self.discount_factor, self.learning_factor, export_policy, lambda_,
+                         estadísticas_en_flujo=self.streaming_statistics, ventana_estadísticas=self.statistics_window)
+        agent.entrena(self.iterations, parada=self.early_stopping)
+        self.agent = agent
+        return agent
+
+    def resolve_by_sarsa_lambda(self, epsilon, alpha, gamma, lambda_=0.9):
+        """Resolución del entorno utilizando Sarsa(λ)."""
+        export_policy = PolíticaEpsilonVoraz(epsilon)
+        agent = SarsaLambda(self.environment, gamma, alpha, export_policy, lambda_,
+                            streaming_statistics=self.streaming_statistics, statistics_window=self.statistics_window)
+        agent.train(self.iterations, early_stopping=self.early_stopping)
         self.agent = agent
         return agent
 
     def resolve_by_double_q_learning(self, epsilon, alpha, gamma):
         """Resolución del entorno utilizando Double Q-Learning."""
         export_policy = PolíticaEpsilonVoraz(epsilon)
-        agent = DoubleQLearning(self.environment, alpha, gamma, export_policy)
-        agent.train(self.iterations)
+        agent = DoubleQLearning(self.environment, alpha, gamma, export_policy,
+                                streaming_statistics=self.streaming_statistics,
+                                statistics_window=self.statistics_window)
+        agent.train(self.iterations, self.num_envs, self.early_stopping)
+        self.agent = agent
+        return agent
+
+    def resolve_by_value_iteration(self):
+        """Resolución del entorno utilizando iteración de valores sobre su modelo (env.P).
+
+        Las iteraciones del juego son los episodios con los que se evalúa la
+        política óptima obtenida.
+        """
+        agent = ValueIteration(self.environment, self.discount_factor,
+                               streaming_statistics=self.streaming_statistics, statistics_window=self.statistics_window)
+        agent.train(self.iterations, self.num_envs)
+        self.agent = agent
+        return agent
+
+    def resolve_by_policy_iteration(self):
+        """Resolución del entorno utilizando iteración de políticas sobre su modelo (env.P).
+
+        Las iteraciones del juego son los episodios con los que se evalúa la
+        política óptima obtenida.
+        """
+        agent = PolicyIteration(self.environment, self.discount_factor,
+                                streaming_statistics=self.streaming_statistics,
+                                statistics_window=self.statistics_window)
+        agent.train(self.iterations, self.num_envs)
+        self.agent = agent
+        return agent
+
+    def resume(self, agent, iterations):
+        """Continúa el entrenamiento de un agente obtenido con resolve_by_* durante
+        iterations episodios más, con la misma configuración del juego.
+
+        Los agentes de programación dinámica no se entrenan por episodios y no
+        pueden continuar.
+        """
+        if isinstance(agent, Montecarlo_IE):
+            agent.entrena(iterations, self.early_stopping, continuar=True)
+        elif isinstance(agent, Q_Lambda):
+            agent.entrena(iterations, parada=self.early_stopping, continuar=True)
+        elif isinstance(agent, Q_Learning):
+            agent.entrena(iterations, self.num_envs, self.early_stopping, continuar=True)
+        elif isinstance(agent, SarsaLambda):
+            agent.train(iterations, early_stopping=self.early_stopping, resume=True)
+        elif isinstance(agent, (Sarsa, DoubleQLearning)):
+            agent.train(iterations, self.num_envs, self.early_stopping, resume=True)
+        else:
+            raise ValueError("El agente no puede continuar su entrenamiento")
         self.agent = agent
         return agent
 
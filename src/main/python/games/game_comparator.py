@@ -1,8 +1,120 @@
-from dataclasses import dataclass
+import math
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
 import gym
+import numpy
 
 from src.main.python.games.game import Game
 from src.main.python.games.golf.golf_env import GolfEnv
+from src.main.python.games.search_samplers import Sampler, make_sampler
+from src.main.python.policy_evaluation import PolicyEvaluator
+
+
+# Atributos de los agentes que contienen tablas aprendidas
+TABLE_ATTRIBUTES = ('tabla_q', 'tabla_n', 'q_table', 'q1_table', 'q2_table')
+
+# Juego y evaluador de cada proceso trabajador de un barrido en paralelo
+_worker_game = None
+_worker_evaluator = None
+
+
+def _resolve(game, algorithm, epsilon, alpha, gamma):
+    """Resuelve el juego con el algoritmo indicado y devuelve el agente."""
+    if algorithm == 'Montecarlo':
+        return game.resolve_by_montecarlo()
+    elif algorithm == 'Q-Learning':
+        return game.resolve_by_q_learning(epsilon)
+    elif algorithm == 'Dyna-Q':
+        return game.resolve_by_dyna_q(epsilon)
+    elif algorithm == 'Prioritized Sweeping':
+        return game.resolve_by_prioritized_sweeping(epsilon)
+    elif algorithm == 'Sarsa':
+        return game.resolve_by_sarsa(epsilon, alpha, gamma)
+    elif algorithm == 'Q(λ)':
+        return game.resolve_by_q_lambda(epsilon)
+    elif algorithm == 'Sarsa(λ)':
+        return game.resolve_by_sarsa_lambda(epsilon, alpha, gamma)
+    elif algorithm == 'Double Q-Learning':
+        return game.resolve_by_double_q_learning(epsilon, alpha, gamma)
+    elif algorithm == 'Value Iteration':
+        return game.resolve_by_value_iteration()
+    elif algorithm == 'Policy Iteration':
+        return game.resolve_by_policy_iteration()
+    else:
+        raise ValueError("Algoritmo no encontrado")
+
+
+def _case_statistics(agent, evaluator):
+    """Devuelve las estadísticas de un agente y, si hay evaluador, las exactas.
+
+    Las métricas del evaluador se añaden con el prefijo 'exact_'.
+    """
+    statistics = agent.calculate_statistics()
+    if evaluator is not None:
+        for name, value in evaluator.evaluate_agent(agent).items():
+            statistics['exact_' + name] = value
+    return statistics
+
+
+def _ranking_metric(rank_by):
+    """Devuelve la métrica con la que se elige el mejor agente."""
+    if rank_by == 'statistics':
+        return 'success_rate'
+    elif rank_by == 'mean_reward':
+        return 'mean_reward'
+    elif rank_by == 'exact':
+        return 'exact_success_rate'
+    else:
+        raise ValueError("Criterio de comparación no encontrado")
+
+
+def _seed_case(environment, seed):
+    """Fija todas las fuentes de aleatoriedad para entrenar una configuración."""
+    random.seed(seed)
+    numpy.random.seed(seed)
+    environment.reset(seed=seed)
+    environment.action_space.seed(seed)
+
+
+def _export_agent(agent):
+    """Extrae las tablas, el registro de episodios y la parada de un agente sin el entorno."""
+    tables = {}
+    for name in TABLE_ATTRIBUTES:
+        table = getattr(agent, name, None)
+        if table is not None:
+            tables[name] = table if hasattr(table, 'array') else dict(table)
+    statistics = agent.statistics
+    return tables, statistics.episode_log, (statistics.stop_reason, statistics.stop_episode)
+
+
+def _init_sweep_worker(game, rank_by):
+    global _worker_game, _worker_evaluator
+    _worker_game = game
+    _worker_evaluator = None
+    if rank_by == 'exact':
+        _worker_evaluator = PolicyEvaluator(game.environment, game.discount_factor)
+
+
+def _run_sweep_cases(cases):
+    """Entrena en un proceso trabajador una serie de configuraciones.
+
+    Devuelve las estadísticas de cada configuración y solo las tablas del
+    mejor agente de la serie.
+    """
+    metric = 'success_rate' if _worker_evaluator is None else 'exact_success_rate'
+    results = {}
+    better_key = None
+    better_agent = None
+    for key, algorithm, epsilon, alpha, gamma, seed in cases:
+        _seed_case(_worker_game.environment, seed)
+        agent = _resolve(_worker_game, algorithm, epsilon, alpha, gamma)
+        results[key] = _case_statistics(agent, _worker_evaluator)
+        if better_agent is None or results[key][metric] > results[better_key][metric]:
+            better_key = key
+            better_agent = agent
+    return results, better_key, _export_agent(better_agent)
 
 
 @dataclass
@@ -20,23 +132,210 @@ class GameComparator:
         self._print_data("algoritmos", data)
 
     def compare_different_cases(self, algorithm='Montecarlo', epsilon=[0.1, 0.2, 0.3, 0.4, 0.5],
-                                alpha=[0.1, 0.2, 0.3, 0.4, 0.5], gamma=[0.9, 0.8, 0.7, 0.6, 0.5]):
-        results = {}
-        better_agent = None
-        better_success_rate = None
+                                alpha=[0.1, 0.2, 0.3, 0.4, 0.5], gamma=[0.9, 0.8, 0.7, 0.6, 0.5], n_jobs=1, seed=None,
+                                rank_by='statistics', scheduler='grid', reduction_factor=3, min_iterations=None):
+        """Compara todas las combinaciones de ε, α y γ y devuelve el mejor agente.
+
+        Argumentos:
+        n_jobs -- número de procesos que entrenan configuraciones en paralelo
+                  (None usa todos los núcleos; por defecto 1, en serie)
+        seed -- semilla a partir de la que se obtiene una semilla distinta
+                para cada configuración
+        rank_by -- 'statistics' (por defecto) para elegir el mejor agente por
+                   la tasa de éxito de su entrenamiento o 'exact' para elegirlo
+                   por la probabilidad de éxito exacta de su política, calculada
+                   con PolicyEvaluator sobre el modelo env.P sin ejecutar
+                   episodios; 'mean_reward' lo elige por la recompensa media de
+                   su entrenamiento
+        scheduler -- 'grid' (por defecto) para entrenar todas las
+                     configuraciones durante las iteraciones del juego o
+                     'halving' para repartirlas por reducción sucesiva (ver
+                     _run_halving_cases); 'halving' se ejecuta en serie,
+                     por lo que exige n_jobs = 1
+        reduction_factor -- con 'halving', fracción inversa de configuraciones
+                            que sobrevive a cada ronda y factor por el que
+                            crece su presupuesto de episodios
+        min_iterations -- con 'halving', episodios de la primera ronda (por
+                          defecto, los necesarios para que la última ronda
+                          alcance las iteraciones del juego)
+        """
+        metric = _ranking_metric(rank_by)
+        if scheduler not in ('grid', 'halving'):
+            raise ValueError("Planificador no encontrado")
+        if scheduler == 'halving' and n_jobs != 1:
+            raise ValueError("El planificador 'halving' se ejecuta en serie: n_jobs debe ser 1")
+        cases = []
         for eps in epsilon:
             for alp in alpha:
                 for gam in gamma:
                     key = "Epsilon: " + str(eps) + " - Alpha: " + str(alp) + " - Gamma: " + str(gam)
-                    agent = self._execute_algorithm(algorithm, alp, key, eps, gam, results)
-                    success_rate = agent.statistics.calculate_statistics()['success_rate']
-                    if better_agent is None or success_rate > better_success_rate:
-                        better_agent = agent
-                        better_success_rate = success_rate
+                    cases.append((key, algorithm, eps, alp, gam))
+        seeds = numpy.random.SeedSequence(seed).generate_state(len(cases))
+        cases = [case + (int(case_seed),) for case, case_seed in zip(cases, seeds)]
+
+        if scheduler == 'halving':
+            results, better_agent = self._run_halving_cases(cases, rank_by, metric, reduction_factor, min_iterations)
+        else:
+            results, better_agent = self._run_all_cases(cases, n_jobs, rank_by, metric)
         data = self._get_data_from_stats(results)
         self._print_data("casos", data)
         return better_agent
 
+    def _run_cases(self, cases, rank_by, metric, evaluator=None):
+        if evaluator is None and rank_by == 'exact':
+            evaluator = PolicyEvaluator(self.game.environment, self.game.discount_factor)
+        results = {}
+        better_agent = None
+        better_key = None
+        for key, algorithm, eps, alp, gam, case_seed in cases:
+            _seed_case(self.game.environment, case_seed)
+            agent = _resolve(self.game, algorithm, eps, alp, gam)
+            results[key] = _case_statistics(agent, evaluator)
+            if better_agent is None or results[key][metric] > results[better_key][metric]:
+                better_agent = agent
+                better_key = key
+        self.game.agent = better_agent
+        return results, better_agent
+
+    def compare_sampled_cases(self, algorithm='Sarsa', num_cases=20, epsilon=(0.01, 0.5), alpha=(0.01, 0.5),
+                              gamma=(0.5, 0.99), sampler='halton', n_jobs=1, seed=None, rank_by='statistics'):
+        """Compara num_cases configuraciones extraídas de rangos continuos de ε, α y γ.
+
+        A diferencia de compare_different_cases, el coste no depende de la
+        resolución de cada rango sino solo de num_cases. Devuelve el mejor
+        agente.
+
+        Argumentos:
+        num_cases -- número de configuraciones que se entrenan
+        epsilon, alpha, gamma -- pares (mínimo, máximo) de cada rango
+        sampler -- 'random', 'halton' (por defecto), 'model' o una instancia
+                   de Sampler (ver search_samplers); las configuraciones de un
+                   muestreador secuencial, como 'model', se entrenan una a una
+                   en serie
+        n_jobs, seed, rank_by -- ver compare_different_cases
+        """
+        metric = _ranking_metric(rank_by)
+        sampler_seed, cases_seed = numpy.random.SeedSequence(seed).spawn(2)
+        if not isinstance(sampler, Sampler):
+            sampler = make_sampler(sampler, [epsilon, alpha, gamma], sampler_seed)
+        seeds = [int(case_seed) for case_seed in cases_seed.generate_state(num_cases)]
+
+        def sampled_case(case_seed):
+            eps, alp, gam = sampler.ask()
+            key = "Epsilon: %.4g - Alpha: %.4g - Gamma: %.4g" % (eps, alp, gam)
+            return key, algorithm, eps, alp, gam, case_seed
+
+        if sampler.sequential:
+            evaluator = None
+            if rank_by == 'exact':
+                evaluator = PolicyEvaluator(self.game.environment, self.game.discount_factor)
+            results = {}
+            better_agent = None
+            better_key = None
+            for case_seed in seeds:
+                case = sampled_case(case_seed)
+                case_results, agent = self._run_cases([case], rank_by, metric, evaluator)
+                results.update(case_results)
+                sampler.tell(case[2:5], case_results[case[0]][metric])
+                if better_agent is None or results[case[0]][metric] > results[better_key][metric]:
+                    better_agent = agent
+                    better_key = case[0]
+            self.game.agent = better_agent
+        else:
+            results, better_agent = self._run_all_cases([sampled_case(case_seed) for case_seed in seeds], n_jobs,
+                                                        rank_by, metric)
+        data = self._get_data_from_stats(results)
+        self._print_data("casos", data)
+        return better_agent
+
+    def _run_all_cases(self, cases, n_jobs, rank_by, metric):
+        """Entrena las configuraciones en serie o en n_jobs procesos."""
+        if n_jobs is None:
+            n_jobs = os.cpu_count()
+        if n_jobs > 1:
+            return self._run_parallel_cases(cases, n_jobs, rank_by, metric)
+        return self._run_cases(cases, rank_by, metric)
+
+    def _run_halving_cases(self, cases, rank_by, metric, reduction_factor, min_iterations):
+        """Reparte los episodios entre las configuraciones por reducción sucesiva.
+
+        Todas las configuraciones se entrenan durante min_iterations episodios;
+        en cada ronda sobrevive la fracción 1 / reduction_factor con mejor
+        métrica, que continúa su entrenamiento hasta multiplicar por
+        reduction_factor sus episodios, sin superar las iteraciones del juego.
+        Termina cuando queda una configuración o se alcanzan las iteraciones.
+        Las estadísticas de cada configuración son las de la ronda en la que
+        se descartó.
+        """
+        evaluator = None
+        if rank_by == 'exact':
+            evaluator = PolicyEvaluator(self.game.environment, self.game.discount_factor)
+        iterations = self.game.iterations
+        if min_iterations is None:
+            rounds = math.ceil(math.log(len(cases), reduction_factor) - 1e-9) if len(cases) > 1 else 0
+            min_iterations = max(iterations // reduction_factor ** rounds, 1)
+        budget = min(min_iterations, iterations)
+        game = replace(self.game, iterations=budget)
+
+        agents = {}
+        results = {}
+        for key, algorithm, eps, alp, gam, case_seed in cases:
+            _seed_case(game.environment, case_seed)
+            agents[key] = _resolve(game, algorithm, eps, alp, gam)
+            results[key] = _case_statistics(agents[key], evaluator)
+        survivors = [case[0] for case in cases]
+        while len(survivors) > 1 and budget < iterations:
+            # sorted es estable: a igual métrica se conserva el orden de los casos
+            survivors = sorted(survivors, key=lambda key: -results[key][metric])
+            survivors = survivors[:math.ceil(len(survivors) / reduction_factor)]
+            new_budget = min(budget * reduction_factor, iterations)
+            for key in survivors:
+                game.resume(agents[key], new_budget - budget)
+                results[key] = _case_statistics(agents[key], evaluator)
+            budget = new_budget
+
+        better_key = max(survivors, key=lambda key: results[key][metric])
+        self.game.agent = agents[better_key]
+        return results, agents[better_key]
+
+    def _run_parallel_cases(self, cases, n_jobs, rank_by, metric):
+        """Reparte las configuraciones entre n_jobs procesos.
+
+        Cada proceso trabaja con su propia copia del entorno. Solo vuelven las
+        estadísticas de cada configuración y las tablas del mejor agente de
+        cada serie; con ellas se reconstruye el mejor agente.
+        """
+        game = replace(self.game)
+        chunks = [chunk.tolist() for chunk in numpy.array_split(numpy.arange(len(cases)), 4 * n_jobs) if len(chunk)]
+        results = {}
+        better_key = None
+        better_export = None
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_sweep_worker,
+                                 initargs=(game, rank_by)) as executor:
+            for chunk_results, key, export in executor.map(_run_sweep_cases,
+                                                           [[cases[i] for i in chunk] for chunk in chunks]):
+                results.update(chunk_results)
+                if better_key is None or results[key][metric] > results[better_key][metric]:
+                    better_key = key
+                    better_export = export
+
+        _, algorithm, eps, alp, gam, _ = next(case for case in cases if case[0] == better_key)
+        better_agent = self._rebuild_agent(algorithm, eps, alp, gam, better_export)
+        self.game.agent = better_agent
+        return results, better_agent
+
+    def _rebuild_agent(self, algorithm, epsilon, alpha, gamma, export):
+        """Crea un agente sin entrenar y le carga las tablas y el registro exportados."""
+        game = replace(self.game, iterations=0, early_stopping=None)
+        agent = _resolve(game, algorithm, epsilon, alpha, gamma)
+        tables, episode_log, (stop_reason, stop_episode) = export
+        for name, table in tables.items():
+            getattr(agent, name).update(table)
+        agent.statistics.episode_log = episode_log
+        agent.statistics.stop_reason = stop_reason
+        agent.statistics.stop_episode = stop_episode
+        return agent
+
     def compare_different_environments(self, environments=['FrozenLake-v1', 'Taxi-v3', "Golf-v0"], algorithm='Montecarlo',
                                       epsilon=0.1, alpha=0.1, gamma=0.9):
         results = {}
@@ -66,20 +365,8 @@ class GameComparator:
 
 
     def _execute_algorithm(self, algorithm, alpha, env, epsilon, gamma, results):
-        if algorithm == 'Montecarlo':
-            agent = self.game.resolve_by_montecarlo()
-            results[env] = agent.calculate_statistics()
-        elif algorithm == 'Q-Learning':
-            agent = self.game.resolve_by_q_learning(epsilon)
-            results[env] = agent.calculate_statistics()
-        elif algorithm == 'Sarsa':
-            agent = self.game.resolve_by_sarsa(epsilon, alpha, gamma)
-            results[env] = agent.calculate_statistics()
-        elif algorithm == 'Double Q-Learning':
-            agent = self.game.resolve_by_double_q_learning(epsilon, alpha, gamma)
-            results[env] = agent.calculate_statistics()
-        else:
-            raise ValueError("Algoritmo no encontrado")
+        agent = _resolve(self.game, algorithm, epsilon, alpha, gamma)
+        results[env] = agent.calculate_statistics()
         return agent
 
     def _is_some_data(self, key, results):
@@ -108,6 +395,7 @@ class GameComparator:
             'failed_rate',
             'time',
             'mean_time']
+        metrics += [metric for metric in next(iter(results.values())) if metric.startswith('exact_')]
         data = {}
 
         for metric in metrics:
@@ -130,3 +418,6 @@ class GameComparator:
         print(f"Mejor {without_last_letter} por tiempo de ejecución por episodio: " + data['lower_mean_time'])
         print(f"Mejor {without_last_letter} por máxima recompensa alcanzada: " + data['greater_max_reward'])
         print(f"Mejor {without_last_letter} por mínima recompensa alcanzada: " + data['lower_min_reward'])
+        if 'greater_exact_success_rate' in data:
+            print(f"{first_upper} con mayor probabilidad de éxito exacta: " + data['greater_exact_success_rate'])
+            print(f"Mejor {without_last_letter} por retorno esperado exacto: " + data['greater_exact_expected_return'])
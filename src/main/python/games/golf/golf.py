@@ -13,8 +13,26 @@ class Golf(Game):
     cada uno con características distintas.
     """
 
-    def __init__(self, discount_factor=0.9, learning_factor=0.1, iterations=1000):
-        super().__init__(RecordEpisodeStatistics(GolfEnv()), discount_factor, learning_factor, iterations)
+    # Símbolo de cada dirección de GolfEnv.directions (el eje y crece hacia abajo)
+    direction_symbols = {
+        (-1, -1): "↖",
+        (-1, 0): "←",
+        (-1, 1): "↙",
+        (0, -1): "↑",
+        (0, 1): "↓",
+        (1, -1): "↗",
+        (1, 0): "→",
+        (1, 1): "↘",
+    }
+
+    def __init__(self, discount_factor=0.9, learning_factor=0.1, iterations=1000, discrete_observations=False):
+        """
+        Argumentos:
+        discrete_observations -- si es True, los estados son enteros (ver
+                                 GolfEnv) y los agentes usan tablas Q densas
+        """
+        super().__init__(RecordEpisodeStatistics(GolfEnv(discrete_observations=discrete_observations)),
+                         discount_factor, learning_factor, iterations)
 
     def resolve_golf_by_montecarlo(self):
         """Resolución del entorno Golf utilizando Montecarlo con inicios exploratorios."""
@@ -31,30 +49,40 @@ class Golf(Game):
     def resolve_golf_by_double_q_learning(self, epsilon, alpha, gamma):
         return self.resolve_by_double_q_learning(epsilon, alpha, gamma)
 
+    def resolve_golf_by_value_iteration(self):
+        """Resolución del entorno Golf utilizando iteración de valores (requiere discrete_observations)."""
+        return self.resolve_by_value_iteration()
+
+    def resolve_golf_by_policy_iteration(self):
+        """Resolución del entorno Golf utilizando iteración de políticas (requiere discrete_observations)."""
+        return self.resolve_by_policy_iteration()
+
     def show_policy(self, agent):
-        direction_symbols = {
-            0: "↓",  # Mover hacia el sur (abajo)
-            1: "↑",  # Mover hacia el norte (arriba)
-            2: "→",  # Mover hacia el este (derecha)
-            3: "←",  # Mover hacia el oeste (izquierda)
-        }
+        """Imprime, para cada casilla del campo, el palo, la dirección y la fuerza elegidos.
 
+        Las casillas que el agente no ha visitado se muestran con un punto.
+        """
         policy = agent.get_policy()
         env = self.environment
         width = env.width
         height = env.height
 
-        for row in range(width):
-            for col in range(height):
-                state = PositionGolfBall(row, col)
-                if state in env.target_location:
+        for row in range(height):
+            for col in range(width):
+                position = PositionGolfBall(col, row)
+                state = env.encode(position) if env.discrete_observations else position
+                if position == env.target_location:
                     # Si la celda es una ubicación objetivo, mantener su valor original
                     print("G", end=" ")
+                elif state not in policy:
+                    print(".", end=" ")
                 else:
                     # Si la celda no es una ubicación objetivo, obtener la política para el estado actual
                     action = numpy.argmax(policy[state])
-                    club_index, direction_index, force_index = self.take_action(action)
-                    action_str = f"({club_index}, {self.direction_symbols[direction_index]}, {env.golfs_club[club_index] + force_index})"
+                    club_index, direction_index, force_index = env.take_action(action)
+                    direction = tuple(env.directions[direction_index].tolist())
+                    force = env.golfs_club[club_index].min_force + force_index
+                    action_str = f"({club_index}, {self.direction_symbols[direction]}, {force})"
                     print(action_str, end=" ")
             print()
 
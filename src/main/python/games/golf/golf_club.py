@@ -1,7 +1,6 @@
-import random
 from dataclasses import dataclass
 
-from src.main.python.games.golf.position_golf_ball import PositionGolfBall
+import numpy as np
 
 
 @dataclass
@@ -10,12 +9,22 @@ class GolfClub:
     max_force: int
     min_precision: int
     max_precision: int
-    modify: float = 1
 
-    def hit(self, origin, direction, force):
-        force = self.min_force + force
-        precision = random.randint(int(self.min_precision/self.modify), int(self.max_precision/self.modify))
+    def precision_range(self, modify=1):
+        """Devuelve la mínima y la máxima desviación del golpe, ambas incluidas.
 
-        x = origin.x + direction[0] * (force + precision)
-        y = origin.y + direction[1] * (force + precision)
-        return PositionGolfBall(x, y)
+        Argumentos:
+        modify -- factor que divide la precisión (por defecto 1, sin modificar)
+        """
+        return int(self.min_precision/modify), int(self.max_precision/modify)
+
+    def outcome_distribution(self, force, modify=1):
+        """Devuelve las distancias que puede recorrer la bola y la probabilidad de cada una.
+
+        Argumentos:
+        force -- índice de la fuerza del golpe, sumado a la fuerza mínima
+        modify -- factor que divide la precisión (por defecto 1, sin modificar)
+        """
+        low, high = self.precision_range(modify)
+        distances = self.min_force + force + np.arange(low, high + 1)
+        return distances, np.full(len(distances), 1 / len(distances))
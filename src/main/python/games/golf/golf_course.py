@@ -0,0 +1,129 @@
+import hashlib
+import os
+
+import numpy as np
+
+# Códigos del terreno de cada casilla del campo (ver GolfEnv.terrain)
+GRASS = 0
+SAND = 1
+WATER = 2
+GOAL = 3
+OUT_OF_BOUNDS = 4
+
+# Directorio por defecto de los campos ya analizados. Es propio del usuario:
+# un directorio temporal compartido permitiría a otro usuario dejar en él
+# campos manipulados que load_course daría por buenos
+COURSE_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(os.path.join("~", ".cache")),
+                                "golf_courses")
+
+# Versión del formato de los campos analizados; forma parte del nombre de los
+# ficheros de cache_dir y debe incrementarse al cambiar parse_course o
+# _CHARACTER_CODES para no cargar campos analizados con las reglas antiguas
+COURSE_FORMAT_VERSION = 1
+
+# Código de cada carácter del fichero del campo; el resto queda fuera del campo
+_CHARACTER_CODES = np.full(256, OUT_OF_BOUNDS, dtype=np.int8)
+_CHARACTER_CODES[ord('G')] = GRASS
+_CHARACTER_CODES[ord('O')] = GRASS
+_CHARACTER_CODES[ord('S')] = SAND
+_CHARACTER_CODES[ord('W')] = WATER
+_CHARACTER_CODES[ord('E')] = GOAL
+
+# Campos ya cargados en este proceso, por hash del fichero
+_loaded_courses = {}
+
+
+def parse_course(text):
+    """Analiza el texto de un campo de golf.
+
+    Cada línea es una fila del campo y cada carácter una casilla: 'G' césped,
+    'O' césped de salida, 'S' arena, 'W' agua y 'E' hoyo. Lo que sigue a un
+    '#' es un comentario y, como cualquier otro carácter, queda fuera del
+    campo. La anchura es la de la primera línea.
+
+    Devuelve un array (alto, ancho) con el código del terreno de cada casilla,
+    indexado por [y, x], y un array (salidas, 2) con las posiciones (x, y) de
+    las casillas de salida.
+    """
+    rows = text.splitlines()
+    while rows and not rows[-1]:
+        rows.pop()
+    width = len(rows[0]) if rows else 0
+    # Todas las filas se leen a la vez como una matriz de caracteres
+    grid = np.frombuffer("".join(row[:width].ljust(width) for row in rows).encode("latin-1"), dtype=np.uint8)
+    grid = grid.reshape(len(rows), width)
+    comments = np.maximum.accumulate(grid == ord('#'), axis=1)
+    terrain = _CHARACTER_CODES[grid]
+    terrain[comments] = OUT_OF_BOUNDS
+    origins = np.argwhere((grid == ord('O')) & ~comments)[:, ::-1].astype(np.int64)
+    return terrain, origins
+
+
+def load_course(path, cache_dir=COURSE_CACHE_DIR):
+    """Carga un campo de golf, reutilizando los que ya se analizaron.
+
+    Los campos se identifican por el hash de su contenido. Un campo ya cargado
+    en el proceso se comparte entre todos los entornos; si no, se busca su
+    versión binaria (un .npy por array) en cache_dir y, si tampoco existe o
+    no tiene la forma esperada, se analiza el texto con parse_course y se
+    guarda allí. Los .npy se proyectan en memoria (mmap_mode='r'), de modo
+    que los procesos que cargan el mismo campo comparten sus páginas. Los
+    arrays devueltos son de solo lectura porque se comparten.
+
+    Argumentos:
+    path -- ruta del fichero de texto del campo
+    cache_dir -- directorio de los campos analizados (None para no usarlo)
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    key = hashlib.sha256(content).hexdigest()
+    course = _loaded_courses.get(key)
+    if course is not None:
+        return course
+
+    cache_paths = _cache_paths(cache_dir, key) if cache_dir is not None else None
+    course = None
+    if cache_paths is not None and all(os.path.exists(cache_path) for cache_path in cache_paths):
+        try:
+            course = tuple(np.load(cache_path, mmap_mode='r') for cache_path in cache_paths)
+        except (OSError, ValueError):
+            course = None
+        if course is not None and not _is_valid_course(*course):
+            course = None
+    if course is None:
+        course = parse_course(content.decode("latin-1"))
+        if cache_paths is not None:
+            _save_course(cache_dir, cache_paths, course)
+    for array in course:
+        array.flags.writeable = False
+    _loaded_courses[key] = course
+    return course
+
+
+def _cache_paths(cache_dir, key):
+    return tuple(os.path.join(cache_dir, "%s.v%d.%s.npy" % (key, COURSE_FORMAT_VERSION, name))
+                 for name in ("terrain", "origins"))
+
+
+def _is_valid_course(terrain, origins):
+    # Un fichero de la caché solo se usa si tiene la forma y los tipos que
+    # devuelve parse_course; si no, se vuelve a analizar el campo
+    if terrain.dtype != np.int8 or terrain.ndim != 2:
+        return False
+    if origins.dtype != np.int64 or origins.ndim != 2 or origins.shape[1] != 2:
+        return False
+    return bool(np.all((terrain >= GRASS) & (terrain <= OUT_OF_BOUNDS)))
+
+
+def _save_course(cache_dir, cache_paths, course):
+    # El directorio solo es accesible para su dueño. Cada array se escribe en
+    # un fichero temporal y se renombra para que otro proceso nunca lea un
+    # fichero a medias; si no se puede escribir, no se guarda
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        for cache_path, array in zip(cache_paths, course):
+            temporary_path = cache_path + ".%d.tmp.npy" % os.getpid()
+            np.save(temporary_path, array)
+            os.replace(temporary_path, cache_path)
+    except OSError:
+        pass
@@ -6,12 +6,35 @@ import numpy as np
 import pygame
 from gym import spaces
 
+from src.main.python.batch_env import SyncBatchEnv
 from src.main.python.games.golf.golf_club import GolfClub
+from src.main.python.games.golf.golf_course import GOAL, GRASS, OUT_OF_BOUNDS, SAND, WATER, load_course
 from src.main.python.games.golf.position_golf_ball import PositionGolfBall
 
+# Factor que divide la precisión de los golpes dados desde la arena
+SAND_MODIFY = 0.5
+
+# Recompensa por caer en cada tipo de terreno
+TERRAIN_REWARDS = np.empty(OUT_OF_BOUNDS + 1)
+TERRAIN_REWARDS[[GRASS, SAND, WATER, GOAL, OUT_OF_BOUNDS]] = [-5, -10, -100, 100, -100]
+
 
 @dataclass
 class GolfEnv(gym.Env):
+    """Entorno del campo de golf.
+
+    Por defecto el estado es la posición de la bola (PositionGolfBall). Con
+    discrete_observations = True el estado es el entero y * width + x, con un
+    espacio de observación Discrete(width * height + 1) cuyo último estado
+    representa la bola fuera del campo; encode y decode convierten entre
+    posiciones y estados. En este modo el entorno expone además su modelo de
+    transición en P y la distribución de estados iniciales en
+    initial_state_distrib, con el mismo formato que FrozenLake y Taxi.
+
+    Los golpes se muestrean de shot_outcomes, que guarda para cada acción la
+    distribución exacta de los desplazamientos de la bola desde el césped
+    ([acción][0]) y desde la arena ([acción][1]).
+    """
     width: int = 10
     height: int = 15
     golfs_club = [
@@ -26,6 +49,7 @@ class GolfEnv(gym.Env):
     terminated: bool = False
     window_size: int = 512
     render_mode: str = None
+    discrete_observations: bool = False
     window = None
     clock = None
 
@@ -40,10 +64,13 @@ class GolfEnv(gym.Env):
         assert self.render_mode is None or self.render_mode in self.metadata["render_modes"]
 
         # Definición del espacio de observación
-        self.observation_space = spaces.Dict({
-            "agent": spaces.Box(0, np.array([self.width, self.height]) - 1, dtype=int),
-            "target": spaces.Box(0, np.array([self.width, self.height]) - 1, dtype=int),
-        })
+        if self.discrete_observations:
+            self.observation_space = spaces.Discrete(self.width * self.height + 1)
+        else:
+            self.observation_space = spaces.Dict({
+                "agent": spaces.Box(0, np.array([self.width, self.height]) - 1, dtype=int),
+                "target": spaces.Box(0, np.array([self.width, self.height]) - 1, dtype=int),
+            })
 
         # Definición del espacio de acción
         actions = 0
@@ -51,38 +78,122 @@ class GolfEnv(gym.Env):
             actions += len(self.directions) * (golf_club.max_force - golf_club.min_force + 1)
         self.action_space = spaces.Discrete(actions)
 
-    def reset(self):
+        self._build_shot_outcomes()
+        self._transitions = None
+        if self.discrete_observations:
+            self.initial_state_distrib = np.zeros(self.observation_space.n)
+            self.initial_state_distrib[[self.encode(origin) for origin in self.origin]] += 1
+            self.initial_state_distrib /= self.initial_state_distrib.sum()
+
+    def _build_shot_outcomes(self):
+        self.shot_outcomes = []
+        for action in range(self.action_space.n):
+            club_index, direction_index, force_index = self.take_action(action)
+            golf_club = self.golfs_club[club_index]
+            lies = []
+            for modify in (1, SAND_MODIFY):
+                distances, probabilities = golf_club.outcome_distribution(force_index, modify)
+                offsets = self.directions[direction_index] * distances[:, None]
+                cumulative = np.cumsum(probabilities)
+                cumulative[-1] = 1.0
+                lies.append((offsets, probabilities, cumulative))
+            self.shot_outcomes.append(lies)
+
+    @property
+    def P(self):
+        """Modelo de transición: P[estado][acción] es una lista de transiciones
+        (probabilidad, estado siguiente, recompensa, terminado).
+
+        Solo existe con observaciones discretas. Se calcula la primera vez que
+        se solicita. Caer en el hoyo, en el agua o fuera del campo termina el
+        episodio, y esos estados son absorbentes.
+        """
+        if not self.discrete_observations:
+            raise AttributeError("P solo existe con observaciones discretas")
+        if self._transitions is None:
+            self._transitions = self._build_transitions()
+        return self._transitions
+
+    def _build_transitions(self):
+        num_actions = self.action_space.n
+        terrain = self.terrain.ravel()
+        cells = np.flatnonzero((terrain == GRASS) | (terrain == SAND))
+        starts = np.stack((cells % self.width, cells // self.width), axis=1)
+        in_sand = terrain[cells] == SAND
+
+        transitions = {}
+        for state in range(self.observation_space.n):
+            if state == self.out_of_bounds_state or terrain[state] not in (GRASS, SAND):
+                transitions[state] = {action: [(1.0, state, 0, True)] for action in range(num_actions)}
+            else:
+                transitions[state] = {}
+        for action in range(num_actions):
+            for lie in (0, 1):
+                offsets, probabilities, _ = self.shot_outcomes[action][lie]
+                lie_cells = cells[in_sand == lie]
+                # Casillas de destino de todos los golpes desde todas las casillas a la vez
+                landings = starts[in_sand == lie][:, None, :] + offsets[None, :, :]
+                x, y = landings[..., 0], landings[..., 1]
+                inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+                next_states = np.where(inside, y * self.width + x, self.out_of_bounds_state)
+                landing_terrain = np.where(inside, terrain[np.where(inside, next_states, 0)], OUT_OF_BOUNDS)
+                rewards = TERRAIN_REWARDS[landing_terrain]
+                terminals = (landing_terrain != GRASS) & (landing_terrain != SAND)
+                for state, row_states, row_rewards, row_terminals in zip(
+                        lie_cells.tolist(), next_states.tolist(), rewards.tolist(), terminals.tolist()):
+                    # Se agrupan los golpes que acaban en el mismo estado
+                    outcomes = {}
+                    for next_state, probability, reward, terminal in zip(row_states, probabilities.tolist(),
+                                                                         row_rewards, row_terminals):
+                        if next_state in outcomes:
+                            outcomes[next_state][0] += probability
+                        else:
+                            outcomes[next_state] = [probability, next_state, reward, terminal]
+                    transitions[state][action] = [tuple(outcome) for outcome in outcomes.values()]
+        return transitions
+
+    def reset(self, seed=None, options=None):
+        super().reset(seed=seed)
         self.agent_location = self._get_random_location()
         self.terminated = False
         self.truncated = False
-        return self._get_observation()
+        return self._get_state(), self._get_info()
 
     def step(self, action):
 
-        club_index, direction_index, force_index = self.take_action(action)
-
-        golf_club = self.golfs_club[club_index]
-        direction_vector = self.directions[direction_index]
-
         if self.render_mode == "human":
             self._render_frame()
 
-        self.agent_location = golf_club.hit(self.agent_location, direction_vector, force_index)
+        # Desde la arena el golpe es menos preciso
+        lie = 1 if self.terrain_at(self.agent_location) == SAND else 0
+        offsets, _, cumulative = self.shot_outcomes[action][lie]
+        offset = offsets[np.searchsorted(cumulative, self.np_random.random(), side='right')]
+        self.agent_location = PositionGolfBall(int(self.agent_location.x + offset[0]),
+                                               int(self.agent_location.y + offset[1]))
 
-        if self.agent_location == self.target_location:
+        terrain = self.terrain_at(self.agent_location)
+        if terrain == GOAL:
             self.terminated = True
             reward = 100  # Recompensa por llegar al hoyo
-        elif self.agent_location in self.lake or (
-                self.agent_location not in self.field and self.agent_location not in self.sands):
+        elif terrain == WATER or terrain == OUT_OF_BOUNDS:
             self.truncated = True
             reward = -100  # Penalización por caer en el lago o fuera del campo
-        elif self.agent_location in self.sands:
+        elif terrain == SAND:
             reward = -10  # Penalización por caer en arena
-            golf_club.modify = 0.5  # Modificar la fuerza del golpe
         else:
             reward = -5  # Penalización por caer en el césped
 
-        return self.agent_location, reward, self.terminated, self.truncated, self._get_info()
+        return self._get_state(), reward, self.terminated, self.truncated, self._get_info()
+
+    def batch(self, num_envs):
+        """Devuelve num_envs copias del entorno que avanzan a la vez (ver make_batch_env).
+
+        Con observaciones discretas las bolas se simulan con BatchGolfEnv; en
+        otro caso, con copias del entorno.
+        """
+        if self.discrete_observations:
+            return BatchGolfEnv(self, num_envs)
+        return SyncBatchEnv(self, num_envs)
 
     def take_action(self, action):
         num_clubs = len(self.golfs_club)
@@ -98,6 +209,40 @@ class GolfEnv(gym.Env):
         force_index = (action // (num_directions * num_clubs))
         return club_index, direction_index, force_index
 
+    @property
+    def out_of_bounds_state(self):
+        """Estado discreto que representa la bola fuera del campo."""
+        return self.width * self.height
+
+    @property
+    def target_state(self):
+        """Estado del hoyo, en el formato de los estados que devuelve step."""
+        return self.encode(self.target_location) if self.discrete_observations else self.target_location
+
+    def encode(self, position):
+        """Devuelve el estado discreto de una posición."""
+        x, y = int(position.x), int(position.y)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return y * self.width + x
+        return self.out_of_bounds_state
+
+    def decode(self, state):
+        """Devuelve la posición de un estado discreto o None si está fuera del campo."""
+        if state == self.out_of_bounds_state:
+            return None
+        y, x = divmod(int(state), self.width)
+        return PositionGolfBall(x, y)
+
+    def _get_state(self):
+        return self.encode(self.agent_location) if self.discrete_observations else self.agent_location
+
+    def terrain_at(self, position):
+        """Devuelve el código del terreno de una posición (OUT_OF_BOUNDS si está fuera del campo)."""
+        x, y = int(position.x), int(position.y)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.terrain[y, x]
+        return OUT_OF_BOUNDS
+
     def render(self):
         if self.render_mode == "rgb_array":
             return self._render_frame()
@@ -284,7 +429,7 @@ class GolfEnv(gym.Env):
             pygame.quit()
 
     def _get_random_location(self):
-        return self.origin[np.random.randint(0, len(self.origin))]
+        return self.origin[self.np_random.integers(0, len(self.origin))]
 
     def _read_camp(self):
         # Obtener la ruta del archivo del campo de golf
@@ -296,41 +441,97 @@ class GolfEnv(gym.Env):
             camp_path = os.path.dirname(
                 os.path.abspath(__file__.replace("python\games\golf", "resources\golf_camp.txt")))
 
-        # Abrir el archivo en modo lectura
-        with open(camp_path, 'r') as f:
-            # Leer todas las líneas del archivo y almacenarlas en una lista
-            lines = f.readlines()
-
-            # Obtener el número de filas y columnas del campo de golf
-            self.height = len(lines) - 1
-            self.width = len(lines[0]) - 1
-
-            # Inicializar listas para almacenar las ubicaciones de los obstáculos y el campo
-            self.lake = []
-            self.sands = []
-            self.origin = []
-            self.field = []
-
-            # Recorrer cada línea del archivo
-            for i in range(self.height):
-                line = lines[i]
-
-                # Recorrer cada carácter de la línea
-                for j in range(self.width):
-                    char = line[j]
-                    position = PositionGolfBall(j, i)
-
-                    if char == '#':  # Por si se quiere añadir algún comentario en el archivo
-                        break
-                    elif char == 'W':  # Obstáculo de agua (lake)
-                        self.lake = np.append(self.lake, [position])
-                    elif char == 'S':  # Obstáculo de arena (sands)
-                        self.sands = np.append(self.sands, [position])
-                    elif char == 'O':  # Posición de origen (origin) y campo (field)
-                        self.field = np.append(self.field, [position])
-                        self.origin = np.append(self.origin, [position])
-                    elif char == 'E':  # Posición objetivo (target_location) y campo (field)
-                        self.field = np.append(self.field, [position])
-                        self.target_location = position
-                    elif char == 'G':  # Campo (field)
-                        self.field = np.append(self.field, [position])
+        # Código del terreno de cada casilla, indexado por [y, x], y posiciones
+        # de salida; el campo se comparte entre todos los entornos
+        self.terrain, origins = load_course(camp_path)
+        self.height, self.width = self.terrain.shape
+
+        # Posiciones de cada tipo de terreno, usadas para dibujar el campo
+        self.lake = self._positions(np.argwhere(self.terrain == WATER)[:, ::-1])
+        self.sands = self._positions(np.argwhere(self.terrain == SAND)[:, ::-1])
+        self.field = self._positions(np.argwhere((self.terrain == GRASS) | (self.terrain == GOAL))[:, ::-1])
+        self.origin = self._positions(origins)
+        targets = np.argwhere(self.terrain == GOAL)
+        if len(targets):
+            self.target_location = PositionGolfBall(int(targets[0, 1]), int(targets[0, 0]))
+
+    @staticmethod
+    def _positions(coordinates):
+        positions = np.empty(len(coordinates), dtype=object)
+        for index, (x, y) in enumerate(coordinates.tolist()):
+            positions[index] = PositionGolfBall(x, y)
+        return positions
+
+
+class BatchGolfEnv:
+    """Simula a la vez num_envs bolas de un GolfEnv con observaciones discretas.
+
+    Las posiciones se guardan en un array (bolas, 2) de enteros, y cada paso
+    sortea el desplazamiento de todos los golpes de las mismas tablas que
+    GolfEnv (shot_outcomes) y clasifica el terreno de todas las casillas de
+    destino con operaciones de NumPy. Sigue la interfaz de SyncBatchEnv: cada bola vuelve a una casilla
+    de salida cuando su episodio termina.
+    """
+
+    def __init__(self, env, num_envs):
+        """
+        Argumentos:
+        env -- GolfEnv con discrete_observations = True
+        num_envs -- número de bolas que se simulan a la vez
+        """
+        self.env = env
+        self.num_envs = num_envs
+        self.action_space = env.action_space
+        self.observation_space = env.observation_space
+        self.random_generator = np.random.default_rng(np.random.randint(2 ** 31))
+        self.origins = np.array([[origin.x, origin.y] for origin in env.origin], dtype=np.int64)
+        # Las distribuciones de env.shot_outcomes se copian en arrays
+        # (acciones, 2, desplazamientos) rellenos hasta la longitud máxima; la
+        # probabilidad acumulada del relleno vale 1 para que nunca se elija
+        num_outcomes = max(len(offsets) for lies in env.shot_outcomes for offsets, _, _ in lies)
+        self.offsets = np.zeros((env.action_space.n, 2, num_outcomes, 2), dtype=np.int64)
+        self.cumulative = np.ones((env.action_space.n, 2, num_outcomes))
+        for action, lies in enumerate(env.shot_outcomes):
+            for lie, (offsets, _, cumulative) in enumerate(lies):
+                self.offsets[action, lie, :len(offsets)] = offsets
+                self.cumulative[action, lie, :len(cumulative)] = cumulative
+        self.positions = None
+
+    def _random_origins(self, count):
+        return self.origins[self.random_generator.integers(len(self.origins), size=count)]
+
+    def _terrain(self, positions):
+        x, y = positions[:, 0], positions[:, 1]
+        inside = (x >= 0) & (x < self.env.width) & (y >= 0) & (y < self.env.height)
+        terrain = np.full(len(positions), OUT_OF_BOUNDS, dtype=self.env.terrain.dtype)
+        terrain[inside] = self.env.terrain[y[inside], x[inside]]
+        return terrain, inside
+
+    def _states(self, positions, inside):
+        return np.where(inside, positions[:, 1] * self.env.width + positions[:, 0], self.env.out_of_bounds_state)
+
+    def reset(self):
+        """Coloca todas las bolas en casillas de salida y devuelve sus estados."""
+        self.positions = self._random_origins(self.num_envs)
+        return self._states(self.positions, np.ones(self.num_envs, dtype=bool))
+
+    def step(self, actions):
+        """Golpea cada bola con su acción (ver SyncBatchEnv.step)."""
+        actions = np.asarray(actions)
+        lies = (self._terrain(self.positions)[0] == SAND).astype(np.int64)
+        cumulative = self.cumulative[actions, lies]
+        outcomes = np.count_nonzero(cumulative <= self.random_generator.random(self.num_envs)[:, None], axis=1)
+        positions = self.positions + self.offsets[actions, lies, outcomes]
+
+        terrain, inside = self._terrain(positions)
+        next_states = self._states(positions, inside)
+        rewards = TERRAIN_REWARDS[terrain]
+        terminated = terrain == GOAL
+        truncated = (terrain == WATER) | (terrain == OUT_OF_BOUNDS)
+
+        done = terminated | truncated
+        positions[done] = self._random_origins(np.count_nonzero(done))
+        self.positions = positions
+        reset_states = next_states.copy()
+        reset_states[done] = self._states(positions[done], np.ones(np.count_nonzero(done), dtype=bool))
+        return next_states, rewards, terminated, truncated, reset_states
@@ -0,0 +1,158 @@
+import math
+from abc import ABC, abstractmethod
+
+import numpy
+
+
+# Primeros números primos, bases de la secuencia de Halton de cada dimensión
+HALTON_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29)
+
+
+class Sampler(ABC):
+    """Base de los muestreadores de configuraciones dentro de rangos continuos.
+
+    Cada configuración es una tupla con un valor por rango. Las subclases
+    generan puntos del cubo unidad en _ask_unit, que se escalan a los rangos.
+    Los muestreadores secuenciales (sequential = True) necesitan conocer la
+    puntuación de cada configuración, mediante tell, antes de proponer la
+    siguiente; los demás pueden proponer todas las configuraciones de una vez.
+    """
+
+    sequential = False
+
+    def __init__(self, ranges, seed=None):
+        """
+        Argumentos:
+        ranges -- lista de pares (mínimo, máximo), uno por hiperparámetro
+        seed -- semilla o SeedSequence del generador de números aleatorios
+        """
+        self.lows = numpy.array([low for low, _ in ranges], dtype=float)
+        self.highs = numpy.array([high for _, high in ranges], dtype=float)
+        self.random_generator = numpy.random.default_rng(seed)
+
+    @property
+    def dimensions(self):
+        return len(self.lows)
+
+    @abstractmethod
+    def _ask_unit(self):
+        """Devuelve el siguiente punto del cubo unidad."""
+
+    def to_unit(self, configuration):
+        """Lleva una configuración al cubo unidad."""
+        spans = numpy.where(self.highs > self.lows, self.highs - self.lows, 1.0)
+        return (numpy.asarray(configuration, dtype=float) - self.lows) / spans
+
+    def ask(self):
+        """Devuelve la siguiente configuración a probar."""
+        point = self.lows + self._ask_unit() * (self.highs - self.lows)
+        return tuple(point.tolist())
+
+    def tell(self, configuration, score):
+        """Registra la puntuación de una configuración (mayor es mejor)."""
+
+
+class RandomSampler(Sampler):
+    """Muestreo uniforme e independiente en los rangos."""
+
+    def _ask_unit(self):
+        return self.random_generator.random(self.dimensions)
+
+
+class HaltonSampler(Sampler):
+    """Secuencia de baja discrepancia de Halton.
+
+    Cubre los rangos de forma más uniforme que el muestreo aleatorio con el
+    mismo número de puntos. Con shift = True la secuencia se desplaza módulo 1
+    por un vector aleatorio (rotación de Cranley-Patterson), de modo que
+    distintas semillas dan conjuntos distintos con la misma uniformidad.
+    """
+
+    def __init__(self, ranges, seed=None, shift=True):
+        super().__init__(ranges, seed)
+        if self.dimensions > len(HALTON_BASES):
+            raise ValueError("Demasiadas dimensiones para la secuencia de Halton")
+        self.bases = HALTON_BASES[:self.dimensions]
+        self.shift = self.random_generator.random(self.dimensions) if shift else numpy.zeros(self.dimensions)
+        # Se omite el índice 0, que daría el origen en todas las dimensiones
+        self.index = 1
+
+    def _ask_unit(self):
+        point = numpy.array([radical_inverse(self.index, base) for base in self.bases])
+        self.index += 1
+        return (point + self.shift) % 1.0
+
+
+def radical_inverse(index, base):
+    """Refleja los dígitos de index en base respecto a la coma decimal."""
+    result = 0.0
+    factor = 1.0 / base
+    while index > 0:
+        index, digit = divmod(index, base)
+        result += digit * factor
+        factor /= base
+    return result
+
+
+class ModelBasedSampler(Sampler):
+    """Muestreo secuencial guiado por un modelo de las puntuaciones observadas.
+
+    Tras initial_points configuraciones aleatorias, las observadas se dividen
+    en buenas (la fracción good_fraction con mayor puntuación) y malas, y se
+    estima la densidad de cada grupo con núcleos gaussianos de anchura
+    bandwidth en el cubo unidad. Se generan candidates candidatos alrededor de
+    las configuraciones buenas y se propone el que maximiza el cociente entre
+    la densidad de las buenas y la de las malas, como en el estimador de
+    Parzen con estructura de árbol (TPE).
+    """
+
+    sequential = True
+
+    def __init__(self, ranges, seed=None, initial_points=5, candidates=64, good_fraction=0.25, bandwidth=0.1):
+        super().__init__(ranges, seed)
+        self.initial_points = initial_points
+        self.candidates = candidates
+        self.good_fraction = good_fraction
+        self.bandwidth = bandwidth
+        self.points = []
+        self.scores = []
+
+    def tell(self, configuration, score):
+        self.points.append(self.to_unit(configuration))
+        self.scores.append(score)
+
+    def _density(self, points, centers):
+        distances = numpy.sum((points[:, None, :] - centers[None, :, :]) ** 2, axis=2)
+        return numpy.mean(numpy.exp(-distances / (2 * self.bandwidth ** 2)), axis=1) + 1e-12
+
+    def _ask_unit(self):
+        if len(self.points) < max(self.initial_points, 2):
+            return self.random_generator.random(self.dimensions)
+        points = numpy.array(self.points)
+        order = numpy.argsort(-numpy.array(self.scores), kind='stable')
+        num_good = max(math.ceil(self.good_fraction * len(points)), 1)
+        good = points[order[:num_good]]
+        bad = points[order[num_good:]]
+        centers = good[self.random_generator.integers(len(good), size=self.candidates)]
+        candidates = centers + self.bandwidth * self.random_generator.standard_normal(centers.shape)
+        candidates = numpy.clip(candidates, 0.0, 1.0)
+        ratios = self._density(candidates, good) / self._density(candidates, bad)
+        return candidates[numpy.argmax(ratios)]
+
+
+def make_sampler(name, ranges, seed=None):
+    """Crea un muestreador a partir de su nombre.
+
+    Argumentos:
+    name -- 'random', 'halton' o 'model'
+    ranges -- lista de pares (mínimo, máximo), uno por hiperparámetro
+    seed -- semilla o SeedSequence del generador de números aleatorios
+    """
+    if name == 'random':
+        return RandomSampler(ranges, seed)
+    elif name == 'halton':
+        return HaltonSampler(ranges, seed)
+    elif name == 'model':
+        return ModelBasedSampler(ranges, seed)
+    else:
+        raise ValueError("Muestreador no encontrado")
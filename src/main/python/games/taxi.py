@@ -22,6 +22,14 @@ class Taxi(Game):
         """Resolución del entorno Taxi utilizando Q-Learning."""
         return self.resolve_by_q_learning(epsilon)
 
+    def resolve_taxi_by_dyna_q(self, epsilon=0.1, planning_steps=10):
+        """Resolución del entorno Taxi utilizando Dyna-Q."""
+        return self.resolve_by_dyna_q(epsilon, planning_steps)
+
+    def resolve_taxi_by_prioritized_sweeping(self, epsilon=0.1, planning_steps=10):
+        """Resolución del entorno Taxi utilizando barrido priorizado."""
+        return self.resolve_by_prioritized_sweeping(epsilon, planning_steps)
+
     def resolve_taxi_by_sarsa(self, epsilon=0.1, alpha=0.1, gamma=0.99):
         """Resolución del entorno Taxi utilizando Sarsa."""
         return self.resolve_by_sarsa(epsilon, alpha, gamma)
@@ -30,6 +38,14 @@ class Taxi(Game):
         """Resolución del entorno Taxi utilizando Double Q-Learning."""
         return self.resolve_by_double_q_learning(epsilon, alpha, gamma)
 
+    def resolve_taxi_by_value_iteration(self):
+        """Resolución del entorno Taxi utilizando iteración de valores."""
+        return self.resolve_by_value_iteration()
+
+    def resolve_taxi_by_policy_iteration(self):
+        """Resolución del entorno Taxi utilizando iteración de políticas."""
+        return self.resolve_by_policy_iteration()
+
     def show_policy(self, agent):
         action_symbols = {
             0: "↓",  # Mover hacia el sur (abajo)
@@ -0,0 +1,121 @@
+import numpy
+
+from src.main.python.environment_statistic import EnvironmentStatistic
+from src.main.python.tabular_model import TabularModel
+
+
+class PolicyEvaluator:
+    """Evalúa de forma exacta la política de un agente sobre el modelo env.P.
+
+    No ejecuta episodios: a partir de la política devuelta por get_policy
+    construye la matriz de transición que induce la política y calcula, desde
+    la distribución de estados iniciales, el retorno descontado esperado, la
+    recompensa media por episodio y la probabilidad de éxito. Las dos últimas
+    tienen en cuenta el límite de pasos del entorno, por lo que son
+    comparables con las estadísticas de EnvironmentStatistic.
+    """
+
+    def __init__(self, env, discount_factor, method='auto', tolerance=1e-10, max_iterations=10000):
+        """Compila el modelo del entorno.
+
+        Argumentos:
+        env -- entorno con espacios Discrete y modelo en env.P
+        discount_factor -- factor de descuento del retorno esperado
+        method -- 'linear' para resolver el sistema (I - γ P_π) V = R_π,
+                  'iterative' para aproximarlo por iteración sobre las
+                  transiciones compactas del modelo o 'auto' (por defecto)
+                  para usar 'linear' con hasta 2000 estados
+        tolerance -- variación máxima de los valores para dar por terminada
+                     la iteración
+        max_iterations -- número máximo de iteraciones
+        """
+        self.env = env
+        self.discount_factor = discount_factor
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.model = TabularModel(env)
+        if method == 'auto':
+            method = 'linear' if self.model.num_states <= 2000 else 'iterative'
+        if method not in ('linear', 'iterative'):
+            raise ValueError("Método de evaluación no encontrado")
+        self.method = method
+        terminal_states = numpy.array(sorted(EnvironmentStatistic(env).get_terminal_states()), dtype=numpy.int64)
+        successes = self.model.terminals & numpy.isin(self.model.next_states, terminal_states)
+        self.success_probabilities = numpy.sum(self.model.probabilities * successes, axis=2)
+
+    def policy_matrix(self, policy):
+        """Convierte una política en un array (estados, acciones) de probabilidades.
+
+        Argumentos:
+        policy -- diccionario que asocia a cada estado un array con la
+                  probabilidad de cada acción (ver get_policy); los estados
+                  ausentes eligen las acciones de forma uniforme
+        """
+        matrix = numpy.full((self.model.num_states, self.model.num_actions), 1.0 / self.model.num_actions)
+        for state, probabilities in policy.items():
+            matrix[state] = probabilities
+        return matrix / matrix.sum(axis=1, keepdims=True)
+
+    def _propagate(self, weights, values):
+        """Devuelve P_π · values usando las transiciones compactas del modelo."""
+        return numpy.einsum('sak,sak...->s...', weights, values[self.model.next_states])
+
+    def _state_values(self, rewards, weights):
+        if self.method == 'linear' and self.discount_factor < 1:
+            transitions = numpy.zeros((self.model.num_states, self.model.num_states))
+            states = numpy.broadcast_to(numpy.arange(self.model.num_states)[:, None, None], weights.shape)
+            numpy.add.at(transitions, (states, self.model.next_states), weights)
+            system = numpy.eye(self.model.num_states) - self.discount_factor * transitions
+            return numpy.linalg.solve(system, rewards)
+        values = numpy.zeros(self.model.num_states)
+        for _ in range(self.max_iterations):
+            new_values = rewards + self.discount_factor * self._propagate(weights, values)
+            converged = numpy.max(numpy.abs(new_values - values)) < self.tolerance
+            values = new_values
+            if converged:
+                break
+        return values
+
+    def _episode_values(self, rewards, successes, weights):
+        # Recompensa y probabilidad de éxito sin descontar, acumuladas como
+        # máximo durante el límite de pasos del episodio
+        horizon = self.model.max_episode_steps or self.max_iterations
+        immediate = numpy.stack((rewards, successes), axis=1)
+        values = numpy.zeros_like(immediate)
+        for _ in range(horizon):
+            new_values = immediate + self._propagate(weights, values)
+            converged = numpy.max(numpy.abs(new_values - values)) < self.tolerance
+            values = new_values
+            if converged:
+                break
+        return values[:, 0], values[:, 1]
+
+    def evaluate(self, policy):
+        """Evalúa una política y devuelve un diccionario con sus métricas.
+
+        Argumentos:
+        policy -- política en el formato de get_policy (ver policy_matrix)
+
+        Las claves 'mean_reward', 'success_rate' y 'failed_rate' tienen el
+        mismo significado que en EnvironmentStatistic.calculate_statistics;
+        'expected_return' es el retorno descontado esperado.
+        """
+        matrix = self.policy_matrix(policy)
+        weights = matrix[:, :, None] * self.model.continuation_probabilities
+        rewards = numpy.sum(matrix * self.model.expected_rewards, axis=1)
+        successes = numpy.sum(matrix * self.success_probabilities, axis=1)
+
+        state_values = self._state_values(rewards, weights)
+        episode_rewards, episode_successes = self._episode_values(rewards, successes, weights)
+        initial = self.model.initial_distribution
+        success_rate = float(initial @ episode_successes)
+        return {
+            'expected_return': float(initial @ state_values),
+            'mean_reward': float(initial @ episode_rewards),
+            'success_rate': success_rate * 100,
+            'failed_rate': (1 - success_rate) * 100
+        }
+
+    def evaluate_agent(self, agent):
+        """Evalúa la política de un agente (ver evaluate)."""
+        return self.evaluate(agent.get_policy())
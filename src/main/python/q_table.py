@@ -0,0 +1,82 @@
+from collections import defaultdict
+
+import numpy
+from gym import spaces
+
+
+class DenseQTable:
+    """Tabla Q almacenada en un único array contiguo de forma (estados, acciones).
+
+    Ofrece la misma interfaz de acceso que el diccionario usado por los agentes
+    (tabla[estado][acción]), de modo que cada fila es una vista sobre el array y
+    las actualizaciones se escriben directamente en él. El array completo está
+    disponible en el atributo array para operaciones vectorizadas.
+    """
+
+    def __init__(self, array):
+        """Crea la tabla a partir de un array bidimensional ya inicializado.
+
+        Argumentos:
+        array -- array de forma (número de estados, número de acciones)
+        """
+        self.array = array
+
+    def __getitem__(self, state):
+        return self.array[state]
+
+    def __setitem__(self, state, values):
+        self.array[state] = values
+
+    def __contains__(self, state):
+        return 0 <= state < len(self.array)
+
+    def __iter__(self):
+        return iter(range(len(self.array)))
+
+    def __len__(self):
+        return len(self.array)
+
+    def __repr__(self):
+        return f"DenseQTable({self.array!r})"
+
+    def keys(self):
+        return range(len(self.array))
+
+    def items(self):
+        return ((state, self.array[state]) for state in self.keys())
+
+    def update(self, other):
+        """Copia en la tabla los valores de otra tabla o diccionario."""
+        if isinstance(other, DenseQTable):
+            self.array[...] = other.array
+        else:
+            for state, values in other.items():
+                self.array[state] = values
+
+
+def is_enumerable(env):
+    """Indica si el espacio de estados del entorno es de tipo Discrete."""
+    return isinstance(env.observation_space, spaces.Discrete)
+
+
+def make_q_table(env, initial_values, backend='auto'):
+    """Crea la tabla Q de un agente con el almacenamiento adecuado al entorno.
+
+    Argumentos:
+    env -- entorno con espacio de acciones de tipo Discrete
+    initial_values -- función que recibe una forma y devuelve un array con los
+                      valores iniciales (por ejemplo, numpy.zeros)
+    backend -- 'dense' para un array contiguo, 'dict' para un diccionario de
+               arrays por estado o 'auto' (por defecto) para usar 'dense'
+               cuando el espacio de estados es de tipo Discrete
+    """
+    num_actions = env.action_space.n
+    if backend == 'auto':
+        backend = 'dense' if is_enumerable(env) else 'dict'
+    if backend == 'dense':
+        num_states = env.observation_space.n
+        return DenseQTable(initial_values((num_states, num_actions)))
+    elif backend == 'dict':
+        return defaultdict(lambda: initial_values(num_actions))
+    else:
+        raise ValueError("Tipo de tabla Q no encontrado")
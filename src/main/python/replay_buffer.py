@@ -0,0 +1,173 @@
+import os
+
+import numpy
+
+
+class ReplayBuffer:
+    """Memoria circular de transiciones para repetir experiencia.
+
+    Las transiciones (estado, acción, recompensa, estado siguiente y
+    terminado) se guardan en arrays preasignados de capacidad fija; al
+    llenarse, cada transición nueva sustituye a la más antigua. Los estados
+    deben ser números enteros (espacios de tipo Discrete).
+
+    Con muestreo priorizado cada transición se elige con probabilidad
+    proporcional a (|error DT| + epsilon) ** alpha, mediante un árbol de sumas
+    que se recorre y actualiza de forma vectorizada para todo el lote. Las
+    transiciones nuevas reciben la máxima prioridad vista hasta el momento.
+    Como el muestreo priorizado repite más las transiciones de mayor error,
+    sample devuelve también los pesos de muestreo por importancia
+    (N * P(i)) ** -beta, normalizados por el mayor del lote, con los que se
+    escalan los incrementos para no sesgar el punto fijo de las
+    actualizaciones.
+
+    Si se indica memmap_dir, los arrays se crean como ficheros .npy
+    proyectados en memoria en ese directorio, de modo que la memoria puede
+    superar la RAM disponible en ejecuciones muy largas.
+    """
+
+    def __init__(self, capacity, prioritized=False, alpha=0.6, epsilon=1e-3, memmap_dir=None, beta=0.4):
+        """Reserva la memoria.
+
+        Argumentos:
+        capacity -- número máximo de transiciones guardadas
+        prioritized -- si es True, el muestreo es priorizado por error DT
+                       (por defecto, uniforme)
+        alpha -- exponente de las prioridades (0 equivale a uniforme)
+        epsilon -- constante sumada al error DT para que ninguna transición
+                   tenga probabilidad nula
+        memmap_dir -- directorio de los ficheros proyectados en memoria (por
+                      defecto None, los arrays se guardan en RAM)
+        beta -- exponente de los pesos de muestreo por importancia (0 no
+                corrige el sesgo y 1 lo corrige por completo)
+        """
+        self.capacity = capacity
+        self.prioritized = prioritized
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.beta = beta
+        self.memmap_dir = memmap_dir
+        self.size = 0
+        self.position = 0
+        self.states = self._allocate('states', numpy.int32, capacity)
+        self.actions = self._allocate('actions', numpy.int32, capacity)
+        self.rewards = self._allocate('rewards', numpy.float32, capacity)
+        self.next_states = self._allocate('next_states', numpy.int32, capacity)
+        self.dones = self._allocate('dones', bool, capacity)
+        if prioritized:
+            # Árbol de sumas: las hojas empiezan en leaf_count y cada nodo i
+            # guarda la suma de sus hijos 2i y 2i + 1
+            self.leaf_count = _leaf_count(capacity)
+            self.depth = self.leaf_count.bit_length() - 1
+            self.tree = self._allocate('priorities', numpy.float64, 2 * self.leaf_count)
+            self.tree[:] = 0
+            self.max_priority = 1.0
+
+    @staticmethod
+    def allocation_bytes(capacity, prioritized=False):
+        """Devuelve la memoria que reservan los arrays de una memoria de capacity transiciones, en bytes."""
+        size = (4 + 4 + 4 + 4 + 1) * capacity
+        if prioritized:
+            # El árbol de sumas tiene 2 * leaf_count nodos de tipo float64
+            size += 2 * _leaf_count(capacity) * 8
+        return size
+
+    @classmethod
+    def with_memory_budget(cls, num_bytes, prioritized=False, **kwargs):
+        """Crea la mayor memoria cuyos arrays caben en num_bytes bytes (ver __init__).
+
+        Con muestreo priorizado el árbol de sumas crece a saltos, al redondear
+        su número de hojas a una potencia de 2, así que la capacidad se busca
+        por bisección sobre allocation_bytes.
+        """
+        low, high = 1, max(num_bytes // cls.allocation_bytes(1), 1)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if cls.allocation_bytes(middle, prioritized) <= num_bytes:
+                low = middle
+            else:
+                high = middle - 1
+        return cls(low, prioritized, **kwargs)
+
+    def _allocate(self, name, dtype, size):
+        if self.memmap_dir is None:
+            return numpy.empty(size, dtype=dtype)
+        os.makedirs(self.memmap_dir, exist_ok=True)
+        return numpy.lib.format.open_memmap(os.path.join(self.memmap_dir, name + '.npy'), mode='w+',
+                                            dtype=dtype, shape=(size,))
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done):
+        """Guarda una transición."""
+        self.add_batch(numpy.array([state]), numpy.array([action]), numpy.array([reward]),
+                       numpy.array([next_state]), numpy.array([done]))
+
+    def add_batch(self, states, actions, rewards, next_states, dones):
+        """Guarda un lote de transiciones (arrays de la misma longitud)."""
+        count = len(states)
+        if count > self.capacity:
+            states, actions, rewards, next_states, dones = (
+                array[-self.capacity:] for array in (states, actions, rewards, next_states, dones))
+            count = self.capacity
+        indices = (self.position + numpy.arange(count)) % self.capacity
+        self.states[indices] = states
+        self.actions[indices] = actions
+        self.rewards[indices] = rewards
+        self.next_states[indices] = next_states
+        self.dones[indices] = dones
+        self.position = (self.position + count) % self.capacity
+        self.size = min(self.size + count, self.capacity)
+        if self.prioritized:
+            self._set_priorities(indices, numpy.full(count, self.max_priority))
+
+    def sample(self, random_generator, batch_size):
+        """Muestrea un lote de transiciones guardadas.
+
+        Devuelve los índices de las transiciones, necesarios para
+        update_priorities, y sus pesos de muestreo por importancia (todos 1
+        con muestreo uniforme), seguidos de arrays con los estados, las
+        acciones, las recompensas, los estados siguientes y las señales de
+        terminación.
+        """
+        if self.prioritized:
+            indices = self._sample_tree(random_generator.random(batch_size) * self.tree[1])
+            probabilities = self.tree[indices + self.leaf_count] / self.tree[1]
+            weights = (self.size * probabilities) ** -self.beta
+            weights /= weights.max()
+        else:
+            indices = random_generator.integers(self.size, size=batch_size)
+            weights = numpy.ones(batch_size)
+        return (indices, weights, self.states[indices], self.actions[indices], self.rewards[indices],
+                self.next_states[indices], self.dones[indices])
+
+    def update_priorities(self, indices, td_errors):
+        """Actualiza la prioridad de las transiciones muestreadas con su nuevo error DT."""
+        priorities = (numpy.abs(td_errors) + self.epsilon) ** self.alpha
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self._set_priorities(indices, priorities)
+
+    def _set_priorities(self, indices, priorities):
+        nodes = indices + self.leaf_count
+        self.tree[nodes] = priorities
+        # Los nodos repetidos reciben la misma suma, así que no hace falta
+        # eliminar duplicados en cada nivel
+        for _ in range(self.depth):
+            nodes //= 2
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def _sample_tree(self, values):
+        nodes = numpy.ones(len(values), dtype=numpy.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            go_right = values >= self.tree[left]
+            values = numpy.where(go_right, values - self.tree[left], values)
+            nodes = left + go_right
+        # Los errores de redondeo pueden llevar a una hoja vacía del final
+        return numpy.minimum(nodes - self.leaf_count, self.size - 1)
+
+
+def _leaf_count(capacity):
+    """Devuelve la menor potencia de 2 mayor o igual que capacity."""
+    return 1 << max(capacity - 1, 0).bit_length()
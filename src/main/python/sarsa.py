@@ -1,8 +1,12 @@
-from collections import defaultdict
+from functools import partial
 
 import numpy
 
+from src.main.python.batch_env import make_batch_env
+from src.main.python.early_stopping import run_episodes
+from src.main.python.eligibility_traces import EligibilityTraces
 from src.main.python.environment_statistic import EnvironmentStatistic
+from src.main.python.q_table import DenseQTable, is_enumerable, make_q_table
 
 
 class Sarsa:
@@ -12,7 +16,10 @@ class Sarsa:
             env,
             discount_factor,
             learning_factor,
-            export_policy
+            export_policy,
+            table_type='auto',
+            streaming_statistics=False,
+            statistics_window=100
     ):
         """
         Crea una instacia del algoritmo.
@@ -22,18 +29,25 @@ class Sarsa:
         discount_factor -- Factor de descuento.
         learning_factor -- Factor de aprendizaje.
         export_policy -- Política de exportación.
+        table_type -- Almacenamiento de la tabla Q: 'dense', 'dict' o 'auto' (ver make_q_table).
+        streaming_statistics -- Si es True, las estadísticas se acumulan en memoria constante en lugar de
+                                guardar cada episodio (ver EnvironmentStatistic).
+        statistics_window -- Número de episodios de las estadísticas móviles.
         """
         self.env = env
         self.discount_factor = discount_factor
         self.learning_factor = learning_factor
         self.export_policy = export_policy
-        self.statistics = EnvironmentStatistic(env)
+        self.table_type = table_type
+        self.statistics = EnvironmentStatistic(env, streaming_statistics, statistics_window)
+        # Lote de entornos a medias entre dos llamadas a execute_batch_episodes
+        self.batch_run = None
         self.initialize_q_table()
 
     def initialize_q_table(self):
         """Inicializa la tabla Q con valores aleatorios."""
         cantidad_acciones = self.env.action_space.n
-        self.q_table = defaultdict(lambda: numpy.random.uniform(0, 1, cantidad_acciones))
+        self.q_table = make_q_table(self.env, lambda shape: numpy.random.uniform(0, 1, shape), self.table_type)
         # Para el estado terminal, las acciones tienen valor 0
         for estado in self.statistics.get_terminal_states():
             self.q_table[estado] = numpy.zeros(cantidad_acciones)
@@ -53,6 +67,22 @@ class Sarsa:
         new_q_value = q_value + self.learning_factor * (reward + self.discount_factor * next_q_value - q_value)
         self.q_table[state][action] = new_q_value
 
+    def update_q_table_batch(self, states, actions, rewards, next_states, next_actions):
+        """Actualiza la tabla con un lote de transiciones a la vez.
+
+        Argumentos:
+        states -- Array de estados.
+        actions -- Array de acciones.
+        rewards -- Array de recompensas.
+        next_states -- Array de estados siguientes.
+        next_actions -- Array de acciones siguientes.
+
+        Si un par estado-acción se repite en el lote, sus incrementos se suman.
+        """
+        table = self.q_table.array
+        td_errors = rewards + self.discount_factor * table[next_states, next_actions] - table[states, actions]
+        numpy.add.at(table, (states, actions), self.learning_factor * td_errors)
+
     def choose_action(self, state, info):
         """Elige una acción para un estado dado.
 
@@ -95,16 +125,83 @@ class Sarsa:
             current_state = next_state
             action = next_action
 
-    def train(self, num_episodes):
-        """Ejecuta el algoritmo durante un cierto número de episodios.
+    def choose_actions(self, states):
+        """Elige una acción para cada estado de un lote.
 
         Argumentos:
-        num_episodes -- entero no negativo que establece el número de episodios a entrenar
+        states -- Array de estados.
         """
-        self.statistics.reset()
-        for _ in range(num_episodes):
+        return self.export_policy.elige_acciones(states, self.env.action_space, self.q_table)
+
+    def execute_batch_episodes(self, num_episodes, num_envs):
+        """Ejecuta episodios en varias copias del entorno a la vez.
+
+        Argumentos:
+        num_episodes -- número de episodios a completar entre todas las copias
+        num_envs -- número de copias del entorno (ver make_batch_env)
+
+        Requiere una DenseQTable. Mientras el registro de estadísticas sea el mismo, una nueva
+        llamada continúa los episodios a medias de la anterior (ver
+        Q_Learning.ejecuta_episodios_por_lotes).
+        """
+        if not isinstance(self.q_table, DenseQTable):
+            raise ValueError("El entrenamiento por lotes requiere una tabla Q densa")
+        batch_run = self.batch_run
+        if batch_run is not None and batch_run[0] is self.statistics.episode_log and batch_run[1] == num_envs:
+            _, _, envs, current_states, actions = batch_run
+            self.statistics.add_pending_batch_episodes(num_episodes - self.statistics.episode_log.size)
+        else:
+            envs = make_batch_env(self.env, num_envs)
+            current_states = envs.reset()
+            self.statistics.reset_batch(num_envs)
+            actions = self.choose_actions(current_states)
+
+        while self.statistics.episode_log.size < num_episodes:
+            next_states, rewards, terminated, truncated, reset_states = envs.step(actions)
+
+            next_actions = self.choose_actions(next_states)
+
+            self.update_q_table_batch(current_states, actions, rewards, next_states, next_actions)
+
+            self.statistics.continue_batch(rewards)
+
+            done = numpy.flatnonzero(terminated | truncated)
+            self.statistics.add_batch_episodes(done, next_states, num_episodes - self.statistics.episode_log.size)
+            if len(done):
+                next_actions[done] = self.choose_actions(reset_states[done])
+
+            current_states = reset_states
+            actions = next_actions
+
+        self.batch_run = (self.statistics.episode_log, num_envs, envs, current_states, actions)
+
+    def execute_until(self, num_episodes):
+        """Ejecuta episodios hasta que se hayan registrado num_episodes."""
+        while self.statistics.episode_log.size < num_episodes:
             self.execute_episode()
 
+    def train(self, num_episodes, num_envs=1, early_stopping=None, resume=False):
+        """Ejecuta el algoritmo durante un cierto número de episodios.
+
+        Argumentos:
+        num_episodes -- entero no negativo que establece el número de episodios a entrenar
+        num_envs -- número de copias del entorno que se ejecutan a la vez (por defecto 1)
+        early_stopping -- instancia de EarlyStopping para detener el entrenamiento antes si se
+                          cumple alguno de sus criterios (por defecto None, se ejecutan todos los
+                          episodios)
+        resume -- si es True, entrena num_episodes más a partir de las tablas y estadísticas
+                  actuales en lugar de empezar un registro nuevo
+        """
+        if resume:
+            self.statistics.resume()
+        else:
+            self.statistics.reset()
+        if num_envs > 1:
+            execute_until = partial(self.execute_batch_episodes, num_envs=num_envs)
+        else:
+            execute_until = self.execute_until
+        run_episodes(self.statistics, self.statistics.episode_log.size + num_episodes, execute_until, self.q_table,
+                     early_stopping)
 
     def calculate_statistics(self):
         """Calcula las estadísticas a partir de los datos de los episodios."""
@@ -130,3 +227,68 @@ class Sarsa:
             policy[state] = self.get_policy_for_state(state)
         return policy
 
+
+class SarsaLambda(Sarsa):
+    """Sarsa(λ): Sarsa con trazas de elegibilidad.
+
+    Cada error DT se aplica a todos los pares con traza activa, de modo que
+    la recompensa final se propaga a lo largo del episodio en lugar de
+    retroceder un paso por episodio.
+    """
+
+    def __init__(
+            self,
+            env,
+            discount_factor,
+            learning_factor,
+            export_policy,
+            lambda_=0.9,
+            trace_mode='replacing',
+            trace_cutoff=1e-4,
+            table_type='auto',
+            streaming_statistics=False,
+            statistics_window=100
+    ):
+        """
+        Crea una instacia del algoritmo.
+
+        Argumentos:
+        env -- Entorno en el que se ejecuta el algoritmo.
+        discount_factor -- Factor de descuento.
+        learning_factor -- Factor de aprendizaje.
+        export_policy -- Política de exportación.
+        lambda_ -- Factor de decaimiento de las trazas, entre 0 y 1.
+        trace_mode -- 'replacing' o 'accumulating' (ver EligibilityTraces).
+        trace_cutoff -- Valor por debajo del cual se descarta una traza.
+        table_type -- Almacenamiento de la tabla Q: 'dense', 'dict' o 'auto' (ver make_q_table).
+        streaming_statistics, statistics_window -- Ver Sarsa.
+        """
+        super().__init__(env, discount_factor, learning_factor, export_policy, table_type, streaming_statistics,
+                         statistics_window)
+        self.lambda_ = lambda_
+        self.traces = EligibilityTraces(trace_mode, trace_cutoff,
+                                        state_dtype=numpy.int64 if is_enumerable(env) else object)
+
+    def update_q_table(self, state, action, reward, next_state, next_action):
+        """Aplica el error DT de una transición a todos los pares con traza activa.
+
+        Argumentos:
+        state -- Estado.
+        action -- Acción.
+        reward -- Recompensa.
+        next_state -- Siguiente estado.
+        next_action -- Siguiente acción.
+        """
+        td_error = (reward + self.discount_factor * self.q_table[next_state][next_action] -
+                    self.q_table[state][action])
+        self.traces.visit(state, action)
+        self.traces.apply(self.q_table, self.learning_factor * td_error)
+        self.traces.decay(self.discount_factor * self.lambda_)
+
+    def execute_episode(self):
+        """Ejecuta un episodio partiendo de trazas vacías (ver Sarsa.execute_episode)."""
+        self.traces.clear()
+        super().execute_episode()
+
+    def execute_batch_episodes(self, num_episodes, num_envs):
+        raise ValueError("Las trazas de elegibilidad no admiten entrenamiento por lotes")
@@ -0,0 +1,169 @@
+from bisect import bisect_right
+
+import gym
+import numpy
+
+
+class TabularModel:
+    """Modelo de transición de un entorno compilado a arrays de NumPy.
+
+    Se construye una sola vez a partir de env.P, donde env.P[estado][acción]
+    es una lista de transiciones (probabilidad, estado siguiente, recompensa,
+    terminado). Las transiciones de cada par estado-acción se guardan en la
+    última dimensión de los arrays, rellenando con probabilidad 0 hasta la
+    longitud máxima.
+    """
+
+    def __init__(self, env):
+        """Compila el modelo del entorno.
+
+        Argumentos:
+        env -- entorno con espacios de estados y acciones de tipo Discrete
+               que expone su modelo en env.P y su distribución de estados
+               iniciales en initial_state_distrib
+        """
+        unwrapped = env.unwrapped
+        self.P = unwrapped.P
+        self.num_states = env.observation_space.n
+        self.num_actions = env.action_space.n
+        num_transitions = max(len(self.P[state][action])
+                              for state in range(self.num_states) for action in range(self.num_actions))
+
+        shape = (self.num_states, self.num_actions, num_transitions)
+        self.probabilities = numpy.zeros(shape)
+        self.next_states = numpy.zeros(shape, dtype=numpy.int64)
+        self.rewards = numpy.zeros(shape)
+        self.terminals = numpy.zeros(shape, dtype=bool)
+        for state in range(self.num_states):
+            for action in range(self.num_actions):
+                transitions = self.P[state][action]
+                for i, (probability, next_state, reward, terminal) in enumerate(transitions):
+                    self.probabilities[state, action, i] = probability
+                    self.next_states[state, action, i] = next_state
+                    self.rewards[state, action, i] = reward
+                    self.terminals[state, action, i] = terminal
+        # La probabilidad acumulada vale 1 desde la última transición válida
+        # para que ningún número uniforme en [0, 1) caiga en el relleno
+        self.cumulative_probabilities = numpy.cumsum(self.probabilities, axis=2)
+        for state in range(self.num_states):
+            for action in range(self.num_actions):
+                last = len(self.P[state][action]) - 1
+                self.cumulative_probabilities[state, action, last:] = 1.0
+        self._cumulative_lists = self.cumulative_probabilities.tolist()
+        # Recompensa esperada de cada par estado-acción y probabilidad de cada
+        # transición que no termina el episodio
+        self.expected_rewards = numpy.sum(self.probabilities * self.rewards, axis=2)
+        self.continuation_probabilities = self.probabilities * ~self.terminals
+
+        self.initial_distribution = numpy.asarray(unwrapped.initial_state_distrib, dtype=float)
+        self.cumulative_initial_distribution = numpy.cumsum(self.initial_distribution)
+        self.cumulative_initial_distribution[-1] = 1.0
+        self.max_episode_steps = env.spec.max_episode_steps if env.spec is not None else None
+
+    def sample_initial_states(self, random_generator, size):
+        """Devuelve size estados iniciales muestreados."""
+        return numpy.searchsorted(self.cumulative_initial_distribution, random_generator.random(size), side='right')
+
+    def sample_transition(self, random_generator, state, action):
+        """Muestrea una transición (probabilidad, estado siguiente, recompensa, terminado)."""
+        index = bisect_right(self._cumulative_lists[state][action], random_generator.random())
+        return self.P[state][action][index]
+
+    def sample_transitions(self, random_generator, states, actions):
+        """Muestrea una transición para cada par de los arrays states y actions.
+
+        Devuelve los estados siguientes, las recompensas y las señales de
+        terminación.
+        """
+        cumulative = self.cumulative_probabilities[states, actions]
+        uniform = random_generator.random(len(states))
+        indexes = numpy.count_nonzero(cumulative <= uniform[:, None], axis=1)
+        return (self.next_states[states, actions, indexes], self.rewards[states, actions, indexes],
+                self.terminals[states, actions, indexes])
+
+
+class TabularSimulator(gym.Env):
+    """Simulador de un entorno a partir de su modelo compilado (TabularModel).
+
+    Sustituye al entorno original con la misma API (reset y step), sin pasar
+    por la pila de wrappers de gym, e incluye el límite de pasos del entorno
+    original. Con batch se obtiene un simulador de varios episodios a la vez
+    que usan automáticamente los agentes al entrenar por lotes. Los atributos
+    que no define (desc, decode...) se leen del entorno original.
+    """
+
+    def __init__(self, env):
+        """Compila el modelo del entorno.
+
+        Argumentos:
+        env -- entorno con espacios de estados y acciones de tipo Discrete
+               y modelo en env.P (FrozenLake, Taxi...)
+        """
+        self.env = env
+        self.model = TabularModel(env)
+        self.P = self.model.P
+        self.action_space = env.action_space
+        self.observation_space = env.observation_space
+        self.spec = env.spec
+        self.state = None
+        self.elapsed_steps = 0
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name == 'env':
+            raise AttributeError(name)
+        return getattr(self.env.unwrapped, name)
+
+    def reset(self, *, seed=None, options=None):
+        super().reset(seed=seed)
+        self.state = int(self.model.sample_initial_states(self.np_random, 1)[0])
+        self.elapsed_steps = 0
+        return self.state, {"prob": 1}
+
+    def step(self, action):
+        probability, next_state, reward, terminated = self.model.sample_transition(self.np_random, self.state, action)
+        self.state = int(next_state)
+        self.elapsed_steps += 1
+        truncated = (not terminated and self.model.max_episode_steps is not None
+                     and self.elapsed_steps >= self.model.max_episode_steps)
+        return self.state, reward, terminated, truncated, {"prob": probability}
+
+    def batch(self, num_envs):
+        """Devuelve un simulador de num_envs episodios simultáneos (ver make_batch_env)."""
+        return BatchTabularSimulator(self.model, num_envs, self.action_space, self.observation_space)
+
+
+class BatchTabularSimulator:
+    """Simula varios episodios a la vez sobre un TabularModel.
+
+    Sigue la misma interfaz que SyncBatchEnv: cada episodio se reinicia
+    automáticamente al terminar o alcanzar el límite de pasos.
+    """
+
+    def __init__(self, model, num_envs, action_space, observation_space):
+        self.model = model
+        self.num_envs = num_envs
+        self.action_space = action_space
+        self.observation_space = observation_space
+        self.random_generator = numpy.random.default_rng(numpy.random.randint(2 ** 31))
+        self.states = None
+        self.elapsed_steps = numpy.zeros(num_envs, dtype=numpy.int64)
+
+    def reset(self):
+        """Reinicia todos los episodios y devuelve sus estados iniciales."""
+        self.elapsed_steps[:] = 0
+        self.states = self.model.sample_initial_states(self.random_generator, self.num_envs)
+        return self.states
+
+    def step(self, actions):
+        """Aplica una acción en cada episodio (ver SyncBatchEnv.step)."""
+        next_states, rewards, terminated = self.model.sample_transitions(self.random_generator, self.states, actions)
+        self.elapsed_steps += 1
+        truncated = numpy.zeros(self.num_envs, dtype=bool)
+        if self.model.max_episode_steps is not None:
+            truncated = ~terminated & (self.elapsed_steps >= self.model.max_episode_steps)
+        done = terminated | truncated
+        reset_states = next_states.copy()
+        reset_states[done] = self.model.sample_initial_states(self.random_generator, numpy.count_nonzero(done))
+        self.elapsed_steps[done] = 0
+        self.states = reset_states
+        return next_states, rewards, terminated, truncated, reset_states
@@ -0,0 +1,69 @@
+import gym
+import numpy
+import pytest
+
+from src.main.python.games.game import Game
+from src.main.python.games.game_comparator import GameComparator
+
+
+def test_parallel_cases_match_serial_cases():
+    cases = dict(algorithm='Q-Learning', epsilon=[0.1, 0.5], alpha=[0.1], gamma=[0.5, 0.9], seed=7)
+    serial = GameComparator(Game(gym.make('FrozenLake-v1'), 0.9, 0.1, 100))
+    parallel = GameComparator(Game(gym.make('FrozenLake-v1'), 0.9, 0.1, 100))
+
+    serial_agent = serial.compare_different_cases(**cases)
+    parallel_agent = parallel.compare_different_cases(n_jobs=2, **cases)
+
+    assert numpy.array_equal(serial_agent.tabla_q.array, parallel_agent.tabla_q.array)
+    assert serial_agent.calculate_statistics()['success_rate'] == parallel_agent.calculate_statistics()['success_rate']
+
+
+def test_cases_ranked_by_exact_evaluation():
+    cases = dict(algorithm='Q-Learning', epsilon=[0.1, 0.5], alpha=[0.1], gamma=[0.5, 0.9], seed=7, rank_by='exact')
+    serial = GameComparator(Game(gym.make('FrozenLake-v1'), 0.9, 0.1, 100))
+    parallel = GameComparator(Game(gym.make('FrozenLake-v1'), 0.9, 0.1, 100))
+
+    serial_agent = serial.compare_different_cases(**cases)
+    parallel_agent = parallel.compare_different_cases(n_jobs=2, **cases)
+
+    assert numpy.array_equal(serial_agent.tabla_q.array, parallel_agent.tabla_q.array)
+
+
+def test_halving_trains_survivors_with_fewer_total_episodes(monkeypatch):
+    comparator = GameComparator(Game(gym.make('FrozenLake-v1'), 0.9, 0.1, 90))
+    results = {}
+    get_data = GameComparator._get_data_from_stats
+    monkeypatch.setattr(GameComparator, '_get_data_from_stats',
+                        lambda self, stats: results.update(stats) or get_data(self, stats))
+
+    agent = comparator.compare_different_cases(algorithm='Q-Learning', epsilon=[0.1, 0.5], alpha=[0.1],
+                                               gamma=[0.5, 0.9], seed=7, scheduler='halving')
+
+    # 4 configuraciones con 10 episodios, 2 continúan hasta 30 y 1 hasta 90
+    episodes = sorted(stats['num_episodes'] for stats in results.values())
+    assert episodes == [10, 10, 30, 90]
+    assert agent.calculate_statistics()['num_episodes'] == 90
+    assert comparator.game.agent is agent
+
+
+def test_halving_rejects_parallel_jobs():
+    comparator = GameComparator(Game(gym.make('FrozenLake-v1'), 0.9, 0.1, 90))
+
+    with pytest.raises(ValueError):
+        comparator.compare_different_cases(algorithm='Q-Learning', epsilon=[0.1], alpha=[0.1], gamma=[0.9],
+                                           n_jobs=2, scheduler='halving')
+
+
+def test_sampled_cases_train_the_requested_number_of_configurations(monkeypatch):
+    results = {}
+    get_data = GameComparator._get_data_from_stats
+    monkeypatch.setattr(GameComparator, '_get_data_from_stats',
+                        lambda self, stats: results.update(stats) or get_data(self, stats))
+    for sampler in ('halton', 'model'):
+        results.clear()
+        comparator = GameComparator(Game(gym.make('FrozenLake-v1'), 0.9, 0.1, 30))
+
+        agent = comparator.compare_sampled_cases(num_cases=6, sampler=sampler, seed=1)
+
+        assert len(results) == 6
+        assert comparator.game.agent is agent
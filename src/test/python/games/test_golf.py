@@ -1,4 +1,11 @@
+import numpy
+
 from src.main.python.games.golf.golf import Golf
+from src.main.python.games.golf import golf_course
+from src.main.python.games.golf.golf_course import load_course, parse_course
+from src.main.python.games.golf.golf_env import GOAL, GRASS, OUT_OF_BOUNDS, SAND, WATER, GolfEnv
+from src.main.python.games.golf.position_golf_ball import PositionGolfBall
+from src.main.python.policy_evaluation import PolicyEvaluator
 
 
 def test_golf():
@@ -34,5 +41,129 @@ def test_golf():
     golf.print_stats()
 
 
+def test_terrain_classifies_every_position():
+    env = GolfEnv()
+
+    assert env.terrain_at(env.target_location) == GOAL
+    assert all(env.terrain_at(position) == WATER for position in env.lake)
+    assert all(env.terrain_at(position) == SAND for position in env.sands)
+    assert all(env.terrain_at(position) == GRASS for position in env.origin)
+    assert env.terrain_at(PositionGolfBall(-1, 0)) == OUT_OF_BOUNDS
+    assert env.terrain_at(PositionGolfBall(env.width, env.height - 1)) == OUT_OF_BOUNDS
+
+
+def test_parse_course_with_comments_and_short_rows():
+    terrain, origins = parse_course("GSW#W\nOE\n\n")
+
+    assert terrain.tolist() == [[GRASS, SAND, WATER, OUT_OF_BOUNDS, OUT_OF_BOUNDS],
+                                [GRASS, GOAL, OUT_OF_BOUNDS, OUT_OF_BOUNDS, OUT_OF_BOUNDS]]
+    assert origins.tolist() == [[0, 1]]
+
+
+def test_load_course_reuses_parsed_courses(tmp_path, monkeypatch):
+    camp_path = tmp_path / "camp.txt"
+    camp_path.write_text("GGE\nOSW\n")
+    monkeypatch.setattr(golf_course, "_loaded_courses", {})
+
+    terrain, origins = load_course(str(camp_path), cache_dir=str(tmp_path / "cache"))
+
+    assert len(list((tmp_path / "cache").glob("*.npy"))) == 2
+    assert load_course(str(camp_path), cache_dir=str(tmp_path / "cache"))[0] is terrain
+    monkeypatch.setattr(golf_course, "_loaded_courses", {})
+    cached_terrain, cached_origins = load_course(str(camp_path), cache_dir=str(tmp_path / "cache"))
+    assert isinstance(cached_terrain, numpy.memmap)
+    assert not cached_terrain.flags.writeable
+    assert numpy.array_equal(cached_terrain, terrain)
+    assert numpy.array_equal(cached_origins, origins)
+
+    # Un fichero de la caché con otra forma se descarta y se vuelve a analizar
+    origins_path, = (tmp_path / "cache").glob("*.v%d.origins.npy" % golf_course.COURSE_FORMAT_VERSION)
+    numpy.save(origins_path, numpy.zeros(3))
+    monkeypatch.setattr(golf_course, "_loaded_courses", {})
+    terrain, origins = load_course(str(camp_path), cache_dir=str(tmp_path / "cache"))
+    assert origins.tolist() == [[0, 1]]
+    assert numpy.load(origins_path).shape == (1, 2)
+
+
+def test_discrete_observations_encode_positions():
+    env = GolfEnv(discrete_observations=True)
+
+    state, info = env.reset(seed=0)
+    next_state, reward, terminated, truncated, info = env.step(0)
+
+    assert env.observation_space.n == env.width * env.height + 1
+    assert env.decode(state) in list(env.origin)
+    assert env.decode(next_state) == env.agent_location or next_state == env.out_of_bounds_state
+    assert env.encode(PositionGolfBall(env.width, 0)) == env.out_of_bounds_state
+    assert env.decode(env.encode(env.target_location)) == env.target_location
+
+
+def test_golf_discrete_agents_use_dense_tables():
+    golf = Golf(iterations=50, discrete_observations=True)
+
+    agent = golf.resolve_golf_by_q_learning()
+    golf.show_policy(agent)
+
+    assert hasattr(agent.tabla_q, 'array')
+    assert agent.statistics.get_terminal_states() == {golf.environment.target_state}
+    assert agent.calculate_statistics()['num_episodes'] == 50
+
+
+def test_batch_golf_env_matches_single_shot_outcomes():
+    env = GolfEnv(discrete_observations=True)
+    envs = env.batch(2000)
+    envs.reset()
+    origin = env.origin[1]
+    envs.positions[:] = [origin.x, origin.y]
+    action = 37
+
+    next_states, rewards, terminated, truncated, reset_states = envs.step(numpy.full(2000, action))
+
+    club_index, direction_index, force_index = env.take_action(action)
+    club = env.golfs_club[club_index]
+    low, high = club.precision_range(1)
+    expected = set()
+    for precision in range(low, high + 1):
+        distance = club.min_force + force_index + precision
+        expected.add(env.encode(PositionGolfBall(origin.x + env.directions[direction_index][0] * distance,
+                                                 origin.y + env.directions[direction_index][1] * distance)))
+    assert set(next_states.tolist()) == expected
+    frequencies = numpy.bincount(next_states, minlength=env.observation_space.n) / len(next_states)
+    for probability, next_state, _, _ in env.P[env.encode(origin)][action]:
+        assert abs(frequencies[next_state] - probability) < 0.05
+    done = terminated | truncated
+    origins = {env.encode(position) for position in env.origin}
+    assert set(reset_states[done].tolist()) <= origins
+    assert numpy.array_equal(reset_states[~done], next_states[~done])
+    assert set(rewards[truncated].tolist()) <= {-100.0}
+
+
+def test_golf_transition_model_matches_shot_outcomes():
+    env = GolfEnv(discrete_observations=True)
+    origin = env.origin[0]
+    action = 77
+
+    club_index, _, force_index = env.take_action(action)
+    distances, probabilities = env.golfs_club[club_index].outcome_distribution(force_index)
+    transitions = env.P[env.encode(origin)][action]
+
+    assert numpy.isclose(probabilities.sum(), 1)
+    assert numpy.isclose(sum(probability for probability, _, _, _ in transitions), 1)
+    assert len(transitions) <= len(distances)
+    assert all(terminal == (reward in (100, -100)) for _, _, reward, terminal in transitions)
+    assert env.P[env.out_of_bounds_state][action] == [(1.0, env.out_of_bounds_state, 0, True)]
+    assert numpy.isclose(env.initial_state_distrib.sum(), 1)
+    assert not hasattr(GolfEnv(), 'P')
+
+
+def test_golf_solved_by_value_iteration():
+    golf = Golf(iterations=20, discrete_observations=True, discount_factor=0.99)
+
+    agent = golf.resolve_golf_by_value_iteration()
+
+    evaluation = PolicyEvaluator(golf.environment, 0.99).evaluate_agent(agent)
+    assert evaluation['success_rate'] > 99
+
+
 if __name__ == '__main__':
     test_golf()
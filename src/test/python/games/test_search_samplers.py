@@ -0,0 +1,36 @@
+import numpy
+
+from src.main.python.games.search_samplers import HaltonSampler, ModelBasedSampler, RandomSampler, make_sampler
+
+
+def test_halton_sequence_without_shift():
+    sampler = HaltonSampler([(0, 1), (0, 9)], shift=False)
+
+    points = [sampler.ask() for _ in range(3)]
+
+    assert numpy.allclose(points, [(0.5, 3.0), (0.25, 6.0), (0.75, 1.0)])
+
+
+def test_samplers_stay_inside_ranges():
+    ranges = [(0.01, 0.5), (0.1, 0.2), (0.5, 0.99)]
+    for name in ('random', 'halton', 'model'):
+        sampler = make_sampler(name, ranges, seed=3)
+        for _ in range(20):
+            configuration = sampler.ask()
+            sampler.tell(configuration, -sum(configuration))
+            assert all(low <= value <= high for value, (low, high) in zip(configuration, ranges))
+
+
+def test_model_based_sampler_concentrates_on_good_configurations():
+    def score(configuration):
+        return -abs(configuration[0] - 0.8)
+
+    model = ModelBasedSampler([(0, 1)], seed=0)
+    random = RandomSampler([(0, 1)], seed=0)
+    for _ in range(30):
+        configuration = model.ask()
+        model.tell(configuration, score(configuration))
+    model_last = [model.ask()[0] for _ in range(10)]
+    random_last = [random.ask()[0] for _ in range(10)]
+
+    assert numpy.mean(numpy.abs(numpy.array(model_last) - 0.8)) < numpy.mean(numpy.abs(numpy.array(random_last) - 0.8))
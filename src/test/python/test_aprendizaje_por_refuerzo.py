@@ -0,0 +1,127 @@
+import gym
+import numpy
+
+from src.main.python.aprendizaje_por_refuerzo import (Barrido_Priorizado, ColaDePrioridad, Dyna_Q, ModeloTabular,
+                                                     Montecarlo_IE, PolíticaEpsilonVoraz, PolíticaVoraz, Q_Learning)
+
+
+def test_montecarlo_media_incremental_igual_a_historial():
+    entorno = gym.make('FrozenLake-v1')
+    media = Montecarlo_IE(entorno, 0.9)
+    historial = Montecarlo_IE(entorno, 0.9, modo_retornos='historial')
+
+    for retorno in [1.0, 0.0, 0.5, 0.25, 1.0]:
+        media.actualiza_valor(3, 1, retorno)
+        historial.actualiza_valor(3, 1, retorno)
+
+    assert numpy.isclose(media.tabla_q[3][1], historial.tabla_q[3][1])
+    assert media.tabla_n[3][1] == 5
+    assert not hasattr(media, 'tabla_r')
+
+
+def test_montecarlo_tasa_constante():
+    agente = Montecarlo_IE(
+        gym.make('FrozenLake-v1'), 0.9,
+        modo_retornos='constante', tasa_de_aprendizaje=0.5
+    )
+
+    agente.actualiza_valor(0, 0, 1.0)
+    agente.actualiza_valor(0, 0, 0.0)
+
+    assert agente.tabla_q[0][0] == 0.5
+
+
+def test_montecarlo_primera_visita():
+    agente = Montecarlo_IE(gym.make('FrozenLake-v1'), 0.9, primera_visita=True)
+
+    agente.entrena(50)
+
+    assert agente.tabla_n.array.max() <= 50
+
+
+def test_política_voraz_desempata_aleatoriamente_respetando_la_máscara():
+    espacio = gym.spaces.Discrete(4)
+    tabla_q = {0: numpy.array([1.0, 3.0, 3.0, 3.0])}
+    máscara = numpy.array([1, 1, 0, 1], dtype=numpy.int8)
+    política = PolíticaVoraz(semilla=0)
+
+    acciones = {política.elige_acción(0, espacio, tabla_q, máscara) for _ in range(200)}
+
+    assert acciones == {1, 3}
+
+
+def test_política_epsilon_voraz_explora_solo_acciones_elegibles():
+    espacio = gym.spaces.Discrete(4)
+    tabla_q = {0: numpy.array([5.0, 0.0, 0.0, 0.0])}
+    máscara = numpy.array([0, 1, 1, 0], dtype=numpy.int8)
+    política = PolíticaEpsilonVoraz(1.0, semilla=0)
+
+    acciones = {política.elige_acción(0, espacio, tabla_q, máscara) for _ in range(200)}
+
+    assert acciones == {1, 2}
+    assert PolíticaEpsilonVoraz(0.0).elige_acción(0, espacio, tabla_q) == 0
+
+
+def test_modelo_tabular_conserva_la_distribución_empírica():
+    modelo = ModeloTabular(capacidad=1)
+    for estado_siguiente in (1, 1, 1, 2):
+        modelo.registra(0, 0, 0.0, estado_siguiente)
+    modelo.registra(5, 1, 1.0, 6)
+
+    assert modelo.tamaño == 3
+    estados, acciones, recompensas, estados_siguientes = modelo.muestrea(numpy.random.default_rng(0), 20000)
+    assert abs(numpy.mean(estados == 5) - 0.5) < 0.02
+    assert abs(numpy.mean(estados_siguientes[estados == 0] == 1) - 0.75) < 0.02
+    assert numpy.all(recompensas[estados == 5] == 1.0)
+
+
+def test_dyna_q_planifica_con_tablas_densas_y_diccionarios():
+    entorno = gym.make('FrozenLake-v1')
+    for tipo_tabla in ('dense', 'dict'):
+        numpy.random.seed(0)
+        agente = Dyna_Q(entorno, 0.9, 0.1, PolíticaEpsilonVoraz(0.1), 5, tipo_tabla)
+        agente.entrena(20)
+        assert agente.modelo.tamaño > 0
+        assert agente.calculate_statistics()['num_episodes'] == 20
+
+    agente = Dyna_Q(entorno, 0.9, 0.1, PolíticaEpsilonVoraz(0.1), 5)
+    agente.entrena(20, número_entornos=4)
+    assert agente.calculate_statistics()['num_episodes'] == 20
+
+
+def test_cola_de_prioridad_eleva_la_prioridad_sin_duplicar():
+    cola = ColaDePrioridad()
+    cola.inserta('a', 1.0)
+    cola.inserta('b', 2.0)
+    cola.inserta('a', 3.0)
+    cola.inserta('b', 0.5)
+
+    assert len(cola) == 2
+    assert [cola.extrae(), cola.extrae()] == ['a', 'b']
+    assert len(cola) == 0
+
+
+def test_barrido_priorizado_propaga_la_recompensa_hacia_atrás():
+    entorno = gym.make('FrozenLake-v1', is_slippery=False)
+    for tipo_tabla in ('dense', 'dict'):
+        numpy.random.seed(0)
+        agente = Barrido_Priorizado(entorno, 0.9, 1.0, PolíticaEpsilonVoraz(0.5), 50, tipo_tabla=tipo_tabla)
+        agente.entrena(200)
+
+        # Con actualizaciones de un paso la recompensa tardaría un episodio
+        # por estado en llegar al inicio; el barrido la propaga en el mismo paso
+        assert agente.tabla_q[0].max() > 0.5
+        assert agente.actualizaciones > 0
+
+
+def test_q_learning_continúa_el_entrenamiento_sin_reiniciar_el_registro():
+    agente = Q_Learning(gym.make('FrozenLake-v1'), 0.9, 0.1, PolíticaEpsilonVoraz(0.1))
+    agente.entrena(40)
+    recompensas = agente.statistics.episode_log.rewards[:40].copy()
+
+    agente.entrena(20, número_entornos=4, continuar=True)
+
+    assert agente.calculate_statistics()['num_episodes'] == 60
+    assert numpy.array_equal(agente.statistics.episode_log.rewards[:40], recompensas)
+    agente.entrena(10)
+    assert agente.calculate_statistics()['num_episodes'] == 10
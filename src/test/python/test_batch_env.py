@@ -0,0 +1,36 @@
+import gym
+import numpy
+
+from src.main.python.aprendizaje_por_refuerzo import PolíticaEpsilonVoraz, Q_Learning
+from src.main.python.batch_env import SyncBatchEnv, make_batch_env
+from src.main.python.double_q_learning import DoubleQLearning
+from src.main.python.sarsa import Sarsa
+
+
+def test_sync_batch_env_resets_finished_envs():
+    envs = make_batch_env(gym.make('FrozenLake-v1'), 4)
+    assert isinstance(envs, SyncBatchEnv)
+
+    states = envs.reset()
+    for _ in range(50):
+        next_states, rewards, terminated, truncated, reset_states = envs.step(numpy.zeros(4, dtype=int))
+        done = terminated | truncated
+        assert numpy.all(reset_states[~done] == next_states[~done])
+        states = reset_states
+    assert states.shape == (4,)
+
+
+def test_td_agents_train_in_batches():
+    env = gym.make('FrozenLake-v1')
+    q_learning = Q_Learning(env, 0.9, 0.1, PolíticaEpsilonVoraz(0.1))
+    sarsa = Sarsa(env, 0.9, 0.1, PolíticaEpsilonVoraz(0.1))
+    double_q_learning = DoubleQLearning(env, 0.9, 0.1, PolíticaEpsilonVoraz(0.1))
+
+    q_learning.entrena(40, número_entornos=8)
+    sarsa.train(40, num_envs=8)
+    double_q_learning.train(40, num_envs=8)
+
+    for agent in (q_learning, sarsa, double_q_learning):
+        assert agent.calculate_statistics()['num_episodes'] == 40
+    assert numpy.allclose(double_q_learning.q_table.array,
+                          double_q_learning.q1_table.array + double_q_learning.q2_table.array)
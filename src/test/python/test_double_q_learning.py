@@ -0,0 +1,16 @@
+import gym
+import numpy
+
+from src.main.python.aprendizaje_por_refuerzo import PolíticaEpsilonVoraz
+from src.main.python.double_q_learning import DoubleQLearning
+
+
+def test_summed_q_table_tracks_both_tables():
+    for table_type in ('dense', 'dict'):
+        agent = DoubleQLearning(gym.make('FrozenLake-v1'), 0.9, 0.1, PolíticaEpsilonVoraz(0.1), table_type)
+
+        agent.train(50)
+
+        for state in agent.q_table.keys():
+            assert numpy.allclose(agent.q_table[state], agent.q1_table[state] + agent.q2_table[state])
+        assert len(agent.get_policy()) == len(agent.q_table)
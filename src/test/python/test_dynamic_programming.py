@@ -0,0 +1,44 @@
+import gym
+import numpy
+
+from src.main.python.dynamic_programming import PolicyIteration, ValueIteration
+from src.main.python.games.game import Game
+
+
+def test_value_and_policy_iteration_agree():
+    for name in ('FrozenLake-v1', 'Taxi-v3'):
+        env = gym.make(name)
+        value_iteration = ValueIteration(env, 0.9)
+        policy_iteration = PolicyIteration(env, 0.9)
+        value_iteration.solve()
+        policy_iteration.solve()
+
+        assert numpy.allclose(value_iteration.q_table.array, policy_iteration.q_table.array, atol=1e-6)
+        states = numpy.arange(env.observation_space.n)
+        q_table = value_iteration.q_table.array
+        actions = policy_iteration.choose_actions(states)
+        assert numpy.allclose(q_table[states, actions], q_table.max(axis=1), atol=1e-6)
+
+
+def test_value_iteration_satisfies_bellman_optimality():
+    env = gym.make('FrozenLake-v1')
+    agent = ValueIteration(env, 0.99)
+    q_table = agent.solve().array
+
+    expected = numpy.zeros_like(q_table)
+    for state in range(env.observation_space.n):
+        for action in range(env.action_space.n):
+            for probability, next_state, reward, terminal in env.unwrapped.P[state][action]:
+                future = 0 if terminal else numpy.max(q_table[next_state])
+                expected[state, action] += probability * (reward + 0.99 * future)
+    assert numpy.allclose(q_table, expected, atol=1e-6)
+
+
+def test_game_resolves_by_dynamic_programming():
+    numpy.random.seed(0)
+    game = Game(gym.make('FrozenLake-v1'), 0.99, 0.1, 200, 8)
+
+    agent = game.resolve_by_value_iteration()
+    assert agent.calculate_statistics()['num_episodes'] == 200
+    assert agent.calculate_statistics()['success_rate'] > 50
+    assert game.resolve_by_policy_iteration().get_policy().keys() == agent.get_policy().keys()
@@ -0,0 +1,74 @@
+import gym
+import numpy
+
+from src.main.python.aprendizaje_por_refuerzo import Montecarlo_IE, PolíticaEpsilonVoraz, Q_Learning
+from src.main.python.batch_env import SyncBatchEnv
+from src.main.python.double_q_learning import DoubleQLearning
+from src.main.python.early_stopping import EarlyStopping
+from src.main.python.games.game import Game
+from src.main.python.sarsa import Sarsa
+
+
+def test_runs_without_criteria_complete_the_budget():
+    agent = Q_Learning(gym.make('FrozenLake-v1'), 0.9, 0.1, PolíticaEpsilonVoraz(0.1))
+    agent.entrena(50, parada=EarlyStopping(check_every=10))
+
+    statistics = agent.calculate_statistics()
+    assert statistics['num_episodes'] == 50
+    assert statistics['stop_reason'] is None and statistics['stop_episode'] is None
+
+
+def test_batch_training_continues_episodes_between_checks(monkeypatch):
+    batches = []
+    reset = SyncBatchEnv.reset
+    monkeypatch.setattr(SyncBatchEnv, 'reset', lambda self: batches.append(self) or reset(self))
+    env = gym.make('FrozenLake-v1')
+    for agent, train in ((Q_Learning(env, 0.9, 0.1, PolíticaEpsilonVoraz(0.1)), 'entrena'),
+                         (Sarsa(env, 0.9, 0.1, PolíticaEpsilonVoraz(0.1)), 'train'),
+                         (DoubleQLearning(env, 0.9, 0.1, PolíticaEpsilonVoraz(0.1)), 'train')):
+        batches.clear()
+        getattr(agent, train)(100, 8, EarlyStopping(check_every=10))
+        getattr(agent, train)(30, 8, EarlyStopping(check_every=10), True)
+
+        # Un único lote sirve para todas las comprobaciones y para el
+        # entrenamiento que continúa
+        assert len(batches) == 1
+        assert agent.calculate_statistics()['num_episodes'] == 130
+
+
+def test_converged_q_table_stops_training():
+    env = gym.make('FrozenLake-v1')
+    # Con tasa de aprendizaje nula la tabla Q no cambia entre comprobaciones
+    for agent, train, num_envs in ((Q_Learning(env, 0.9, 0.0, PolíticaEpsilonVoraz(0.1)), 'entrena', 4),
+                                   (Sarsa(env, 0.9, 0.0, PolíticaEpsilonVoraz(0.1)), 'train', 4),
+                                   (DoubleQLearning(env, 0.9, 0.0, PolíticaEpsilonVoraz(0.1), table_type='dict'),
+                                    'train', 1)):
+        getattr(agent, train)(1000, num_envs, EarlyStopping(check_every=20, q_tolerance=1e-9))
+        statistics = agent.calculate_statistics()
+        assert statistics['stop_reason'] == 'q_converged'
+        # Con tablas por diccionario, los estados nuevos cuentan como cambio
+        assert statistics['stop_episode'] == statistics['num_episodes'] < 1000
+        assert statistics['num_episodes'] % 20 == 0
+
+    # Los pares que Montecarlo_IE no ha visitado valen -inf y no cuentan como
+    # cambio mientras sigan sin visitarse
+    numpy.random.seed(0)
+    agent = Montecarlo_IE(env, 0.9)
+    agent.entrena(500, EarlyStopping(check_every=50, q_tolerance=1e9))
+    statistics = agent.calculate_statistics()
+    assert statistics['stop_reason'] == 'q_converged'
+    assert statistics['stop_episode'] == statistics['num_episodes'] < 500
+
+
+def test_plateau_and_time_budget():
+    numpy.random.seed(0)
+    env = gym.make('FrozenLake-v1')
+    agent = Montecarlo_IE(env, 0.9)
+    agent.entrena(5000, EarlyStopping(check_every=10, patience=3, min_improvement=200))
+    assert agent.calculate_statistics()['stop_reason'] == 'plateau'
+    assert agent.calculate_statistics()['num_episodes'] == 40
+
+    game = Game(env, 0.9, 0.1, 10 ** 6, early_stopping=EarlyStopping(check_every=10, time_budget=0.0))
+    agent = game.resolve_by_q_learning(0.1)
+    assert agent.calculate_statistics()['stop_reason'] == 'time_budget'
+    assert agent.calculate_statistics()['num_episodes'] == 10
@@ -0,0 +1,62 @@
+import gym
+import numpy
+
+from src.main.python.aprendizaje_por_refuerzo import Q_Lambda
+from src.main.python.eligibility_traces import EligibilityTraces
+from src.main.python.q_table import DenseQTable
+from src.main.python.sarsa import SarsaLambda
+
+
+def test_replacing_and_accumulating_traces():
+    q_table = DenseQTable(numpy.zeros((3, 2)))
+    for mode, expected in (('replacing', 1.0), ('accumulating', 2.0)):
+        traces = EligibilityTraces(mode)
+        traces.visit(0, 1)
+        traces.visit(0, 1)
+        q_table.array[...] = 0
+        traces.apply(q_table, 1.0)
+        assert q_table[0][1] == expected
+
+
+def test_traces_below_cutoff_are_dropped():
+    traces = EligibilityTraces(cutoff=0.2, capacity=1)
+    q_table = {state: numpy.zeros(2) for state in range(3)}
+    traces.visit(0, 0)
+    traces.decay(0.5)
+    traces.visit(1, 1)
+    traces.decay(0.5)
+    traces.decay(0.5)
+    assert len(traces) == 1
+
+    traces.visit(1, 1)
+    traces.visit(2, 0)
+    traces.apply(q_table, 1.0)
+    assert len(traces) == 2
+    assert q_table[1][1] == 1.0 and q_table[2][0] == 1.0 and q_table[0][0] == 0.0
+
+
+class FixedActions:
+    """Política que repite una secuencia de acciones."""
+
+    def __init__(self, actions):
+        self.actions = iter(actions)
+
+    def elige_acción(self, *args):
+        return next(self.actions, 0)
+
+
+def test_lambda_agents_propagate_reward_within_an_episode():
+    env = gym.make('FrozenLake-v1', is_slippery=False)
+    # Un único episodio con éxito: abajo, abajo, derecha, abajo, derecha, derecha
+    path = [1, 1, 2, 1, 2, 2]
+
+    q_lambda = Q_Lambda(env, 0.9, 0.5, FixedActions(path), 1.0)
+    q_lambda.entrena(1)
+    sarsa_lambda = SarsaLambda(env, 0.9, 0.5, FixedActions(path), 1.0)
+    sarsa_lambda.q_table.array[...] = 0
+    sarsa_lambda.train(1)
+
+    assert q_lambda.calculate_statistics()['success_rate'] == 100
+    assert sarsa_lambda.calculate_statistics()['success_rate'] == 100
+    assert q_lambda.tabla_q[0][1] > 0
+    assert sarsa_lambda.q_table[0][1] > 0
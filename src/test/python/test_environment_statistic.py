@@ -0,0 +1,85 @@
+import gym
+import numpy
+import pytest
+
+from src.main.python.aprendizaje_por_refuerzo import PolíticaEpsilonVoraz, Q_Learning
+from src.main.python.environment_statistic import EnvironmentStatistic, EpisodeLog, StreamingEpisodeLog
+from src.main.python.games.game import Game
+from src.main.python.sarsa import Sarsa
+
+
+def test_terminal_states_are_cached():
+    statistics = EnvironmentStatistic(gym.make('FrozenLake-v1'))
+
+    terminal_states = statistics.get_terminal_states()
+
+    assert terminal_states == frozenset({15})
+    assert statistics.get_terminal_states() is terminal_states
+    statistics.invalidate_terminal_states()
+    assert statistics.get_terminal_states() is not terminal_states
+
+
+def test_episode_log_grows_and_feeds_statistics():
+    statistics = EnvironmentStatistic(gym.make('FrozenLake-v1'))
+    statistics.reset()
+    statistics.episode_log = EpisodeLog(capacity=2)
+
+    for reward in [0, 1, 0, 1, 1]:
+        statistics.reset_episode()
+        statistics.continue_episode(reward)
+        statistics.add_episode(15 if reward else 5)
+
+    result = statistics.calculate_statistics()
+    assert statistics.episode_log.size == 5
+    assert result['num_episodes'] == 5
+    assert result['num_success_episodes'] == 3
+    assert result['mean_reward'] == 0.6
+    assert result['mean_length'] == 1
+
+
+def test_streaming_statistics_match_history():
+    env = gym.make('FrozenLake-v1')
+    history = EnvironmentStatistic(env, window=3)
+    streaming = EnvironmentStatistic(env, streaming=True, window=3)
+    history.reset()
+    streaming.reset()
+
+    for reward, length in [(0, 3), (1, 7), (0, 2), (1, 9), (1, 4)]:
+        for statistics in (history, streaming):
+            statistics.reset_episode()
+            for _ in range(length - 1):
+                statistics.continue_episode(0)
+            statistics.continue_episode(reward)
+            statistics.add_episode(15 if reward else 5)
+
+    expected = history.calculate_statistics()
+    result = streaming.calculate_statistics()
+    assert result.keys() == expected.keys()
+    for key in expected:
+        if key not in ('time', 'mean_time', 'stop_reason', 'stop_episode'):
+            assert numpy.isclose(result[key], expected[key]), key
+    assert streaming.calculate_rolling_statistics() == history.calculate_rolling_statistics()
+    assert numpy.isclose(streaming.calculate_rolling_statistics()['rolling_success_rate'], 200 / 3)
+
+
+def test_agents_train_with_streaming_statistics():
+    game = Game(gym.make('FrozenLake-v1'), 0.9, 0.1, 50, streaming_statistics=True, statistics_window=10)
+
+    for agent in (game.resolve_by_q_learning(0.1), game.resolve_by_sarsa(0.1, 0.1, 0.9)):
+        assert isinstance(agent.statistics.episode_log, StreamingEpisodeLog)
+        assert agent.statistics.window == 10
+        result = agent.statistics.calculate_statistics()
+        assert result['num_episodes'] == 50
+        assert 0 <= result['num_success_episodes'] <= 50
+
+
+def test_empty_statistics_window_is_rejected():
+    env = gym.make('FrozenLake-v1')
+    for create in (lambda: EpisodeLog(window=0),
+                   lambda: StreamingEpisodeLog(0),
+                   lambda: EnvironmentStatistic(env, streaming=True, window=0),
+                   lambda: Q_Learning(env, 0.9, 0.1, PolíticaEpsilonVoraz(0.1), ventana_estadísticas=0),
+                   lambda: Sarsa(env, 0.9, 0.1, PolíticaEpsilonVoraz(0.1), statistics_window=0),
+                   lambda: Game(env, 0.9, 0.1, 10, statistics_window=0)):
+        with pytest.raises(ValueError):
+            create()
@@ -0,0 +1,37 @@
+import gym
+import numpy
+
+from src.main.python.dynamic_programming import ValueIteration
+from src.main.python.policy_evaluation import PolicyEvaluator
+
+
+def test_exact_evaluation_matches_optimal_values():
+    env = gym.make('FrozenLake-v1')
+    agent = ValueIteration(env, 0.9)
+    agent.solve()
+    initial_value = numpy.dot(agent.model.initial_distribution, agent.q_table.array.max(axis=1))
+
+    linear = PolicyEvaluator(env, 0.9, 'linear').evaluate_agent(agent)
+    iterative = PolicyEvaluator(env, 0.9, 'iterative').evaluate_agent(agent)
+
+    assert numpy.isclose(linear['expected_return'], initial_value, atol=1e-6)
+    assert numpy.isclose(iterative['expected_return'], initial_value, atol=1e-6)
+    assert numpy.isclose(linear['success_rate'], iterative['success_rate'])
+    assert 70 < linear['success_rate'] < 76
+
+
+def test_exact_evaluation_of_deterministic_policy():
+    env = gym.make('FrozenLake-v1', is_slippery=False)
+    evaluator = PolicyEvaluator(env, 0.5)
+    # Abajo hasta la última fila y después a la derecha hasta la meta
+    path = {0: 1, 4: 1, 8: 2, 9: 1, 13: 2, 14: 2}
+    policy = {state: numpy.eye(4)[path.get(state, 0)] for state in range(16)}
+
+    results = evaluator.evaluate(policy)
+    assert numpy.isclose(results['success_rate'], 100)
+    assert numpy.isclose(results['mean_reward'], 1)
+    assert numpy.isclose(results['expected_return'], 0.5 ** 5)
+
+    # Siempre a la izquierda nunca termina y el episodio se trunca sin éxito
+    results = evaluator.evaluate({state: numpy.eye(4)[0] for state in range(16)})
+    assert results['success_rate'] == 0
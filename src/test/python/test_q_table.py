@@ -0,0 +1,33 @@
+import gym
+import numpy
+
+from src.main.python.aprendizaje_por_refuerzo import PolíticaEpsilonVoraz, Q_Learning
+from src.main.python.games.golf.golf_env import GolfEnv
+from src.main.python.q_table import DenseQTable, make_q_table
+
+
+def test_dense_q_table_for_discrete_environment():
+    env = gym.make('Taxi-v3')
+
+    q_table = make_q_table(env, numpy.zeros)
+
+    assert isinstance(q_table, DenseQTable)
+    assert q_table.array.shape == (500, 6)
+    q_table[3][2] += 1.5
+    assert q_table.array[3, 2] == 1.5
+    assert len(list(q_table.keys())) == 500
+
+
+def test_dict_q_table_for_golf_environment():
+    q_table = make_q_table(GolfEnv(), numpy.zeros)
+
+    assert not isinstance(q_table, DenseQTable)
+
+
+def test_q_learning_trains_on_dense_q_table():
+    agent = Q_Learning(gym.make('FrozenLake-v1'), 0.9, 0.1, PolíticaEpsilonVoraz(0.1))
+
+    agent.entrena(50)
+
+    assert isinstance(agent.tabla_q, DenseQTable)
+    assert len(agent.get_policy()) == 16
@@ -0,0 +1,72 @@
+import os
+
+import gym
+import numpy
+
+from src.main.python.aprendizaje_por_refuerzo import PolíticaEpsilonVoraz, Q_Learning
+from src.main.python.double_q_learning import DoubleQLearning
+from src.main.python.replay_buffer import ReplayBuffer
+
+
+def test_ring_buffer_overwrites_oldest_transitions():
+    buffer = ReplayBuffer(4)
+    for state in range(6):
+        buffer.add(state, 0, 1.0, state + 1, False)
+    buffer.add_batch(numpy.array([6, 7]), numpy.zeros(2), numpy.ones(2), numpy.array([7, 8]), numpy.array([False, True]))
+
+    assert len(buffer) == 4
+    assert sorted(buffer.states.tolist()) == [4, 5, 6, 7]
+    _, _, states, _, _, next_states, dones = buffer.sample(numpy.random.default_rng(0), 100)
+    assert numpy.all(next_states == states + 1)
+    assert numpy.all(dones == (states == 7))
+
+
+def test_memory_budget_and_memory_map(tmp_path):
+    buffer = ReplayBuffer.with_memory_budget(17 * 1000)
+    assert buffer.capacity == 1000
+    for num_bytes in (10_000_000, 17 * 1000, 100):
+        buffer = ReplayBuffer.with_memory_budget(num_bytes, prioritized=True)
+        arrays = (buffer.states, buffer.actions, buffer.rewards, buffer.next_states, buffer.dones, buffer.tree)
+        assert sum(array.nbytes for array in arrays) <= num_bytes
+        assert ReplayBuffer.allocation_bytes(buffer.capacity + 1, prioritized=True) > num_bytes
+
+    buffer = ReplayBuffer(10, prioritized=True, memmap_dir=str(tmp_path))
+    buffer.add(1, 2, 3.0, 4, True)
+    assert os.path.exists(tmp_path / 'states.npy')
+    assert numpy.load(tmp_path / 'next_states.npy', mmap_mode='r')[0] == 4
+
+
+def test_prioritized_sampling_follows_td_errors():
+    buffer = ReplayBuffer(5, prioritized=True, alpha=1.0, epsilon=0.0)
+    buffer.add_batch(numpy.arange(5), numpy.zeros(5), numpy.zeros(5), numpy.arange(5), numpy.zeros(5, dtype=bool))
+    buffer.update_priorities(numpy.arange(5), numpy.array([0.0, 1.0, 0.0, 3.0, 0.0]))
+
+    indices, weights, *_ = buffer.sample(numpy.random.default_rng(0), 20000)
+    frequencies = numpy.bincount(indices, minlength=5) / 20000
+    assert numpy.allclose(frequencies, [0, 0.25, 0, 0.75, 0], atol=0.02)
+    # Con beta = 0.4, la transición 3, tres veces más probable, pesa 3 ** -0.4 veces menos
+    assert numpy.allclose(weights[indices == 1], 1.0)
+    assert numpy.allclose(weights[indices == 3], 3 ** -0.4)
+
+
+def test_importance_weights_are_one_under_uniform_sampling():
+    transitions = (numpy.arange(5), numpy.zeros(5), numpy.zeros(5), numpy.arange(5), numpy.zeros(5, dtype=bool))
+    for buffer in (ReplayBuffer(5), ReplayBuffer(5, prioritized=True, beta=1.0)):
+        buffer.add_batch(*transitions)
+        _, weights, *_ = buffer.sample(numpy.random.default_rng(0), 100)
+        assert numpy.array_equal(weights, numpy.ones(100))
+
+
+def test_agents_replay_experience():
+    env = gym.make('FrozenLake-v1')
+    numpy.random.seed(0)
+    q_learning = Q_Learning(env, 0.9, 0.1, PolíticaEpsilonVoraz(0.1), memoria_repeticiones=ReplayBuffer(500, True))
+    q_learning.entrena(30)
+    q_learning.entrena(30, número_entornos=4)
+    double_q_learning = DoubleQLearning(env, 0.9, 0.1, PolíticaEpsilonVoraz(0.1), replay_buffer=ReplayBuffer(500))
+    double_q_learning.train(30, num_envs=4)
+
+    assert len(q_learning.memoria_repeticiones) > 0
+    assert len(double_q_learning.replay_buffer) > 0
+    assert numpy.allclose(double_q_learning.q_table.array,
+                          double_q_learning.q1_table.array + double_q_learning.q2_table.array)
@@ -0,0 +1,41 @@
+import gym
+import numpy
+
+from src.main.python.aprendizaje_por_refuerzo import PolíticaEpsilonVoraz, Q_Learning
+from src.main.python.batch_env import make_batch_env
+from src.main.python.environment_statistic import EnvironmentStatistic
+from src.main.python.tabular_model import BatchTabularSimulator, TabularModel, TabularSimulator
+
+
+def test_tabular_model_matches_env_transitions():
+    env = gym.make('FrozenLake-v1')
+    model = TabularModel(env)
+
+    assert numpy.allclose(model.probabilities.sum(axis=2), 1)
+    assert numpy.all(model.cumulative_probabilities[..., -1] == 1)
+    for probability, next_state, reward, terminal in env.unwrapped.P[14][2]:
+        assert next_state in model.next_states[14, 2]
+    assert model.max_episode_steps == 100
+
+
+def test_simulator_respects_time_limit_and_terminal_states():
+    simulator = TabularSimulator(gym.make('FrozenLake-v1'))
+    simulator.reset(seed=0)
+
+    for _ in range(200):
+        state, reward, terminated, truncated, _ = simulator.step(0)
+        if terminated or truncated:
+            break
+    assert terminated or truncated
+    assert simulator.elapsed_steps <= 100
+    assert EnvironmentStatistic(simulator).get_terminal_states() == {15}
+
+
+def test_agents_train_on_batch_simulator():
+    numpy.random.seed(0)
+    simulator = TabularSimulator(gym.make('Taxi-v3'))
+    assert isinstance(make_batch_env(simulator, 4), BatchTabularSimulator)
+
+    agent = Q_Learning(simulator, 0.9, 0.1, PolíticaEpsilonVoraz(0.1))
+    agent.entrena(20, número_entornos=4)
+    assert agent.calculate_statistics()['num_episodes'] == 20